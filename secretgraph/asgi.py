@@ -5,6 +5,7 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 """
 
+import asyncio
 import os
 import sys
 
@@ -19,11 +20,20 @@ from strawberry.channels import GraphQLWSConsumer
 
 
 async def LifeSpanHandler(scope, receive, send):
+    from django.conf import settings
+
+    maintenance_task = None
     while True:
         message = await receive()
         if message["type"] == "lifespan.startup":
+            if getattr(settings, "SECRETGRAPH_MAINTENANCE", "lifespan") == "lifespan":
+                from .server.utils.maintenance import maintenance_loop
+
+                maintenance_task = asyncio.create_task(maintenance_loop())
             await send({"type": "lifespan.startup.complete"})
         elif message["type"] == "lifespan.shutdown":
+            if maintenance_task:
+                maintenance_task.cancel()
             await send({"type": "lifespan.shutdown.complete"})
             return
 
@@ -3,23 +3,152 @@ import copy
 import hashlib
 from abc import ABC, abstractmethod
 from base64 import b64decode, b64encode
+from collections import OrderedDict
 from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from inspect import isclass
 from os import urandom
+from threading import Lock
 from typing import Any, Iterable, Literal, NoReturn, Optional, TypeVar
 
 from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding, rsa, utils
+from cryptography.hazmat.primitives.asymmetric import (
+    ed25519,
+    padding,
+    rsa,
+    utils,
+    x25519,
+)
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.hashes import Hash
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
 T = TypeVar("T")
 KeyType = TypeVar("KeyType", bound=bytes)
 ParamsType = TypeVar("ParamsType", bound=dict)
 
+# executors for cpu heavy crypto operations, created lazily
+_cryptoExecutor: Optional[Executor] = None
+# optional, e.g. a ProcessPoolExecutor, falls back to _cryptoExecutor
+_keygenExecutor: Optional[Executor] = None
+# inputs smaller than this (in bytes) are processed inline
+inlineSizeThreshold = 16384
+
+
+def setCryptoExecutor(
+    executor: Optional[Executor] = None,
+    keygenExecutor: Optional[Executor] = None,
+    threshold: Optional[int] = None,
+):
+    """
+    Configure the executors used for cpu heavy crypto operations.
+    keygenExecutor receives only picklable arguments, so it can be a process pool
+    """
+    global _cryptoExecutor, _keygenExecutor, inlineSizeThreshold
+    _cryptoExecutor = executor
+    _keygenExecutor = keygenExecutor
+    if threshold is not None:
+        inlineSizeThreshold = threshold
+
+
+def getCryptoExecutor() -> Executor:
+    global _cryptoExecutor
+    if _cryptoExecutor is None:
+        _cryptoExecutor = ThreadPoolExecutor(thread_name_prefix="secretgraph_crypto")
+    return _cryptoExecutor
+
+
+async def runInCryptoExecutor(
+    fn: Callable[..., T], *args, size: Optional[int] = None, keygen: bool = False
+) -> T:
+    """Run fn in the crypto executor, inputs with size below threshold inline"""
+    if size is not None and size < inlineSizeThreshold:
+        return fn(*args)
+    executor = (keygen and _keygenExecutor) or getCryptoExecutor()
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+# parsed key objects, key: sha256 digest of DER bytes
+_parsedKeyCache: OrderedDict[bytes, Any] = OrderedDict()
+_parsedKeyCacheLock = Lock()
+_parsedKeyCacheStats = {"hits": 0, "misses": 0}
+# 0 disables the cache
+parsedKeyCacheSize = 256
+cachePrivateKeys = True
+
+
+def setParsedKeyCache(size: Optional[int] = None, privateKeys: Optional[bool] = None):
+    """Configure size of parsed key cache and if private keys are cached"""
+    global parsedKeyCacheSize, cachePrivateKeys
+    if size is not None:
+        parsedKeyCacheSize = size
+    if privateKeys is not None:
+        cachePrivateKeys = privateKeys
+    clearParsedKeyCache(stats=False)
+
+
+def clearParsedKeyCache(stats: bool = True):
+    with _parsedKeyCacheLock:
+        _parsedKeyCache.clear()
+        if stats:
+            _parsedKeyCacheStats["hits"] = 0
+            _parsedKeyCacheStats["misses"] = 0
+
+
+def getParsedKeyCacheStats() -> dict[str, int]:
+    with _parsedKeyCacheLock:
+        return {**_parsedKeyCacheStats, "size": len(_parsedKeyCache)}
+
+
+def loadDERKey(key: bytes, private: bool = False):
+    """
+    Load DER encoded public or private key. Parsed keys are cached.
+    private: require a private key
+    """
+    digest = None
+    keyObj = None
+    if parsedKeyCacheSize:
+        digest = hashlib.sha256(key).digest()
+        with _parsedKeyCacheLock:
+            keyObj = _parsedKeyCache.get(digest)
+            if keyObj is not None:
+                _parsedKeyCache.move_to_end(digest)
+                _parsedKeyCacheStats["hits"] += 1
+            else:
+                _parsedKeyCacheStats["misses"] += 1
+    if keyObj is None:
+        if private:
+            keyObj = serialization.load_der_private_key(key, None)
+        else:
+            try:
+                keyObj = serialization.load_der_public_key(key)
+            except Exception:
+                keyObj = serialization.load_der_private_key(key, None)
+        isPrivate = hasattr(keyObj, "private_bytes")
+        if digest and (cachePrivateKeys or not isPrivate):
+            with _parsedKeyCacheLock:
+                _parsedKeyCache[digest] = keyObj
+                while len(_parsedKeyCache) > parsedKeyCacheSize:
+                    _parsedKeyCache.popitem(last=False)
+    if private and not hasattr(keyObj, "private_bytes"):
+        raise ValueError("not a private key")
+    return keyObj
+
+
+def _generateRSAKey(bits: int) -> bytes:
+    # module level for process pools
+    return rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=bits,
+    ).private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
 
 def addWithVariants(
     targetDict: dict[str, T], variants: list[str], entry: Optional[T] = None
@@ -82,6 +211,10 @@ class DeriveAlgorithm(ABC):
     ) -> CryptoResult:
         pass
 
+    def hasher(self):
+        """Incremental hash context (update/digest), only for hash algorithms"""
+        raise NotImplementedError()
+
     async def serialize(self, result: DeriveResult) -> str:
         return b64encode(result.data).decode()
 
@@ -163,8 +296,11 @@ class SHA512Algo(DeriveAlgorithm):
     type = "hash"
     serializedName = "sha512"
 
+    def hasher(self):
+        return hashlib.new(self.serializedName)
+
     def _execute(self, data: bytes | Iterable[bytes]):
-        hashCtx = hashlib.new(self.serializedName)
+        hashCtx = self.hasher()
         if isinstance(data, bytes):
             hashCtx.update(data)
         else:
@@ -173,7 +309,9 @@ class SHA512Algo(DeriveAlgorithm):
         return hashCtx.digest()
 
     async def execute(self, data: bytes | Iterable[bytes]):
-        return await asyncio.get_event_loop().run_in_executor(None, self._execute, data)
+        return await runInCryptoExecutor(
+            self._execute, data, size=len(data) if isinstance(data, bytes) else None
+        )
 
     async def derive(self, inp: bytes | Iterable[bytes], params=None) -> CryptoResult:
         return DeriveResult(data=await self.execute(inp), params={})
@@ -201,12 +339,10 @@ class PBKDF2sha512(DeriveAlgorithm):
             iterations=iterations,
             salt=salt,
             dklen=32,
-        ).digest()
+        )
 
     async def execute(self, iterations, salt, data):
-        return await asyncio.get_event_loop().run_in_executor(
-            None, self._execute, iterations, salt, data
-        )
+        return await runInCryptoExecutor(self._execute, iterations, salt, data)
 
     async def derive(self, inp: bytes, params=None) -> CryptoResult:
         if not params:
@@ -260,36 +396,43 @@ class OEAPsha512(EncryptionAlgorithm):
     type = "asymmetric"
     serializedName = "rsa-sha512"
 
-    async def encrypt(self, key, data, params=None):
-        # to publicKey
-        key = await self.toHashableKey(key, raw=True)
+    def _padding(self):
         hashalgo = self.serializedName.split("-")[1].upper()
         hashalgo = getattr(hashes, hashalgo)()
+        return padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashalgo),
+            algorithm=hashalgo,
+            label=None,
+        )
+
+    def _encrypt(self, key, data):
+        # to publicKey
+        key = self._toPublicKey(key)
         return CryptoResult(
-            data=key.encrypt(
-                data,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashalgo),
-                    algorithm=hashalgo,
-                    label=None,
-                ),
-            ),
+            data=key.encrypt(data, self._padding()),
             key=key.public_bytes(
                 encoding=serialization.Encoding.DER,
                 format=serialization.PublicFormat.SubjectPublicKeyInfo,
             ),
         )
 
-    async def toHashableKey(self, key, raw):
+    async def encrypt(self, key, data, params=None):
+        return await runInCryptoExecutor(self._encrypt, key, data)
+
+    def _toPublicKey(self, key):
         if isinstance(key, str):
             key = b64decode(key)
         if isinstance(key, bytes):
-            try:
-                key = serialization.load_der_public_key(key)
-            except Exception:
-                key = serialization.load_der_private_key(key, None)
+            key = loadDERKey(key)
         if hasattr(key, "public_key"):
             key = key.public_key()
+        return key
+
+    async def toHashableKey(self, key, raw):
+        if isinstance(key, (str, bytes)):
+            key = await runInCryptoExecutor(self._toPublicKey, key)
+        else:
+            key = self._toPublicKey(key)
         if raw:
             return key
         return key.public_bytes(
@@ -297,22 +440,13 @@ class OEAPsha512(EncryptionAlgorithm):
             format=serialization.PublicFormat.SubjectPublicKeyInfo,
         )
 
-    async def decrypt(self, key, data, params=None):
+    def _decrypt(self, key, data):
         if isinstance(key, str):
             key = b64decode(key)
         if isinstance(key, bytes):
-            key = serialization.load_der_private_key(key, None)
-        hashalgo = self.serializedName.split("-")[1].upper()
-        hashalgo = getattr(hashes, hashalgo)()
+            key = loadDERKey(key, private=True)
         return CryptoResult(
-            data=key.decrypt(
-                data,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashalgo),
-                    algorithm=hashalgo,
-                    label=None,
-                ),
-            ),
+            data=key.decrypt(data, self._padding()),
             key=key.private_bytes(
                 encoding=serialization.Encoding.DER,
                 format=serialization.PrivateFormat.PKCS8,
@@ -320,6 +454,9 @@ class OEAPsha512(EncryptionAlgorithm):
             ),
         )
 
+    async def decrypt(self, key, data, params=None):
+        return await runInCryptoExecutor(self._decrypt, key, data)
+
     async def generateKey(cls, params=None):
         if not params:
             params = {}
@@ -327,14 +464,7 @@ class OEAPsha512(EncryptionAlgorithm):
             params = copy.copy(params)
         params["bits"] = int(params.get("bits", 4096))
         return KeyResult(
-            key=rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=params["bits"],
-            ).private_bytes(
-                encoding=serialization.Encoding.DER,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption(),
-            ),
+            key=await runInCryptoExecutor(_generateRSAKey, params["bits"], keygen=True),
             params=params,
         )
 
@@ -344,6 +474,91 @@ class OEAPsha256(OEAPsha512):
     serializedName = "rsa-sha256"
 
 
+@addWithVariants(mapEncryptionAlgorithms, ["x25519-hkdf-aesgcm"])
+class X25519HKDFAESGCM(EncryptionAlgorithm):
+    """
+    Hybrid encryption: ephemeral X25519 key agreement, HKDF-SHA256, AESGCM
+    Format: ephemeral public key (32 bytes) + nonce (12 bytes) + ciphertext
+    """
+
+    type = "asymmetric"
+    serializedName = "x25519-hkdf-aesgcm"
+    toHashableKey = OEAPsha512.toHashableKey
+    _toPublicKey = OEAPsha512._toPublicKey
+
+    def _deriveKey(self, sharedKey: bytes, ephemeralPublic: bytes, publicKey):
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"secretgraph%b%b"
+            % (
+                ephemeralPublic,
+                publicKey.public_bytes(
+                    encoding=serialization.Encoding.Raw,
+                    format=serialization.PublicFormat.Raw,
+                ),
+            ),
+        ).derive(sharedKey)
+
+    def _encrypt(self, key, data):
+        key = self._toPublicKey(key)
+        ephemeral = x25519.X25519PrivateKey.generate()
+        ephemeralPublic = ephemeral.public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw,
+        )
+        nonce = urandom(12)
+        aesKey = self._deriveKey(ephemeral.exchange(key), ephemeralPublic, key)
+        return CryptoResult(
+            data=b"%b%b%b"
+            % (ephemeralPublic, nonce, AESGCM(aesKey).encrypt(nonce, data, None)),
+            key=key.public_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo,
+            ),
+        )
+
+    async def encrypt(self, key, data, params=None):
+        return await runInCryptoExecutor(self._encrypt, key, data, size=len(data))
+
+    def _decrypt(self, key, data):
+        if isinstance(key, str):
+            key = b64decode(key)
+        if isinstance(key, bytes):
+            key = loadDERKey(key, private=True)
+        if len(data) < 44:
+            raise ValueError("data too short")
+        ephemeralPublic = data[:32]
+        aesKey = self._deriveKey(
+            key.exchange(x25519.X25519PublicKey.from_public_bytes(ephemeralPublic)),
+            ephemeralPublic,
+            key.public_key(),
+        )
+        return CryptoResult(
+            data=AESGCM(aesKey).decrypt(data[32:44], data[44:], None),
+            key=key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            ),
+        )
+
+    async def decrypt(self, key, data, params=None):
+        return await runInCryptoExecutor(self._decrypt, key, data, size=len(data))
+
+    async def generateKey(self, params=None):
+        # cheap, no executor required
+        return KeyResult(
+            key=x25519.X25519PrivateKey.generate().private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            ),
+            params={},
+        )
+
+
 @addWithVariants(mapEncryptionAlgorithms, ["AESGCM"])
 class AESGCMAlgo(EncryptionAlgorithm):
     type = "symmetric"
@@ -438,23 +653,216 @@ class AESGCMAlgo(EncryptionAlgorithm):
         )
 
 
+class SegmentedAESGCM:
+    """
+    AESGCM over fixed size segments, every segment has its own nonce and tag.
+    nonce of segment: nonce prefix (8 bytes) + segment index (4 bytes, big endian)
+    The last segment is authenticated as final, so truncation is detected
+    """
+
+    tagSize = 16
+
+    def __init__(self, key: bytes, nonce: bytes, chunkSize: int):
+        if len(nonce) != 8:
+            raise ValueError("invalid nonce length")
+        if chunkSize <= 0:
+            raise ValueError("invalid chunk size")
+        self.cryptor = AESGCM(key)
+        self.nonce = nonce
+        self.chunkSize = chunkSize
+        self.segmentSize = chunkSize + self.tagSize
+
+    def _segmentNonce(self, index: int) -> bytes:
+        return self.nonce + index.to_bytes(4, "big")
+
+    def encryptSegment(self, index: int, data: bytes, final: bool) -> bytes:
+        return self.cryptor.encrypt(
+            self._segmentNonce(index), data, b"final" if final else b""
+        )
+
+    def decryptSegment(self, index: int, data: bytes, final: bool) -> bytes:
+        return self.cryptor.decrypt(
+            self._segmentNonce(index), data, b"final" if final else b""
+        )
+
+    def plainSize(self, encryptedSize: int) -> int:
+        segments = max(-(-encryptedSize // self.segmentSize), 1)
+        return max(encryptedSize - segments * self.tagSize, 0)
+
+    def encryptedSize(self, plainSize: int) -> int:
+        segments = max(-(-plainSize // self.chunkSize), 1)
+        return plainSize + segments * self.tagSize
+
+
+class SegmentedAESGCMContext:
+    """
+    Streaming update/finalize context over SegmentedAESGCM, like the Cipher
+    contexts. Random access is possible via the segmented cryptor
+    """
+
+    def __init__(self, cryptor: SegmentedAESGCM, decrypt: bool):
+        self.cryptor = cryptor
+        self.decrypt = decrypt
+        self.inputSize = cryptor.segmentSize if decrypt else cryptor.chunkSize
+        self._buffer = bytearray()
+        self._index = 0
+
+    def _process(self, data: bytes, final: bool) -> bytes:
+        if self.decrypt:
+            result = self.cryptor.decryptSegment(self._index, data, final)
+        else:
+            result = self.cryptor.encryptSegment(self._index, data, final)
+        self._index += 1
+        return result
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer += data
+        result = []
+        # keep the last segment back, it is authenticated as final
+        while len(self._buffer) > self.inputSize:
+            result.append(self._process(bytes(self._buffer[: self.inputSize]), False))
+            del self._buffer[: self.inputSize]
+        return b"".join(result)
+
+    def finalize(self) -> bytes:
+        # at least one (empty) segment
+        result = self._process(bytes(self._buffer), True)
+        self._buffer.clear()
+        return result
+
+    def finalize_with_tag(self, tag: bytes) -> bytes:
+        if not self.decrypt:
+            raise ValueError("tag can only be provided for decryption")
+        # the tag is part of the last segment
+        self._buffer += tag
+        return self.finalize()
+
+
+@addWithVariants(mapEncryptionAlgorithms, ["AESGCM-chunked"])
+class ChunkedAESGCMAlgo(EncryptionAlgorithm):
+    """AESGCM in independently authenticated segments, allows random access"""
+
+    type = "symmetric"
+    serializedName = "AESGCM-chunked"
+    toHashableKey = AESGCMAlgo.toHashableKey
+    generateKey = AESGCMAlgo.generateKey
+
+    def _prepareParams(self, params, generate=False):
+        if not params:
+            params = {}
+        else:
+            params = copy.copy(params)
+        if generate and not params.get("nonce"):
+            params["nonce"] = urandom(8)
+        if isinstance(params["nonce"], str):
+            params["nonce"] = b64decode(params["nonce"])
+        params["chunkSize"] = int(params.get("chunkSize", 65536))
+        return params
+
+    def _encrypt(self, key, data, params):
+        cryptor = SegmentedAESGCM(key, params["nonce"], params["chunkSize"])
+        segments = []
+        # at least one (empty) segment
+        positions = range(0, max(len(data), 1), cryptor.chunkSize)
+        for index, position in enumerate(positions):
+            segments.append(
+                cryptor.encryptSegment(
+                    index,
+                    data[position : position + cryptor.chunkSize],
+                    index == len(positions) - 1,
+                )
+            )
+        return b"".join(segments)
+
+    async def encrypt(self, key, data, params=None):
+        params = self._prepareParams(params, generate=True)
+        if isinstance(key, str):
+            key = b64decode(key)
+        return CryptoResult(
+            data=await runInCryptoExecutor(
+                self._encrypt, key, data, params, size=len(data)
+            ),
+            params=params,
+            key=key,
+        )
+
+    def _cryptor(self, key, params):
+        params = self._prepareParams(params)
+        if isinstance(key, str):
+            key = b64decode(key)
+        return SegmentedAESGCM(key, params["nonce"], params["chunkSize"])
+
+    async def encryptor(self, key, params):
+        return SegmentedAESGCMContext(self._cryptor(key, params), False)
+
+    def _decrypt(self, key, data, params):
+        cryptor = SegmentedAESGCM(key, params["nonce"], params["chunkSize"])
+        positions = range(0, max(len(data), 1), cryptor.segmentSize)
+        return b"".join(
+            cryptor.decryptSegment(
+                index,
+                data[position : position + cryptor.segmentSize],
+                index == len(positions) - 1,
+            )
+            for index, position in enumerate(positions)
+        )
+
+    async def decrypt(self, key, data, params):
+        params = self._prepareParams(params)
+        if isinstance(key, str):
+            key = b64decode(key)
+        return CryptoResult(
+            data=await runInCryptoExecutor(
+                self._decrypt, key, data, params, size=len(data)
+            ),
+            params=params,
+            key=key,
+        )
+
+    async def decryptor(self, key, params):
+        return SegmentedAESGCMContext(self._cryptor(key, params), True)
+
+    async def serializeParams(self, params):
+        return "%s,%s" % (params["chunkSize"], b64encode(params["nonce"]).decode())
+
+    async def deserialize(self, data: str, params=None):
+        if not params:
+            params = {}
+        else:
+            params = copy.copy(params)
+        splitted = data.split(":", 1)
+        if splitted[0]:
+            chunkSize, nonce = splitted[0].split(",", 1)
+            params["chunkSize"] = int(chunkSize)
+            params["nonce"] = b64decode(nonce)
+        if len(splitted) == 2 and splitted[1]:
+            return DeserializeResult(data=b64decode(splitted[1]), params=params)
+
+        return DeserializeResult(params=params)
+
+
 @addWithVariants(mapSignatureAlgorithms, ["rsa-sha512", "sha512", "SHA-512"])
 class RSASignsha512(SignatureAlgorithm):
     serializedName = "rsa-sha512"
     generateKey = OEAPsha512.generateKey
     toHashableKey = OEAPsha512.toHashableKey
+    _toPublicKey = OEAPsha512._toPublicKey
 
-    async def sign(self, key, data, prehashed=False):
-        if isinstance(key, str):
-            key = b64decode(key)
-        if isinstance(key, bytes):
-            key = serialization.load_der_private_key(key, None)
+    def _hashes(self, prehashed):
         hashalgo = self.serializedName.split("-")[1].upper()
         hashalgo = getattr(hashes, hashalgo)()
         if prehashed:
             hash2 = utils.Prehashed(hashalgo)
         else:
             hash2 = hashalgo
+        return hashalgo, hash2
+
+    def _sign(self, key, data, prehashed):
+        if isinstance(key, str):
+            key = b64decode(key)
+        if isinstance(key, bytes):
+            key = loadDERKey(key, private=True)
+        hashalgo, hash2 = self._hashes(prehashed)
         return b64encode(
             key.sign(
                 data,
@@ -465,24 +873,22 @@ class RSASignsha512(SignatureAlgorithm):
             )
         ).decode()
 
+    async def sign(self, key, data, prehashed=False):
+        return await runInCryptoExecutor(self._sign, key, data, prehashed)
+
     async def getHasher(self):
         hashalgo = self.serializedName.split("-")[1].upper()
         hashalgo = getattr(hashes, hashalgo)()
         hashCtx = Hash(hashalgo)
         return Hasher(update=hashCtx.update, finalize=hashCtx.finalize)
 
-    async def verify(self, key, signature, data, prehashed=False):
-        key = await self.toHashableKey(key, raw=True)
+    def _verify(self, key, signature, data, prehashed):
+        key = self._toPublicKey(key)
         if isinstance(signature, str):
             signature = b64decode(signature)
         if isinstance(data, str):
             data = b64decode(data)
-        hashalgo = self.serializedName.split("-")[1].upper()
-        hashalgo = getattr(hashes, hashalgo)()
-        if prehashed:
-            hash2 = utils.Prehashed(hashalgo)
-        else:
-            hash2 = hashalgo
+        hashalgo, hash2 = self._hashes(prehashed)
         try:
             key.verify(
                 signature,
@@ -496,7 +902,62 @@ class RSASignsha512(SignatureAlgorithm):
         except InvalidSignature:
             return False
 
+    async def verify(self, key, signature, data, prehashed=False):
+        return await runInCryptoExecutor(
+            self._verify, key, signature, data, prehashed
+        )
+
 
 @addWithVariants(mapSignatureAlgorithms, ["rsa-sha256", "sha256", "SHA-256"])
 class RSASignsha256(RSASignsha512):
     serializedName = "rsa-sha256"
+
+
+@addWithVariants(mapSignatureAlgorithms, ["ed25519-sha512"])
+class Ed25519Signsha512(SignatureAlgorithm):
+    """
+    Ed25519 over the SHA-512 digest of the data,
+    so signatures can be calculated from a hasher (prehashed)
+    """
+
+    serializedName = "ed25519-sha512"
+    toHashableKey = OEAPsha512.toHashableKey
+    _toPublicKey = OEAPsha512._toPublicKey
+
+    def _digest(self, data, prehashed):
+        if prehashed:
+            return data
+        return hashlib.sha512(data).digest()
+
+    async def sign(self, key, data, prehashed=False):
+        if isinstance(key, str):
+            key = b64decode(key)
+        if isinstance(key, bytes):
+            key = loadDERKey(key, private=True)
+        return b64encode(key.sign(self._digest(data, prehashed))).decode()
+
+    async def getHasher(self):
+        hashCtx = Hash(hashes.SHA512())
+        return Hasher(update=hashCtx.update, finalize=hashCtx.finalize)
+
+    async def verify(self, key, signature, data, prehashed=False):
+        key = self._toPublicKey(key)
+        if isinstance(signature, str):
+            signature = b64decode(signature)
+        if isinstance(data, str):
+            data = b64decode(data)
+        try:
+            key.verify(signature, self._digest(data, prehashed))
+            return True
+        except InvalidSignature:
+            return False
+
+    async def generateKey(self, params=None):
+        return KeyResult(
+            key=ed25519.Ed25519PrivateKey.generate().private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption(),
+            ),
+            params={},
+        )
@@ -1,11 +1,11 @@
-import asyncio
 import base64
-from typing import Iterable, Optional
+from typing import AsyncIterable, Iterable, Optional
 
 import argon2
 from cryptography.hazmat.primitives import serialization
 
 from ..typings import PrivateCryptoKey, PublicCryptoKey
+from .base_crypto import DeriveAlgorithm, DeriveResult, runInCryptoExecutor
 from .crypto import deriveString, findWorkingAlgorithms, mapDeriveAlgorithms
 
 
@@ -93,6 +93,15 @@ def sortedRegistryHash(inp: Iterable[str], url: str, domain: str) -> str:
     return f"{domain}:{sortedRegistryHashRaw(inp, url)}"
 
 
+async def asortedRegistryHashRaw(inp: Iterable[str], url: str) -> str:
+    # argon2 is expensive, don't block the event loop
+    return await runInCryptoExecutor(sortedRegistryHashRaw, tuple(inp), url)
+
+
+async def asortedRegistryHash(inp: Iterable[str], url: str, domain: str) -> str:
+    return f"{domain}:{await asortedRegistryHashRaw(inp, url)}"
+
+
 async def hashTagsContentHash(
     inp: Iterable[str],
     domain: str,
@@ -101,8 +110,46 @@ async def hashTagsContentHash(
     return "%s:%s" % (domain, await sortedHash(inp, hashAlgorithm))
 
 
+class MultiHasher:
+    """Feed data once to multiple hash algorithms"""
+
+    def __init__(self, hashAlgorithms: Iterable[str | DeriveAlgorithm]):
+        self.algorithms = [
+            mapDeriveAlgorithms[hashAlgorithm]
+            if isinstance(hashAlgorithm, str)
+            else hashAlgorithm
+            for hashAlgorithm in hashAlgorithms
+        ]
+        self.hashCtxs = [algorithm.hasher() for algorithm in self.algorithms]
+
+    def update(self, chunk: bytes):
+        for hashCtx in self.hashCtxs:
+            hashCtx.update(chunk)
+
+    def updateMany(self, chunks: Iterable[bytes]):
+        for chunk in chunks:
+            self.update(chunk)
+
+    async def aupdate(self, chunk: bytes):
+        await runInCryptoExecutor(self.update, chunk, size=len(chunk))
+
+    async def serialize(self) -> list[str]:
+        return [
+            "%s:%s"
+            % (
+                algorithm.serializedName,
+                await algorithm.serialize(DeriveResult(data=hashCtx.digest())),
+            )
+            for algorithm, hashCtx in zip(self.algorithms, self.hashCtxs)
+        ]
+
+
 async def calculateHashesForHashAlgorithms(
-    inp: bytes | PrivateCryptoKey | PublicCryptoKey | Iterable[bytes],
+    inp: bytes
+    | PrivateCryptoKey
+    | PublicCryptoKey
+    | Iterable[bytes]
+    | AsyncIterable[bytes],
     hashAlgorithms: Iterable[str],
 ) -> list[str]:
     if isinstance(inp, str):
@@ -114,16 +161,16 @@ async def calculateHashesForHashAlgorithms(
             encoding=serialization.Encoding.DER,
             format=serialization.PublicFormat.SubjectPublicKeyInfo,
         )
-    hashes = []
-    for hashAlgorithm in hashAlgorithms:
-        if isinstance(hashAlgorithm, str):
-            hashAlgorithm = mapDeriveAlgorithms[hashAlgorithm]
-        hashes.append(
-            asyncio.ensure_future(
-                deriveString(inp, algorithm=hashAlgorithm.serializedName)
-            )
-        )
-    return await asyncio.gather(*hashes)
+    # read input only once, iterators can be consumed only once
+    hasher = MultiHasher(hashAlgorithms)
+    if isinstance(inp, (bytes, bytearray, memoryview)):
+        await hasher.aupdate(inp)
+    elif hasattr(inp, "__aiter__"):
+        async for chunk in inp:
+            await hasher.aupdate(chunk)
+    else:
+        await runInCryptoExecutor(hasher.updateMany, inp)
+    return await hasher.serialize()
 
 
 async def calculateHashes(
@@ -5,6 +5,7 @@ from django.conf import settings
 from graphene_protector.django.strawberry import Schema
 from strawberry.extensions import MaxTokensLimiter
 from strawberry.schema.config import StrawberryConfig
+from strawberry_django.optimizer import DjangoOptimizerExtension
 
 from .server.schema import Mutation as ServerMutation
 from .server.schema import Query as ServerQuery
@@ -14,7 +15,11 @@ from .server.schema.definitions import (
     ContentNode,
     NetNode,
 )
-from .server.strawberry_extensions import RatelimitErrors, RatelimitMutations
+from .server.strawberry_extensions import (
+    PersistedQueries,
+    RatelimitErrors,
+    RatelimitMutations,
+)
 
 # from .user.schema import Query as UserQuery
 # from .user.schema import Mutation as UserMutation
@@ -35,7 +40,15 @@ schema = Schema(
     query=Query,
     mutation=Mutation,
     subscription=ServerSubscription,
-    extensions=[MaxTokensLimiter(1000), RatelimitMutations, RatelimitErrors],
+    extensions=[
+        MaxTokensLimiter(1000),
+        PersistedQueries,
+        RatelimitMutations,
+        RatelimitErrors,
+        # resolvers check fields like state or limited, which are not part of
+        # the selection, so don't defer them via only()
+        DjangoOptimizerExtension(enable_only_optimization=False),
+    ],
     # register ContentNode first
     types=[NetNode, ContentNode, ContentDownloadNode],
     config=StrawberryConfig(
@@ -7,7 +7,7 @@ from django.conf import settings
 from django.db.models import Q, QuerySet, Subquery
 
 from ...core.constants import public_states
-from ..models import Cluster, ClusterGroup, Content
+from ..models import Cluster, ClusterGroup, Content, ContentTag
 from ..utils.auth import fetch_by_id
 
 logger = logging.getLogger(__name__)
@@ -150,9 +150,9 @@ def fetch_contents(
                 elif i.startswith("=id="):
                     incl_filters |= Q(flexid_cached=i[4:])
                 elif i.startswith("="):
-                    incl_filters |= Q(tags__tag=i[1:])
+                    incl_filters |= ContentTag.q_equal(i[1:], "tags__")
                 else:
-                    incl_filters |= Q(tags__tag__startswith=i)
+                    incl_filters |= ContentTag.q_startswith(i, "tags__")
 
         # only if tags are specified the filtering starts,
         # empty array does no harm
@@ -162,9 +162,9 @@ def fetch_contents(
             elif i.startswith("=id="):
                 excl_filters |= Q(flexid_cached=i[4:])
             elif i.startswith("="):
-                excl_filters |= Q(tags__tag=i[1:])
+                excl_filters |= ContentTag.q_equal(i[1:], "tags__")
             else:
-                excl_filters |= Q(tags__tag__startswith=i)
+                excl_filters |= ContentTag.q_startswith(i, "tags__")
         hash_filters = Q()
         if contentHashes is not None:
             hash_filters = Q(contentHash__in=contentHashes)
@@ -6,7 +6,7 @@ from django.utils import timezone
 from strawberry import relay
 
 from ....core import constants
-from ...models import Action, Cluster, Content
+from ...models import Action, Cluster, Content, ContentTag
 from ._shared import get_forbidden_content_ids, only_owned_helper
 
 
@@ -27,9 +27,9 @@ class SideEffectsHandlers:
                     elif i.startswith("=id="):
                         excl_filters_tag |= Q(flexid_cached=i[4:])
                     elif i.startswith("="):
-                        excl_filters_tag |= Q(tags__tag=i[1:])
+                        excl_filters_tag |= ContentTag.q_equal(i[1:], "tags__")
                     else:
-                        excl_filters_tag |= Q(tags__tag__startswith=i)
+                        excl_filters_tag |= ContentTag.q_startswith(i, "tags__")
 
                 incl_filters_type = Q()
                 if action_dict["includeTypes"]:
@@ -45,9 +45,9 @@ class SideEffectsHandlers:
                     elif i.startswith("=id="):
                         incl_filters_tag |= Q(flexid_cached=i[4:])
                     elif i.startswith("="):
-                        incl_filters_tag |= Q(tags__tag=i[1:])
+                        incl_filters_tag |= ContentTag.q_equal(i[1:], "tags__")
                     else:
-                        incl_filters_tag |= Q(tags__tag__startswith=i)
+                        incl_filters_tag |= ContentTag.q_startswith(i, "tags__")
                 excl_filters = excl_filters_type | excl_filters_tag
                 if action_dict.get("excludeIds"):
                     excl_filters |= Q(id__in=action_dict["excludeIds"])
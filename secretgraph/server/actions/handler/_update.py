@@ -34,9 +34,9 @@ class UpdateHandlers:
                 elif i.startswith("=id="):
                     excl_filters |= Q(flexid_cached=i[4:])
                 elif i.startswith("="):
-                    excl_filters |= Q(tags__tag=i[1:])
+                    excl_filters |= ContentTag.q_equal(i[1:], "tags__")
                 else:
-                    excl_filters |= Q(tags__tag__startswith=i)
+                    excl_filters |= ContentTag.q_startswith(i, "tags__")
 
             incl_filters = Q()
             if action_dict["includeTypes"]:
@@ -49,9 +49,9 @@ class UpdateHandlers:
                 elif i.startswith("=id="):
                     incl_filters |= Q(flexid_cached=i[4:])
                 elif i.startswith("="):
-                    incl_filters |= Q(tags__tag=i[1:])
+                    incl_filters |= ContentTag.q_equal(i[1:], "tags__")
                 else:
-                    incl_filters |= Q(tags__tag__startswith=i)
+                    incl_filters |= ContentTag.q_startswith(i, "tags__")
 
             return {
                 "filters": ~excl_filters & incl_filters,
@@ -113,9 +113,9 @@ class UpdateHandlers:
                 elif i.startswith("=id="):
                     excl_filters_tag |= Q(flexid_cached=i[4:])
                 elif i.startswith("="):
-                    excl_filters_tag |= Q(tags__tag=i[1:])
+                    excl_filters_tag |= ContentTag.q_equal(i[1:], "tags__")
                 else:
-                    excl_filters_tag |= Q(tags__tag__startswith=i)
+                    excl_filters_tag |= ContentTag.q_startswith(i, "tags__")
 
             incl_filters_type = Q()
             if action_dict["includeTypes"]:
@@ -131,9 +131,9 @@ class UpdateHandlers:
                 elif i.startswith("=id="):
                     incl_filters_tag |= Q(flexid_cached=i[4:])
                 elif i.startswith("="):
-                    incl_filters_tag |= Q(tags__tag=i[1:])
+                    incl_filters_tag |= ContentTag.q_equal(i[1:], "tags__")
                 else:
-                    incl_filters_tag |= Q(tags__tag__startswith=i)
+                    incl_filters_tag |= ContentTag.q_startswith(i, "tags__")
             excl_filters = excl_filters_tag | excl_filters_type
 
             if action_dict.get("excludeIds"):
@@ -1,35 +1,51 @@
-__all__ = ["create_content_fn", "update_content_fn", "create_key_fn"]
+__all__ = [
+    "create_content_fn",
+    "create_contents_fn",
+    "update_content_fn",
+    "create_key_fn",
+]
 
 
 import base64
+import binascii
 import logging
 import sys
 from contextlib import nullcontext
 from dataclasses import fields
 from itertools import chain
-from typing import Iterable, List, Optional
+from tempfile import SpooledTemporaryFile
+from typing import Callable, Iterable, List, Optional
 from uuid import UUID, uuid4
 
-from asgiref.sync import sync_to_async
+from asgiref.sync import async_to_sync, sync_to_async
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.serialization import load_der_public_key
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.base import ContentFile, File
+from django.db import connections, router
 from django.db.models import F, Q
 from django.utils.timezone import now
 from strawberry_django import django_resolver
 
 from ....core import constants
 from ....core.exceptions import ResourceLimitExceeded
-from ...models import Cluster, Content, ContentReference, ContentTag, Net
+from ...models import (
+    Action,
+    Cluster,
+    Content,
+    ContentAction,
+    ContentReference,
+    ContentTag,
+    Net,
+)
 from ...utils.auth import (
     get_cached_result,
     ids_to_results,
     retrieve_allowed_objects,
 )
 from ...utils.hashing import calculateHashes
-from ...utils.misc import refresh_fields
+from ...utils.misc import get_secretgraph_channel, refresh_fields
 from ._actions import manage_actions_fn
 from ._arguments import (
     ContentInput,
@@ -57,6 +73,45 @@ def _value_to_dict(obj):
     return dict((field.name, getattr(obj, field.name)) for field in fields(obj))
 
 
+# multiple of 4 for base64
+_chunk_size = 65536
+
+
+def _spool_value(value, check_size: Callable[[int], None]) -> File:
+    """
+    Copy value chunkwise into a spooled temporary file.
+    Sizes are checked while copying, so big uploads are aborted early
+    """
+    spooled = SpooledTemporaryFile(
+        max_size=getattr(settings, "SECRETGRAPH_UPLOAD_SPOOL_SIZE", 1048576)
+    )
+    size = 0
+
+    def write(chunk):
+        nonlocal size
+        size += len(chunk)
+        check_size(size)
+        spooled.write(chunk)
+
+    if isinstance(value, str):
+        try:
+            for i in range(0, len(value), _chunk_size):
+                write(base64.b64decode(value[i : i + _chunk_size], validate=True))
+        except binascii.Error:
+            # e.g. line breaks, fallback to the lenient decoder
+            spooled.seek(0)
+            spooled.truncate()
+            size = 0
+            write(base64.b64decode(value))
+    else:
+        while chunk := value.read(_chunk_size):
+            write(chunk)
+    spooled.seek(0)
+    result = File(spooled)
+    result.size = size
+    return result
+
+
 async def _transform_key_into_dataobj(
     key_obj, publicKeyContent=None
 ) -> tuple[list[str], ContentMergedInput, Optional[ContentMergedInput]]:
@@ -164,15 +219,21 @@ async def _update_or_create_content_or_key(
     authset,
     is_key: bool,
     required_keys: set[str],
+    net_sizes: Optional[dict[Net, int]] = None,
 ):
+    """
+    net_sizes: batch mode, collect the size per net instead of checking and
+    updating the net (only for creation, see create_contents_fn)
+    """
     create = not content.id
+    assert net_sizes is None or create, "batch mode is only for creation"
     assert not content.locked, "Content is locked"
     size_new = content.flexid_byte_size
     size_old = content.flexid_byte_size
     refs_is_transfer = False
     tags_transfer_type = 0
     if not create:
-        size_old = await content.asize()
+        size_old = content.size
 
     if isinstance(objdata.cluster, str):
         objdata.cluster = await (
@@ -283,10 +344,11 @@ async def _update_or_create_content_or_key(
             content.type, objdata.tags, early_size_limit=early_op_limit
         )
         size_new += size_new_tags
+        content.size_tags_cached = size_new_tags
     elif create:
         raise ValueError("Content tags are missing")
     else:
-        size_new += await content.asize_tags()
+        size_new += content.size_tags
         if objdata.references is not None:
             key_hashes_tags = set()
 
@@ -325,19 +387,42 @@ async def _update_or_create_content_or_key(
         #            "Content must be encrypted and cryptoParameters specified"
         #        )
         content.cryptoParameters = objdata.cryptoParameters
-        # otherwise file size calculation causes error
-        if objdata.value is sys.stdin:
-            objdata.value = ContentFile(objdata.value.read())
-        elif isinstance(objdata.value, bytes):
+        max_upload_size = content.net.max_upload_size
+        # bytes left in quota, exact check is done later
+        available = None
+        if content.net.quota is not None and isinstance(content.net.bytes_in_use, int):
+            # shrinking is allowed even if the quota is already exceeded
+            available = (
+                max(content.net.quota - content.net.bytes_in_use, 0) - size_new
+            )
+            if old_net is None:
+                available += size_old
+
+        def check_size(size: int):
+            if max_upload_size is not None and size > max_upload_size:
+                raise ValueError("file too big")
+            if available is not None and size > available:
+                raise ResourceLimitExceeded("quota exceeded")
+
+        # stream data without size or which requires decoding
+        if isinstance(objdata.value, bytes):
             objdata.value = ContentFile(objdata.value)
-        elif isinstance(objdata.value, str):
-            objdata.value = ContentFile(base64.b64decode(objdata.value))
+        elif (
+            objdata.value is sys.stdin
+            or isinstance(objdata.value, str)
+            or (
+                not isinstance(objdata.value, File)
+                and not hasattr(objdata.value, "size")
+            )
+        ):
+            objdata.value = await sync_to_async(_spool_value)(
+                getattr(objdata.value, "buffer", objdata.value), check_size
+            )
         elif not isinstance(objdata.value, File):
             objdata.value = File(objdata.value)
-        if content.net.max_upload_size is not None:
-            if content.net.max_upload_size < objdata.value.size:
-                raise ValueError("file too big")
+        check_size(objdata.value.size)
         size_new += objdata.value.size
+        content.size_file_cached = objdata.value.size
 
         def save_fn_value():
             content.file.delete(False)
@@ -345,7 +430,7 @@ async def _update_or_create_content_or_key(
             content.file.save("ignored", objdata.value)
 
     else:
-        size_new += await content.asize_file()
+        size_new += content.size_file
 
         def save_fn_value():
             content.updateId = uuid4()
@@ -413,9 +498,10 @@ async def _update_or_create_content_or_key(
 
             raise ValueError("Not signed by a cluster key")
         size_new += size_refs
+        content.size_references_cached = size_refs
     elif create:
         final_references = []
-        # size_new += 0
+        content.size_references_cached = 0
     else:
         size_new += content.size_references
 
@@ -484,14 +570,19 @@ async def _update_or_create_content_or_key(
                 raise ResourceLimitExceeded(
                     "Cannot use more resources of a net not owned"
                 )
-        if (
+        if net_sizes is not None:
+            # checked and updated in aggregate
+            net_sizes[content.net] = net_sizes.get(content.net, 0) + size_diff
+        elif (
             content.net.quota is not None
             and size_diff > 0
             and content.net.bytes_in_use + size_diff > content.net.quota
         ):
             raise ResourceLimitExceeded("quota exceeded")
         # still in memory not serialized to db
-        if not content.net.id:
+        if net_sizes is not None:
+            pass
+        elif not content.net.id:
             content.net.bytes_in_use += size_diff
         else:
             content.net.bytes_in_use = F("bytes_in_use") + size_diff
@@ -546,6 +637,11 @@ async def _update_or_create_content_or_key(
         return content
 
     setattr(save_fn, "content", content)
+    # for batch creation
+    setattr(save_fn, "value", objdata.value)
+    setattr(save_fn, "tags", final_tags)
+    setattr(save_fn, "references", final_references)
+    setattr(save_fn, "actions", getattr(actions_save_fn, "actions", []))
     return save_fn
 
 
@@ -581,9 +677,9 @@ async def create_key_fn(request, objdata: ContentInput, authset=None):
     publickey_content = None
     if objdata.cluster.id:
         publickey_content = await Content.objects.filter(
+            ContentTag.q_key_hashes(hashes, "tags__"),
             cluster=objdata.cluster,
             type="PublicKey",
-            tags__tag__in=map(lambda x: f"key_hash={x}", hashes),
         ).afirst()
     publickey_content = publickey_content or Content(cluster=objdata.cluster)
     # ensure public key values is not updated
@@ -673,6 +769,166 @@ async def create_content_fn(
     return save_fn
 
 
+async def create_contents_fn(
+    request,
+    objdatas: Iterable[ContentInput],
+    authset: Optional[Iterable[str]] = None,
+    required_keys: Optional[dict[int, Iterable[str]]] = None,
+):
+    """
+    Create many contents in one transaction.
+    Clusters are resolved once per distinct cluster, quotas are checked in aggregate
+    per net and contents, tags, references and actions are bulk inserted.
+    Keys use the single creation code path.
+
+    required_keys: required keys per cluster id
+    """
+    objdatas = list(objdatas)
+    clusters = {}
+    for objdata in objdatas:
+        if isinstance(objdata.cluster, str) and objdata.cluster not in clusters:
+            clusters[objdata.cluster] = await (
+                (
+                    await ids_to_results(
+                        request,
+                        objdata.cluster,
+                        Cluster,
+                        # create includes move permission
+                        scope="create",
+                        cacheName=None,
+                        authset=authset,
+                    )
+                )["Cluster"]["objects_without_public"]
+                .select_related("net")
+                .filter(markForDestruction=None)
+                .afirst()
+            )
+    net_sizes: dict[Net, int] = {}
+    # save_fn, is bulk
+    save_fns: list[tuple[Callable, bool]] = []
+    for objdata in objdatas:
+        if isinstance(objdata.cluster, str):
+            objdata.cluster = clusters[objdata.cluster]
+        if not objdata.cluster:
+            raise ValueError("No cluster")
+        cluster_required_keys = (required_keys or {}).get(objdata.cluster.id) or []
+        if not objdata.value:
+            save_fns.append(
+                (
+                    await create_content_fn(
+                        request,
+                        objdata,
+                        authset=authset,
+                        required_keys=cluster_required_keys,
+                    ),
+                    False,
+                )
+            )
+            continue
+        # like create_content_fn the net of the cluster is used
+        newdata = ContentMergedInput(
+            cluster=objdata.cluster,
+            contentHash=objdata.contentHash,
+            hidden=objdata.hidden,
+            **_value_to_dict(objdata.value),
+        )
+        save_fns.append(
+            (
+                await _update_or_create_content_or_key(
+                    request,
+                    Content(),
+                    newdata,
+                    authset,
+                    False,
+                    cluster_required_keys,
+                    net_sizes=net_sizes,
+                ),
+                True,
+            )
+        )
+
+    for net, size in net_sizes.items():
+        if net.quota is not None and size > 0 and net.bytes_in_use + size > net.quota:
+            raise ResourceLimitExceeded("quota exceeded")
+
+    @django_resolver
+    def save_fn(context=nullcontext):
+        if callable(context):
+            context = context()
+        bulk_fns = [fn for fn, is_bulk in save_fns if is_bulk]
+        contents = [fn.content for fn in bulk_fns]
+        connection = connections[router.db_for_write(Content)]
+        in_transaction = False
+        try:
+            with context:
+                in_transaction = connection.in_atomic_block
+                timestamp = now()
+                for net, size in net_sizes.items():
+                    Net.objects.filter(id=net.id).update(
+                        bytes_in_use=F("bytes_in_use") + size, last_used=timestamp
+                    )
+                for fn in bulk_fns:
+                    fn.content.updateId = uuid4()
+                    fn.content.file.save("ignored", fn.value, save=False)
+                # without returned ids the related objects cannot be bulk created
+                is_bulk_insert = connection.features.can_return_rows_from_bulk_insert
+                if is_bulk_insert:
+                    Content.objects.bulk_create(contents)
+                else:
+                    for content in contents:
+                        content.save()
+                ContentTag.objects.bulk_create(
+                    refresh_fields(
+                        chain.from_iterable(fn.tags or [] for fn in bulk_fns), "content"
+                    )
+                )
+                ContentReference.objects.bulk_create(
+                    refresh_fields(
+                        chain.from_iterable(fn.references or [] for fn in bulk_fns),
+                        "source",
+                        "target",
+                    )
+                )
+                actions = list(chain.from_iterable(fn.actions for fn in bulk_fns))
+                if actions:
+                    Action.objects.bulk_create(refresh_fields(actions, "cluster"))
+                    ContentAction.objects.bulk_create(
+                        refresh_fields(
+                            map(
+                                lambda x: x.contentAction,
+                                filter(lambda x: x.contentAction, actions),
+                            ),
+                            "content",
+                            "action",
+                        )
+                    )
+                results = [
+                    fn.content if is_bulk else fn()["content"]
+                    for fn, is_bulk in save_fns
+                ]
+        except BaseException:
+            # the files are written before the insert, remove them when the
+            # contents are rolled back or were not inserted
+            for content in contents:
+                if content.file and (in_transaction or content.pk is None):
+                    content.file.delete(False)
+            raise
+        # bulk_create emits no post_save
+        channel = get_secretgraph_channel()
+        if channel and is_bulk_insert and contents:
+            async_to_sync(channel.send)(
+                "content_or_cluster.created",
+                {
+                    "relay_ids": [content.flexid_cached for content in contents],
+                    "db_ids": [content.id for content in contents],
+                    "type": "Content",
+                },
+            )
+        return {"contents": results, "writeok": True}
+
+    return save_fn
+
+
 async def update_content_fn(
     request,
     content: Content,
@@ -174,6 +174,41 @@ def clean_deleteRecursive(group, val):
         return DeleteRecursive.TRUE.value
 
 
+def _resolve_reference_targets(
+    query, ids: set[int], names: set[str]
+) -> dict[int | str, Content]:
+    """
+    Map ids, flexids and key hashes to the contents of query in at most two queries.
+    Like first() the content with the lowest id wins if multiple match.
+    """
+    query = query.filter(markForDestruction=None)
+    result = {}
+
+    def _add(target, contentob):
+        if target not in result or contentob.id < result[target].id:
+            result[target] = contentob
+
+    if ids or names:
+        for contentob in query.filter(
+            Q(id__in=ids) | Q(flexid__in=names) | Q(flexid_cached__in=names)
+        ):
+            if contentob.id in ids:
+                _add(contentob.id, contentob)
+            if contentob.flexid in names:
+                _add(contentob.flexid, contentob)
+            if contentob.flexid_cached in names:
+                _add(contentob.flexid_cached, contentob)
+    if names:
+        # the direct way doesn't work
+        # subquery is necessary for chaining operations correctly
+        for tagob in ContentTag.objects.filter(
+            ContentTag.q_key_hashes(names),
+            content__in=query.filter(type="PublicKey"),
+        ).select_related("content"):
+            _add(tagob.tag.removeprefix("key_hash="), tagob.content)
+    return result
+
+
 def transform_references(
     content,
     references,
@@ -188,17 +223,36 @@ def transform_references(
     encrypt_target_hashes = set()
     deduplicate = set()
     is_transfer = False
-    injectable_keys = Content.objects.injected_keys()
     size = 0
-    for ref in references or []:
+    references = list(references or [])
+    # collect targets for resolving them in batches
+    existing_ids = set()
+    target_ids = set()
+    target_names = set()
+    for ref in references:
+        if isinstance(ref, ContentReference):
+            existing_ids.add(ref.target_id)
+        elif isinstance(ref.target, int):
+            target_ids.add(ref.target)
+        elif not isinstance(ref.target, Content):
+            target_names.add(ref.target)
+    allowed_map = _resolve_reference_targets(
+        allowed_targets, existing_ids.union(target_ids), target_names
+    )
+    # existing references are not checked for injected keys
+    injected_map = _resolve_reference_targets(
+        Content.objects.injected_keys(), target_ids, target_names
+    )
+    for ref in references:
         injected_ref = None
         refob = None
+        targetob = None
         if isinstance(ref, ContentReference):
             refob = ref
-            if not allowed_targets.filter(
-                id=refob.target_id, markForDestruction=None
-            ).exists():
+            targetob = allowed_map.get(refob.target_id)
+            if not targetob:
                 continue
+            refob.target = targetob
         else:
             injected_key = None
             if isinstance(ref.target, Content):
@@ -206,24 +260,8 @@ def transform_references(
                 # to add a second relation
                 targetob = ref.target
             else:
-                if isinstance(ref.target, int):
-                    q = Q(id=ref.target)
-                else:
-                    # the direct way doesn't work
-                    # subquery is necessary for chaining operations correctly
-                    q = (
-                        Q(flexid=ref.target)
-                        | Q(flexid_cached=ref.target)
-                        | Q(
-                            type="PublicKey",
-                            tags__tag=f"key_hash={ref.target}",
-                        )
-                    )
-
-                targetob = allowed_targets.filter(q, markForDestruction=None).first()
-                injected_key = injectable_keys.filter(
-                    q, markForDestruction=None
-                ).first()
+                targetob = allowed_map.get(ref.target)
+                injected_key = injected_map.get(ref.target)
             if targetob:
                 refob = ContentReference(
                     source=content,
@@ -256,7 +294,9 @@ def transform_references(
             if early_size_limit is not None and size > early_size_limit:
                 raise ResourceLimitExceeded("references exhausts resource limit ")
             # must be target
-            encrypt_target_hashes.add(injected_ref.contentHash.removeprefix("Key:"))
+            encrypt_target_hashes.add(
+                injected_ref.target.contentHash.removeprefix("Key:")
+            )
             # is not required to be in tags
             if not no_final_refs:
                 final_references.append(injected_ref)
@@ -335,6 +375,7 @@ async def update_content_metadata_fn(
             early_size_limit=early_op_limit,
         )
         size_diff += size_tags_new - content.size_tags
+        content.size_tags_cached = size_tags_new
 
         if operation in {
             MetadataOperations.APPEND,
@@ -417,6 +458,7 @@ async def update_content_metadata_fn(
     )
     if references is not None:
         size_diff += size_refs_new - content.size_references
+        content.size_references_cached = size_refs_new
     if refs_is_transfer or tags_is_transfer_type:
         raise ValueError("Cannot modify transfer objects")
 
@@ -446,7 +488,13 @@ async def update_content_metadata_fn(
             context = context()
         with context:
             content.updateId = uuid4()
-            content.save(update_fields=["updateId"])
+            content.save(
+                update_fields=[
+                    "updateId",
+                    "size_tags_cached",
+                    "size_references_cached",
+                ]
+            )
             content.net.save(
                 update_fields=["bytes_in_use", "last_used"] if content.net.id else None
             )
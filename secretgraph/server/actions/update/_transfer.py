@@ -45,6 +45,8 @@ def _create_info_content(request, content: Content, signatures):
     if found_references:
         size_before = content.size_references
         content.references.bulk_create(references, ignore_conflicts=True)
+        content.size_references_cached = content.calculate_size_references()
+        content.save(update_fields=["size_references_cached"])
         size_diff = content.size_references - size_before
         Net.objects.filter(id=content.net_id).update(
             bytes_in_use=F("bytes_in_use") + size_diff, last_used=Now()
@@ -56,6 +58,8 @@ def _create_info_content(request, content: Content, signatures):
             tags.append(ContentTag(tag=f"key_link={chash}={signature['link']}"))
         size_before = content.size_tags
         content.tags.bulk_create(tags, ignore_conflicts=True)
+        content.size_tags_cached = content.calculate_size_tags()
+        content.save(update_fields=["size_tags_cached"])
         size_diff = content.size_tags - size_before
         Net.objects.filter(id=content.net_id).update(
             bytes_in_use=F("bytes_in_use") + size_diff, last_used=Now()
@@ -140,11 +144,7 @@ async def transfer_value(
     elif response.status_code != 200:
         return TransferResult.ERROR
 
-    orig_size = 0
-    try:
-        orig_size = content.file.size
-    except Exception as exc:
-        logger.warning("Could not determinate file size", exc_info=exc)
+    orig_size = content.size_file
     # should be only one crypto parameters
     crypto_params = response.headers.get("X-CRYPTO-PARAMETERS", "")
     if crypto_params != "":
@@ -185,13 +185,21 @@ async def transfer_value(
     transfer_successful = False
 
     signatures = None
+    # track written bytes instead of querying the storage afterwards
+    new_size = 0
     try:
         with content.file.open("wb") as f:
+
+            def write_chunk(chunk):
+                nonlocal new_size
+                new_size += len(chunk)
+                f.write(chunk)
+
             signatures, errors = await verify_content(
                 s,
                 response,
                 key_hashes=key_hashes if key_hashes is not None else (),
-                write_chunk=f.write,
+                write_chunk=write_chunk,
             )
         if not signatures:
             # was a secretgraph content and verification failed
@@ -216,15 +224,18 @@ async def transfer_value(
         # file is maybe partially written, just reset to 0
         with content.file.open("wb") as f:
             f.write(b"")
+        new_size = 0
         if delete_on_error:
             destroy_content = True
         return TransferResult.ERROR
     finally:
         # first recalculate bytes usage
         await Net.objects.filter(id=content.net_id).aupdate(
-            bytes_in_use=F("bytes_in_use") - orig_size + content.file.size,
+            bytes_in_use=F("bytes_in_use") - orig_size + new_size,
             last_used=Now(),
         )
+        content.size_file_cached = new_size
+        await Content.objects.filter(id=content.id).aupdate(size_file_cached=new_size)
         if destroy_content:
             # then delete with the correct amount of bytes
             # why? adelete recalculates byte usage
@@ -239,11 +250,23 @@ async def transfer_value(
                 if await content.tags.filter(tag="freeze").aexists():
                     await content.tags.filter(tag="freeze").adelete()
                     await content.tags.acreate(ContentTag(tag="immutable"))
+                # transfer tags are removed
+                size_tags = await content.acalculate_size_tags()
+                if size_tags != content.size_tags:
+                    await Net.objects.filter(id=content.net_id).aupdate(
+                        bytes_in_use=F("bytes_in_use") - content.size_tags + size_tags
+                    )
+                    content.size_tags_cached = size_tags
                 # now we create a new update id
                 content.updateId = uuid4()
                 content.locked = None
                 await content.asave(
-                    update_fields=["locked", "updateId", "cryptoParameters"]
+                    update_fields=[
+                        "locked",
+                        "updateId",
+                        "cryptoParameters",
+                        "size_tags_cached",
+                    ]
                 )
 
         if not session:
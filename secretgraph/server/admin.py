@@ -7,7 +7,6 @@ from django.contrib import admin
 from django.db import transaction
 from django.db.models import F, QuerySet, Subquery
 from django.utils import timezone
-from strawberry import relay
 
 from secretgraph.server.utils.auth import (
     get_cached_net_properties,
@@ -250,7 +249,9 @@ class NetAdmin(admin.ModelAdmin):
         nullctx = nullcontext()
         with transaction.atomic():
             for net in queryset.select_for_update():
-                net.recalculate_bytes_in_use(nullctx, nolocking=True)
+                net.recalculate_bytes_in_use(
+                    nullctx, nolocking=True, refresh_contents=True
+                )
 
     def get_readonly_fields(self, request, obj: Optional[Net] = None):
         rfields = list(self.readonly_fields)
@@ -398,7 +399,8 @@ class ClusterAdmin(BeautifyNetMixin, FlexidMixin, admin.ModelAdmin):
         if change:
             old = Cluster.objects.all().filter(id=obj.id).first()
             if old.flexid != obj.flexid:
-                obj.flexid_cached = relay.to_base64(obj.flexid)
+                obj.flexid_cached = None
+                obj.generate_ids()
             if old.size != obj.size or old.net != obj.net:
                 old.net.bytes_in_use = F("bytes_in_use") - old.size
                 obj.net.bytes_in_use = F("bytes_in_use") + obj.size
@@ -410,8 +412,7 @@ class ClusterAdmin(BeautifyNetMixin, FlexidMixin, admin.ModelAdmin):
             else:
                 obj.save()
         else:
-            if obj.flexid:
-                obj.flexid_cached = relay.to_base64(obj.flexid)
+            obj.generate_ids()
 
             obj.net.bytes_in_use += len(obj.description)
             with transaction.atomic():
@@ -515,12 +516,15 @@ class ContentAdmin(BeautifyNetMixin, FlexidMixin, admin.ModelAdmin):
         if change:
             old = Content.objects.all().filter(id=obj.id).first()
             if old.flexid != obj.flexid:
-                obj.flexid_cached = relay.to_base64(obj.flexid)
+                obj.flexid_cached = None
+                obj.generate_ids()
+            if "file" in form.changed_data:
+                obj.size_file_cached = obj.calculate_size_file()
             old_size = old.size
             new_size = obj.size
             if old.net != obj.net or old_size != new_size:
                 old.net.bytes_in_use = F("bytes_in_use") - old_size
-                obj.net.bytes_in_use = F("bytes_in_use") + old_size
+                obj.net.bytes_in_use = F("bytes_in_use") + new_size
                 with transaction.atomic():
                     if old.net != obj.net:
                         old.net.save()
@@ -530,8 +534,8 @@ class ContentAdmin(BeautifyNetMixin, FlexidMixin, admin.ModelAdmin):
                 obj.save()
 
         else:
-            if obj.flexid:
-                obj.flexid_cached = relay.to_base64(obj.flexid)
+            obj.generate_ids()
+            obj.size_file_cached = obj.calculate_size_file()
             obj.net.bytes_in_use = F("bytes_in_use") + obj.size
             with transaction.atomic():
                 obj.net.save()
@@ -1,13 +1,11 @@
 __all__ = ["SecretgraphServerConfig"]
 
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from django.apps import AppConfig
-from django.core.signals import (
-    got_request_exception,
-    request_finished,
-    request_started,
-)
+from django.conf import settings
+from django.core.signals import got_request_exception, request_started
 from django.db.models.signals import (
     post_delete,
     post_migrate,
@@ -15,21 +13,22 @@ from django.db.models.signals import (
     pre_delete,
 )
 
+from ..core.utils.base_crypto import setCryptoExecutor, setParsedKeyCache
 from .signals import (
     deleteContentCb,
     deleteEncryptedFileCb,
     deleteSizeCommitCb,
     deleteSizePreCb,
     fillEmptyCb,
-    fillOldEmptyCb,
-    generateFlexidAndDownloadId,
     initializeDb,
+    invalidateActionCacheCb,
     notifyDeletion,
     notifyUpdateOrCreate,
     regenerateKeyHash,
     rollbackUsedActionsAndFreeze,
-    sweepOutdated,
 )
+from .strawberry_extensions import register_persisted_queries
+from .utils.maintenance import request_maintenance
 
 logger = logging.getLogger(__name__)
 
@@ -41,9 +40,27 @@ class SecretgraphServerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
 
     def ready(self):
-        from .models import Cluster, Content
+        from .models import Action, Cluster, Content
         from .utils.misc import get_secretgraph_channel
 
+        keygen_processes = getattr(settings, "SECRETGRAPH_KEYGEN_PROCESSES", 0)
+        setCryptoExecutor(
+            ThreadPoolExecutor(
+                max_workers=getattr(settings, "SECRETGRAPH_CRYPTO_THREADS", None),
+                thread_name_prefix="secretgraph_crypto",
+            ),
+            keygenExecutor=ProcessPoolExecutor(max_workers=keygen_processes)
+            if keygen_processes
+            else None,
+            threshold=getattr(settings, "SECRETGRAPH_CRYPTO_INLINE_SIZE", None),
+        )
+        setParsedKeyCache(
+            size=getattr(settings, "SECRETGRAPH_PARSED_KEY_CACHE_SIZE", None),
+            privateKeys=getattr(settings, "SECRETGRAPH_CACHE_PRIVATE_KEYS", None),
+        )
+        if getattr(settings, "SECRETGRAPH_PERSISTED_QUERIES", True):
+            register_persisted_queries()
+
         pre_delete.connect(
             deleteContentCb,
             sender=Content,
@@ -76,23 +93,17 @@ class SecretgraphServerConfig(AppConfig):
             dispatch_uid="secretgraph_ClusterdeleteSizeCommitCb",
         )
 
+        # cached action values are keyed by id, keyHash, nonce and start/stop,
+        # so only changes of actions are relevant
         post_save.connect(
-            generateFlexidAndDownloadId,
-            sender=Cluster,
-            dispatch_uid="secretgraph_ClustergenerateFlexid",
+            invalidateActionCacheCb,
+            sender=Action,
+            dispatch_uid="secretgraph_ActioninvalidateActionCache",
         )
-
-        post_save.connect(
-            generateFlexidAndDownloadId,
-            sender=Content,
-            dispatch_uid="secretgraph_ContentgenerateFlexid",
-        )
-
-        # in case some uninitialized lurk around
-        request_finished.connect(
-            fillOldEmptyCb,
-            sender=self,
-            dispatch_uid="secretgraph_fillOldEmptyCb",
+        post_delete.connect(
+            invalidateActionCacheCb,
+            sender=Action,
+            dispatch_uid="secretgraph_ActioninvalidateActionCacheDelete",
         )
 
         if get_secretgraph_channel() and hasattr(post_save, "asend"):
@@ -146,8 +157,9 @@ class SecretgraphServerConfig(AppConfig):
             sender=self,
             dispatch_uid="secretgraph_rollbackUsedActionsAndFreeze",
         )
-        request_started.connect(
-            sweepOutdated,
-            sender=self,
-            dispatch_uid="secretgraph_sweepContentsAndClusters",
-        )
+        # for tiny installs without lifespan support or external scheduler
+        if getattr(settings, "SECRETGRAPH_MAINTENANCE", "lifespan") == "request":
+            request_started.connect(
+                request_maintenance,
+                dispatch_uid="secretgraph_requestMaintenance",
+            )
@@ -0,0 +1,28 @@
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Run the maintenance tasks (sweep, unlock, fill ids, upgrade key hashes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-f",
+            "--force",
+            action="store_true",
+            help="Ignore the interval since the last run",
+        )
+        parser.add_argument(
+            "-l",
+            "--loop",
+            action="store_true",
+            help="Run forever, every SECRETGRAPH_MAINTENANCE_INTERVAL seconds",
+        )
+
+    def handle(self, force, loop, **options):
+        from ...utils.maintenance import maintenance_loop, run_maintenance
+
+        if loop:
+            async_to_sync(maintenance_loop)()
+        elif not async_to_sync(run_maintenance)(force=force):
+            self.stderr.write("Maintenance is not due or runs elsewhere")
@@ -135,7 +135,7 @@ class Command(BaseCommand):
                 injectedKeys = Content.objects.filter(
                     Exists(
                         ContentTag.objects.filter(
-                            content_id=OuterRef("id", tag__in=hashes)
+                            ContentTag.q_in(hashes), content_id=OuterRef("id")
                         )
                     ),
                     cluster__name="@system",
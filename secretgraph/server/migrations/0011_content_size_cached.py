@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:30
+
+from django.db import migrations, models
+from django.db.models.functions import Length
+
+
+def forwards(apps, schema_editor):
+    Content = apps.get_model("secretgraph", "Content")
+    for content in Content.objects.all().iterator():
+        try:
+            content.size_file_cached = content.file.size
+        except Exception:
+            content.size_file_cached = 0
+        tags = (
+            content.tags.exclude(tag__in=["freeze", "immutable"])
+            .annotate(size=Length("tag"))
+            .aggregate(size_sum=models.Sum("size"))
+        )
+        content.size_tags_cached = tags["size_sum"] or 0
+        refs = content.references.annotate(size=Length("extra")).aggregate(
+            size_sum=models.Sum("size"), count=models.Count("id")
+        )
+        content.size_references_cached = (refs["size_sum"] or 0) + refs["count"] * 28
+        content.save(
+            update_fields=[
+                "size_file_cached",
+                "size_tags_cached",
+                "size_references_cached",
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("secretgraph", "0010_remove_content_nonce"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="content",
+            name="size_file_cached",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="content",
+            name="size_references_cached",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="content",
+            name="size_tags_cached",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
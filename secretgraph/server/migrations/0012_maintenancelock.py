@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("secretgraph", "0011_content_size_cached"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MaintenanceLock",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("holder", models.CharField(blank=True, default="", max_length=36)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("last_run", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
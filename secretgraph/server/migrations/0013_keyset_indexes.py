@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("secretgraph", "0012_maintenancelock"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cluster",
+            index=models.Index(fields=["updated", "id"], name="cluster_keyset"),
+        ),
+        migrations.AddIndex(
+            model_name="content",
+            index=models.Index(fields=["updated", "id"], name="content_keyset"),
+        ),
+    ]
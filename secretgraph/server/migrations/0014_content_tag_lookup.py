@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:57
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    ContentTag = apps.get_model("secretgraph", "ContentTag")
+    batch = []
+    for tag in ContentTag.objects.only("id", "tag").iterator(chunk_size=2000):
+        tag.tag_prefix = tag.tag[:255]
+        tag.tag_digest = hashlib.sha256(tag.tag.encode("utf8")).hexdigest()
+        batch.append(tag)
+        if len(batch) >= 2000:
+            ContentTag.objects.bulk_update(batch, ["tag_prefix", "tag_digest"])
+            batch = []
+    if batch:
+        ContentTag.objects.bulk_update(batch, ["tag_prefix", "tag_digest"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("secretgraph", "0013_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contenttag",
+            name="tag_digest",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="contenttag",
+            name="tag_prefix",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("secretgraph", "0014_content_tag_lookup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contenttag",
+            index=models.Index(
+                condition=models.Q(("tag_prefix__startswith", "key_hash=")),
+                fields=["tag_digest", "content"],
+                name="contenttag_key_hash",
+            ),
+        ),
+    ]
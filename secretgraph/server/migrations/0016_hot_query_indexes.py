@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("secretgraph", "0015_content_tag_key_hash_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="action",
+            index=models.Index(fields=["keyHash", "start", "stop"], name="action_key"),
+        ),
+        migrations.AddIndex(
+            model_name="content",
+            index=models.Index(
+                condition=models.Q(("markForDestruction__isnull", True)),
+                fields=["cluster", "type", "state", "updated"],
+                name="content_alive",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="content",
+            index=models.Index(
+                condition=models.Q(("markForDestruction__isnull", False)),
+                fields=["markForDestruction"],
+                name="content_destruction",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contentreference",
+            index=models.Index(fields=["source", "group"], name="reference_source"),
+        ),
+        migrations.AddIndex(
+            model_name="contentreference",
+            index=models.Index(fields=["target", "group"], name="reference_target"),
+        ),
+    ]
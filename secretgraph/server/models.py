@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import posixpath
 import secrets
@@ -14,7 +15,7 @@ from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
 from django.core.files.base import File
 from django.core.files.storage import default_storage
 from django.core.validators import MinLengthValidator
-from django.db import models, transaction
+from django.db import IntegrityError, models, transaction
 from django.db.models.functions import Concat, Length, Substr
 from django.urls import reverse
 from django.utils import timezone
@@ -87,7 +88,15 @@ class Key(TypedDict):
     link: Optional[str]  # link to private key when allowed to
 
 
-class FlexidManager(models.Manager):
+class FlexidQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.generate_ids()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class FlexidManager(models.Manager.from_queryset(FlexidQuerySet)):
     def get_by_natural_key(self, flexid_cached):
         return self.get(flexid_cached=flexid_cached)
 
@@ -107,6 +116,29 @@ class FlexidModel(models.Model):
     def natural_key(self):
         return (self.flexid_cached,)
 
+    def generate_ids(self, force=False):
+        """Assign missing (or with force: new) ids, e.g. before inserting"""
+        if force or not self.flexid:
+            self.flexid = str(uuid4())
+            self.flexid_cached = None
+        if not self.flexid_cached:
+            self.flexid_cached = relay.to_base64(type(self).__name__, self.flexid)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        generated = not self.flexid
+        self.generate_ids()
+        if not generated:
+            return super().save(*args, **kwargs)
+        try:
+            with transaction.atomic(using=kwargs.get("using")):
+                return super().save(*args, **kwargs)
+        except IntegrityError:
+            # very unlikely, retry once with new ids
+            self.generate_ids(force=True)
+            return super().save(*args, **kwargs)
+
 
 class NamedManager(models.Manager):
     def get_by_natural_key(self, name):
@@ -166,27 +198,6 @@ class Net(models.Model):
     clusters: models.ManyToOneRel["Cluster"]
     contents: models.ManyToOneRel["Content"]
 
-    @staticmethod
-    def _size_tags(net_id) -> int:
-        # exclude freeze, immutable from size calculation
-        tags = (
-            ContentTag.objects.filter(content__net_id=net_id)
-            .exclude(tag__in=["freeze", "immutable"])
-            .annotate(size=Length("tag"))
-            .aggregate(size_sum=models.Sum("size"))
-        )
-        return tags["size_sum"] or 0
-
-    @staticmethod
-    def _size_references(net_id) -> int:
-        refs = (
-            ContentReference.objects.filter(source__net_id=net_id)
-            .annotate(size=Length("extra"))
-            .aggregate(size_sum=models.Sum("size"), count=models.Count("id"))
-        )
-        # include target id size and group field
-        return (refs["size_sum"] or 0) + refs["count"] * 28
-
     def calculate_bytes_in_use(self):
         # should be used with locked net and in transaction
         # or with nets, clusters, contents not in use e.g. maintainance work
@@ -198,11 +209,18 @@ class Net(models.Model):
             "count"
         ] * FlexidModel.flexid_byte_size
 
-        # contents are complicated
-        for c in self.contents.all():
-            size += c.size_file + FlexidModel.flexid_byte_size
-        size += self._size_tags(self.id)
-        size += self._size_references(self.id)
+        # contents store their sizes, so no storage calls are required
+        acontents = self.contents.aggregate(
+            size_sum=models.Sum(
+                models.F("size_file_cached")
+                + models.F("size_tags_cached")
+                + models.F("size_references_cached")
+            ),
+            count=models.Count("id"),
+        )
+        size += (acontents["size_sum"] or 0) + acontents[
+            "count"
+        ] * FlexidModel.flexid_byte_size
         return size
 
     acalculate_bytes_in_use = sync_to_async(calculate_bytes_in_use)
@@ -213,13 +231,19 @@ class Net(models.Model):
     def reset_max_upload_size(self):
         self.max_upload_size = default_net_limit(self, "SECRETGRAPH_MAX_UPLOAD")
 
-    def recalculate_bytes_in_use(self, context=transaction.atomic, nolocking=False):
+    def recalculate_bytes_in_use(
+        self, context=transaction.atomic, nolocking=False, refresh_contents=False
+    ):
+        """refresh_contents: recalculate the stored content sizes from storage"""
         if callable(context):
             context = context()
         with context:
             obj: Net = (
-                self if nolocking else self.objects.select_for_update().get(id=self.id)
+                self if nolocking else Net.objects.select_for_update().get(id=self.id)
             )
+            if refresh_contents:
+                for c in obj.contents.all():
+                    c.update_size_cache()
             obj.bytes_in_use = obj.calculate_bytes_in_use()
             obj.save(update_fields=["bytes_in_use"])
 
@@ -317,6 +341,12 @@ class Cluster(FlexidModel):
     primaryFor: models.OneToOneRel[Net]
     groups: models.ManyToManyRel["ClusterGroup"]
 
+    class Meta:
+        indexes = [
+            # keyset pagination
+            models.Index(fields=["updated", "id"], name="cluster_keyset"),
+        ]
+
     def natural_key(self):
         if self.name.startswith("@"):
             return self.name
@@ -396,7 +426,7 @@ class Cluster(FlexidModel):
         )
 
 
-class ContentManager(models.Manager):
+class ContentManager(FlexidManager):
     # prevent async issues
     def get_queryset(self):
         return super().get_queryset().select_related("net", "cluster")
@@ -501,6 +531,12 @@ class Content(FlexidModel):
     file: File = models.FileField(upload_to=get_content_file_path)
     # internal field for orphan calculation and storage priorization
     file_accessed: dt = models.DateTimeField(null=True, blank=True, editable=False)
+    # stored sizes for net accounting, maintained by the update pathes
+    size_file_cached: int = models.PositiveBigIntegerField(default=0, editable=False)
+    size_tags_cached: int = models.PositiveBigIntegerField(default=0, editable=False)
+    size_references_cached: int = models.PositiveBigIntegerField(
+        default=0, editable=False
+    )
     # unique hash for content, e.g. generated from some tags
     # null if multiple contents are allowed
     contentHash: str = models.CharField(
@@ -536,15 +572,36 @@ class Content(FlexidModel):
                 fields=["contentHash", "cluster_id"], name="unique_content"
             )
         ]
+        indexes = [
+            # keyset pagination
+            models.Index(fields=["updated", "id"], name="content_keyset"),
+            # fetch_contents/do_query, deleted contents are rarely queried
+            models.Index(
+                fields=["cluster", "type", "state", "updated"],
+                condition=models.Q(markForDestruction__isnull=True),
+                name="content_alive",
+            ),
+            # sweepOutdated
+            models.Index(
+                fields=["markForDestruction"],
+                condition=models.Q(markForDestruction__isnull=False),
+                name="content_destruction",
+            ),
+        ]
         # Causes errors, so keep it disabled
         # order_with_respect_to = "cluster"
 
+    def generate_ids(self, force=False):
+        super().generate_ids(force=force)
+        if force or not self.downloadId:
+            self.downloadId = str(uuid4())
+
     def load_pubkey(self):
         """Works only for public keys (special Content)"""
         if self.type != "PrivateKey" and self.type != "PublicKey":
             return None
         if self.type == "PublicKey":
-            with self.value.open("rb") as rob:
+            with self.file.open("rb") as rob:
                 return rob.read()
         else:
             pubkey = ContentReference.objects.filter(
@@ -590,8 +647,7 @@ class Content(FlexidModel):
         # path to raw view
         return reverse("secretgraph:contents", kwargs={"id": self.downloadId})
 
-    @property
-    def size_file(self) -> int:
+    def calculate_size_file(self) -> int:
         file_size = 0
         try:
             file_size = self.file.size
@@ -599,8 +655,7 @@ class Content(FlexidModel):
             logger.warning("Could not determinate file size", exc_info=exc)
         return file_size
 
-    @property
-    def size_tags(self) -> int:
+    def calculate_size_tags(self) -> int:
         # exclude freeze, immutable from size calculation
         tags = (
             self.tags.exclude(tag__in=["freeze", "immutable"])
@@ -609,35 +664,64 @@ class Content(FlexidModel):
         )
         return tags["size_sum"] or 0
 
-    @sync_to_async
-    def asize_tags(self) -> int:
-        return self.size_tags
+    acalculate_size_tags = sync_to_async(calculate_size_tags)
 
-    @property
-    def size_references(self) -> int:
+    def calculate_size_references(self) -> int:
         refs = self.references.annotate(size=Length("extra")).aggregate(
             size_sum=models.Sum("size"), count=models.Count("id")
         )
         # include target id size and group field
         return (refs["size_sum"] or 0) + refs["count"] * 28
 
-    @sync_to_async
-    def asize_references(self) -> int:
-        return self.size_references
+    acalculate_size_references = sync_to_async(calculate_size_references)
+
+    def update_size_cache(self, save=True) -> int:
+        """Recalculate the stored sizes, only for repairs (requires storage I/O)"""
+        self.size_file_cached = self.calculate_size_file()
+        self.size_tags_cached = self.calculate_size_tags()
+        self.size_references_cached = self.calculate_size_references()
+        if save:
+            self.save(
+                update_fields=[
+                    "size_file_cached",
+                    "size_tags_cached",
+                    "size_references_cached",
+                ]
+            )
+        return self.size
+
+    @property
+    def size_file(self) -> int:
+        return self.size_file_cached
+
+    async def asize_file(self) -> int:
+        return self.size_file_cached
+
+    @property
+    def size_tags(self) -> int:
+        return self.size_tags_cached
+
+    async def asize_tags(self) -> int:
+        return self.size_tags_cached
+
+    @property
+    def size_references(self) -> int:
+        return self.size_references_cached
+
+    async def asize_references(self) -> int:
+        return self.size_references_cached
 
     @property
     def size(self) -> int:
-        size = self.size_file + self.flexid_byte_size
-        size += self.size_tags
-        size += self.size_references
-        return size
+        return (
+            self.size_file_cached
+            + self.size_tags_cached
+            + self.size_references_cached
+            + self.flexid_byte_size
+        )
 
-    @sync_to_async
-    def asize(self) -> int:
-        size = self.size_file + self.flexid_byte_size
-        size += self.size_tags
-        size += self.size_references
-        return size
+    async def asize(self) -> int:
+        return self.size
 
     def get_absolute_url(self):
         return self.link
@@ -651,8 +735,10 @@ class Content(FlexidModel):
         if keyhashes is None:
             q = models.Q(target__in=allowed)
         else:
-            for k in keyhashes:
-                q |= models.Q(target__tags__tag=f"key_hash={k}")
+            keyhashes = list(keyhashes)
+            # no keyhashes: no restriction
+            if keyhashes:
+                q = ContentTag.q_key_hashes(keyhashes, "target__tags__")
         splitted = reverse("secretgraph:contents", kwargs={"id": "__value__"}).rsplit(
             "__value__", 1
         )
@@ -682,8 +768,10 @@ class Content(FlexidModel):
         if keyhashes is None:
             q = models.Q(target__in=allowed)
         else:
-            for k in keyhashes:
-                q |= models.Q(target__tags__tag=f"key_hash={k}")
+            keyhashes = list(keyhashes)
+            # no keyhashes: no restriction
+            if keyhashes:
+                q = ContentTag.q_key_hashes(keyhashes, "target__tags__")
 
         splitted = reverse("secretgraph:contents", kwargs={"id": "__value__"}).rsplit(
             "__value__", 1
@@ -857,6 +945,10 @@ class Action(models.Model):
                 name="%(class)s_exist",
             ),
         ]
+        indexes = [
+            # retrieve_allowed_objects
+            models.Index(fields=["keyHash", "start", "stop"], name="action_key"),
+        ]
 
     def __str__(self) -> str:
         return self.keyHash
@@ -869,13 +961,33 @@ class Action(models.Model):
         )
 
 
+class ContentTagQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.update_lookup_fields()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class ContentTag(models.Model):
+    # bounded, indexed part of the tag for startswith lookups
+    prefix_length: int = 255
+
     id: int = models.BigAutoField(primary_key=True, editable=False)
     content: Content = models.ForeignKey(
         Content, related_name="tags", on_delete=models.CASCADE
     )
     # searchable tag content
     tag: str = models.TextField(blank=False, null=False)
+    # indexed lookup fields, maintained on save and bulk_create
+    tag_prefix: str = models.CharField(
+        max_length=prefix_length, db_index=True, editable=False, default=""
+    )
+    tag_digest: str = models.CharField(
+        max_length=64, db_index=True, editable=False, default=""
+    )
+
+    objects = models.Manager.from_queryset(ContentTagQuerySet)()
 
     class Meta:
         constraints = [
@@ -883,6 +995,81 @@ class ContentTag(models.Model):
                 fields=["content", "tag"], name="unique_content_tag"
             ),
         ]
+        indexes = [
+            # compact index for key, signature and transfer lookups by hash
+            models.Index(
+                fields=["tag_digest", "content"],
+                condition=models.Q(tag_prefix__startswith="key_hash="),
+                name="contenttag_key_hash",
+            ),
+        ]
+
+    @classmethod
+    def lookup_fields(cls, tag: str) -> dict[str, str]:
+        """Values of the lookup fields, e.g. for update()"""
+        return {
+            "tag_prefix": tag[: cls.prefix_length],
+            "tag_digest": hashlib.sha256(tag.encode("utf8")).hexdigest(),
+        }
+
+    def update_lookup_fields(self):
+        for key, val in self.lookup_fields(self.tag).items():
+            setattr(self, key, val)
+
+    def save(self, *args, **kwargs):
+        self.update_lookup_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "tag" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "tag_prefix", "tag_digest"}
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def q_equal(cls, tag: str, relation: str = "") -> models.Q:
+        """
+        Indexed equality lookup, relation is the path to the tags, e.g. "tags__"
+        """
+        return models.Q(
+            **{
+                f"{relation}tag_digest": cls.lookup_fields(tag)["tag_digest"],
+                f"{relation}tag": tag,
+            }
+        )
+
+    @classmethod
+    def q_in(cls, tags: Iterable[str], relation: str = "") -> models.Q:
+        tags = set(tags)
+        return models.Q(
+            **{
+                f"{relation}tag_digest__in": [
+                    cls.lookup_fields(tag)["tag_digest"] for tag in tags
+                ],
+                f"{relation}tag__in": tags,
+            }
+        )
+
+    @classmethod
+    def q_key_hashes(cls, keyhashes: Iterable[str], relation: str = "") -> models.Q:
+        """
+        Indexed lookup of key_hash= tags, uses the compact key hash index
+        """
+        return models.Q(
+            cls.q_in((f"key_hash={keyhash}" for keyhash in keyhashes), relation),
+            **{f"{relation}tag_prefix__startswith": "key_hash="},
+        )
+
+    @classmethod
+    def q_startswith(cls, prefix: str, relation: str = "") -> models.Q:
+        """
+        Indexed startswith lookup, relation is the path to the tags, e.g. "tags__"
+        """
+        if len(prefix) <= cls.prefix_length:
+            return models.Q(**{f"{relation}tag_prefix__startswith": prefix})
+        return models.Q(
+            **{
+                f"{relation}tag_prefix": prefix[: cls.prefix_length],
+                f"{relation}tag__startswith": prefix,
+            }
+        )
 
     def __str__(self):
         return self.tag
@@ -957,6 +1144,11 @@ class ContentReference(models.Model):
                 fields=["source", "target", "group"], name="%(class)s_unique"
             ),
         ]
+        indexes = [
+            # signatures, keys, transfers and deletion
+            models.Index(fields=["source", "group"], name="reference_source"),
+            models.Index(fields=["target", "group"], name="reference_target"),
+        ]
 
     def __repr__(self):
         return '<ContentReference: (%r:"%s":%r)>' % (
@@ -1128,3 +1320,15 @@ class ClusterGroup(NamedBase):
                 "managed"
             )
         )
+
+
+class MaintenanceLock(models.Model):
+    """Lease for electing the process which runs the maintenance tasks"""
+
+    name: str = models.CharField(max_length=50, primary_key=True)
+    holder: str = models.CharField(max_length=36, blank=True, default="")
+    locked_until: Optional[dt] = models.DateTimeField(null=True, blank=True)
+    last_run: Optional[dt] = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,173 @@
+from functools import partial
+from typing import Callable, Optional
+
+from django.db.models import Count, F, Max, Min, Q, Value
+from django.db.models.functions import Concat
+from strawberry.dataloader import DataLoader
+
+from ...actions.fetch import fetch_contents
+from ...models import (
+    Action,
+    Cluster,
+    Content,
+    ContentReference,
+    ContentTag,
+    SGroupProperty,
+)
+from ...utils.auth import get_cached_result
+
+
+def get_loader(request, load_fn: Callable, *args) -> DataLoader:
+    """
+    Request scoped DataLoader, batches per node lookups of a connection page.
+    args are part of the cache key and passed to load_fn before the keys
+    """
+    loaders = getattr(request, "secretgraphLoaders", None)
+    if loaders is None:
+        loaders = {}
+        setattr(request, "secretgraphLoaders", loaders)
+    cache_key = (load_fn, *args)
+    if cache_key not in loaders:
+        loaders[cache_key] = DataLoader(load_fn=partial(load_fn, request, *args))
+    return loaders[cache_key]
+
+
+def annotate_reference_relay_id(queryset):
+    return queryset.annotate(
+        relay_id=Concat(
+            F("source__flexid"),
+            Value("|"),
+            F("target__flexid"),
+            Value("|"),
+            F("group"),
+        )
+    )
+
+
+async def load_tags(
+    request,
+    includeTags: tuple[str, ...],
+    excludeTags: tuple[str, ...],
+    content_ids: list[int],
+) -> list[list[str]]:
+    incl_filters = Q()
+    excl_filters = Q()
+    for i in includeTags:
+        incl_filters |= ContentTag.q_startswith(i)
+
+    for i in excludeTags:
+        excl_filters |= ContentTag.q_startswith(i)
+    tags = {content_id: [] for content_id in content_ids}
+    async for content_id, tag in ContentTag.objects.filter(
+        ~excl_filters & incl_filters, content_id__in=content_ids
+    ).values_list("content_id", "tag"):
+        tags[content_id].append(tag)
+    return [tags[content_id] for content_id in content_ids]
+
+
+async def load_clusters(request, cluster_ids: list[int]) -> list[Optional[Cluster]]:
+    clusters = {
+        cluster.id: cluster
+        async for cluster in Cluster.objects.filter(id__in=cluster_ids)
+    }
+    return [clusters.get(cluster_id) for cluster_id in cluster_ids]
+
+
+async def load_cluster_visibility(
+    request, public: bool, cluster_ids: list[int]
+) -> list[bool]:
+    results = get_cached_result(request, ensureInitialized=False)
+    if public:
+        query = (await results.aat("Cluster"))["objects_with_public"]
+    else:
+        query = (await results.aat("Cluster"))["objects_without_public"]
+    visible = {
+        cluster_id
+        async for cluster_id in query.filter(id__in=cluster_ids).values_list(
+            "id", flat=True
+        )
+    }
+    return [cluster_id in visible for cluster_id in cluster_ids]
+
+
+async def load_read_statistics(request, content_ids: list[int]) -> list[dict]:
+    """Uses fetch/view group actions to provide statistics"""
+    statistics = {
+        row.pop("contentAction__content_id"): row
+        async for row in Action.objects.filter(
+            contentAction__content_id__in=content_ids,
+            contentAction__group__in=("fetch", "view"),
+        )
+        .values("contentAction__content_id")
+        .annotate(
+            last=Max("used"),
+            first=Min("used"),
+            count=Count("used"),
+            totalAmount=Count("id"),
+        )
+        .order_by()
+    }
+    empty = {"last": None, "first": None, "count": 0, "totalAmount": 0}
+    return [statistics.get(content_id, empty) for content_id in content_ids]
+
+
+async def load_properties(
+    request, allow_hidden: bool, cluster_ids: list[int]
+) -> list[list[str]]:
+    filters = {"clusterGroups__clusters__in": cluster_ids}
+    if not allow_hidden:
+        # must be in the same filter call for using the same group
+        filters["clusterGroups__hidden"] = False
+    query = SGroupProperty.objects.filter(**filters)
+    properties = {cluster_id: [] for cluster_id in cluster_ids}
+    async for cluster_id, name in query.values_list(
+        "clusterGroups__clusters", "name"
+    ).distinct():
+        properties[cluster_id].append(name)
+    return [properties[cluster_id] for cluster_id in cluster_ids]
+
+
+async def load_contents(request, content_ids: list[int]) -> list[Optional[Content]]:
+    """Visible, unlocked contents, e.g. of reference sources or targets"""
+    query = (await get_cached_result(request, ensureInitialized=False).aat("Content"))[
+        "objects_with_public"
+    ]
+    contents = {
+        content.id: content
+        async for content in fetch_contents(
+            query.filter(id__in=content_ids),
+            clustersAreRestrictedOrAdmin=True,
+        ).filter(locked__isnull=True)
+    }
+    return [contents.get(content_id) for content_id in content_ids]
+
+
+async def load_references(
+    request,
+    field: str,
+    groups: Optional[tuple[str, ...]],
+    contentFilters: tuple[tuple[str, Optional[tuple[str, ...]]], ...],
+    content_ids: list[int],
+) -> list[list[ContentReference]]:
+    """
+    References of contents, field is the side of the contents (source or target).
+    contentFilters are passed to fetch_contents for the other side
+    """
+    other_field = "target" if field == "source" else "source"
+    query = (await get_cached_result(request, ensureInitialized=False).aat("Content"))[
+        "objects_with_public"
+    ].exclude(hidden=True)
+    filterob = {
+        f"{field}_id__in": content_ids,
+        f"{other_field}__in": fetch_contents(
+            query, clustersAreRestrictedOrAdmin=True, **dict(contentFilters)
+        ).filter(locked__isnull=True),
+    }
+    if groups is not None:
+        filterob["group__in"] = groups
+    references = {content_id: [] for content_id in content_ids}
+    async for reference in annotate_reference_relay_id(
+        ContentReference.objects.filter(**filterob)
+    ).order_by("id"):
+        references[getattr(reference, f"{field}_id")].append(reference)
+    return [references[content_id] for content_id in content_ids]
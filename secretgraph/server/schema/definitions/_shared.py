@@ -1,20 +1,141 @@
+import json
 import logging
 from datetime import datetime
-from typing import Optional, Union
+from typing import Any, Optional, Union
 from uuid import UUID
 
 import strawberry
 import strawberry_django
-from django.db.models import Q
+from django.db.models import Q, QuerySet
+from strawberry.relay import ListConnection, PageInfo, from_base64, to_base64
+from strawberry.relay.types import NodeType
 from strawberry.types import Info
+from strawberry.types.base import StrawberryContainer, get_object_definition
+from strawberry.utils.inspect import in_async_context
 
 from ....core import constants
 from ...models import Cluster, Content
 from ...utils.auth import (
     ain_cached_net_properties_or_user_special,
     get_cached_result,
-    retrieve_allowed_objects,
 )
+from ._loaders import get_loader, load_properties
+
+
+def _keyset_filter(cursor: str, argument: str, lookup: str) -> Q:
+    cursor_type, value = from_base64(cursor)
+    if cursor_type != KeysetConnection.CURSOR_PREFIX:
+        raise TypeError(f"Argument '{argument}' contains a non-existing value.")
+    updated, id = json.loads(value)
+    updated = datetime.fromisoformat(updated)
+    return Q(**{f"updated__{lookup}": updated}) | Q(
+        **{"updated": updated, f"id__{lookup}": id}
+    )
+
+
+@strawberry.type(name="Connection", description="A connection to a list of items.")
+class KeysetConnection(ListConnection[NodeType]):
+    """
+    Paginates querysets by (updated, id) instead of offsets,
+    so deep pages cost the same as the first page
+    """
+
+    CURSOR_PREFIX = "keyset"
+
+    @classmethod
+    def resolve_connection(
+        cls,
+        nodes,
+        *,
+        info: Info,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        first: Optional[int] = None,
+        last: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        if not isinstance(nodes, QuerySet):
+            return super().resolve_connection(
+                nodes,
+                info=info,
+                before=before,
+                after=after,
+                first=first,
+                last=last,
+                **kwargs,
+            )
+        max_results = info.schema.config.relay_max_results
+        for argument, value in (("first", first), ("last", last)):
+            if value is None:
+                continue
+            if value < 0:
+                raise ValueError(
+                    f"Argument '{argument}' must be a non-negative integer."
+                )
+            if value > max_results:
+                raise ValueError(
+                    f"Argument '{argument}' cannot be higher than {max_results}."
+                )
+        if after:
+            nodes = nodes.filter(_keyset_filter(after, "after", "gt"))
+        if before:
+            nodes = nodes.filter(_keyset_filter(before, "before", "lt"))
+        backwards = first is None and last is not None
+        if backwards:
+            limit = last
+            nodes = nodes.order_by("-updated", "-id")
+        else:
+            limit = max_results if first is None else first
+            nodes = nodes.order_by("updated", "id")
+        # fetch one more for detecting further pages
+        nodes = nodes[: limit + 1]
+
+        type_def = get_object_definition(cls)
+        assert type_def
+        edge_class = type_def.get_field("edges").resolve_type(type_definition=type_def)
+        while isinstance(edge_class, StrawberryContainer):
+            edge_class = edge_class.of_type
+
+        def build(items: list) -> KeysetConnection:
+            has_more = len(items) > limit
+            items = items[:limit]
+            if backwards:
+                items.reverse()
+                has_previous_page = has_more
+                has_next_page = bool(before)
+            else:
+                has_previous_page = bool(after)
+                has_next_page = has_more
+                if last is not None and len(items) > last:
+                    items = items[-last:]
+                    has_previous_page = True
+            edges = [
+                edge_class(
+                    cursor=to_base64(
+                        cls.CURSOR_PREFIX,
+                        json.dumps([item.updated.isoformat(), item.id]),
+                    ),
+                    node=cls.resolve_node(item, info=info, **kwargs),
+                )
+                for item in items
+            ]
+            return cls(
+                edges=edges,
+                page_info=PageInfo(
+                    start_cursor=edges[0].cursor if edges else None,
+                    end_cursor=edges[-1].cursor if edges else None,
+                    has_previous_page=has_previous_page,
+                    has_next_page=has_next_page,
+                ),
+            )
+
+        if in_async_context():
+
+            async def resolver():
+                return build([item async for item in nodes])
+
+            return resolver()
+        return build(list(nodes))
 
 
 @strawberry.type
@@ -127,27 +248,27 @@ class SBaseTypesMixin:
     async def auth(self: Union[Content, Cluster], info: Info) -> Optional[SGAuthResult]:
         if self.limited or self.reduced:
             return None
+        # not available for deleted nodes
+        if self.markForDestruction:
+            return None
         # e.g. via node direct
         viewresult = get_cached_result(info.context["request"], ensureInitialized=False)
+        # evaluated once per request for all nodes
+        auth_results = get_cached_result(
+            info.context["request"],
+            authset=viewresult.authset,
+            scope="auth",
+            cacheName="secretgraphAuthResult",
+        )
         if isinstance(self, Content):
-            result = await retrieve_allowed_objects(
-                info.context["request"],
-                Content.objects.filter(id=self.id, markForDestruction__isnull=True),
-                scope="auth",
-                authset=viewresult.authset,
-            )
+            result = await auth_results.aat("Content")
             # if content: check cluster and content keys
             mappers = [
                 result.get("action_info_contents", {}).get(self.id, {}),
                 result.get("action_info_clusters", {}).get(self.cluster_id, {}),
             ]
         else:
-            result = await retrieve_allowed_objects(
-                info.context["request"],
-                Cluster.objects.filter(id=self.id, markForDestruction__isnull=True),
-                scope="auth",
-                authset=viewresult.authset,
-            )
+            result = await auth_results.aat("Cluster")
             mappers = [result.get("action_info_clusters", {}).get(self.id, {})]
         authResult = None
         for mapper in mappers:
@@ -194,16 +315,11 @@ class SBaseTypesMixin:
     async def properties(self: Union[Content, Cluster], info: Info) -> list[str]:
         if self.limited or self.reduced:
             return []
-        if await ain_cached_net_properties_or_user_special(
-            info.context["request"], "allow_hidden"
-        ):
-            return [
-                name async for name in self.properties.values_list("name", flat=True)
-            ]
-        else:
-            return [
-                name
-                async for name in self.nonhidden_properties.values_list(
-                    "name", flat=True
-                )
-            ]
+        # content properties are the properties of the cluster
+        return await get_loader(
+            info.context["request"],
+            load_properties,
+            await ain_cached_net_properties_or_user_special(
+                info.context["request"], "allow_hidden"
+            ),
+        ).load(self.cluster_id if isinstance(self, Content) else self.id)
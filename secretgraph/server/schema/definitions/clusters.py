@@ -1,6 +1,5 @@
 from typing import Iterable, Optional
 
-import strawberry
 import strawberry_django
 from django.conf import settings
 from django.db.models import Q, Subquery, Value
@@ -13,11 +12,12 @@ from ...utils.auth import (
     ain_cached_net_properties_or_user_special,
     fetch_by_id_noconvert,
     get_cached_result,
+    get_cached_results,
     in_cached_net_properties_or_user_special,
 )
 from ..filters import ClusterFilter, ContentFilterCluster
 from ..shared import UseCriteria, UseCriteriaPublic
-from ._shared import SBaseTypesMixin
+from ._shared import KeysetConnection, SBaseTypesMixin
 from .contents import ContentNode
 from .nets import NetNode
 
@@ -109,7 +109,7 @@ class ClusterNode(SBaseTypesMixin, relay.Node):
                 )
             ]
 
-    @strawberry_django.connection(strawberry.relay.ListConnection[ContentNode])
+    @strawberry_django.connection(KeysetConnection[ContentNode])
     def contents(
         self,
         info: Info,
@@ -205,11 +205,12 @@ class ClusterNode(SBaseTypesMixin, relay.Node):
                 info.context["request"], "manage_delete"
             )
         ):
-            del_result = get_cached_result(
+            # evaluate view and delete scope together if both are missing
+            del_result = get_cached_results(
                 info.context["request"],
-                cacheName="secretgraphDeleteResult",
-                scope="delete",
-            )["Cluster"]
+                "Cluster",
+                {"secretgraphResult": "view", "secretgraphDeleteResult": "delete"},
+            )["secretgraphDeleteResult"]
             queryset = queryset.filter(
                 id__in=Subquery(del_result["objects_without_public"].values("id"))
             )
@@ -1,23 +1,33 @@
+from copy import copy
 from datetime import datetime
 from typing import TYPE_CHECKING, Annotated, Iterable, Optional
 
 import strawberry
 import strawberry_django
 from django.conf import settings
-from django.db.models import Q, QuerySet, Subquery
+from django.db.models import Subquery
 from strawberry.types import Info
 
 from ....core.constants import public_states
 from ...actions.fetch import fetch_contents
-from ...models import Action, Content, ContentReference
+from ...models import Content
 from ...utils.auth import (
     ain_cached_net_properties_or_user_special,
     fetch_by_id_noconvert,
     get_cached_result,
+    get_cached_results,
     in_cached_net_properties_or_user_special,
 )
 from ..filters import ContentFilter, ContentReferenceFilter
 from ..shared import UseCriteria, UseCriteriaPublic
+from ._loaders import (
+    get_loader,
+    load_cluster_visibility,
+    load_clusters,
+    load_read_statistics,
+    load_references,
+    load_tags,
+)
 from ._shared import SBaseTypesMixin
 from .references import ContentReferenceNode
 
@@ -25,40 +35,48 @@ if TYPE_CHECKING:
     from .clusters import ClusterNode
 
 
+def _split_filters(filters: ContentReferenceFilter) -> tuple:
+    """hashable groups and content filters, used as loader key"""
+    contentFilters = tuple(
+        (name, None if value is None else tuple(value))
+        for name, value in (
+            ("states", filters.states),
+            ("includeTypes", filters.includeTypes),
+            ("excludeTypes", filters.excludeTypes),
+            ("includeTags", filters.includeTags),
+            ("excludeTags", filters.excludeTags),
+            ("contentHashes", filters.contentHashes),
+        )
+    )
+    groups = None if filters.groups is None else tuple(filters.groups)
+    return groups, contentFilters
+
+
 # for actions view and fetch
 @strawberry.type
 class ReadStatistic:
-    query: strawberry.Private[QuerySet[Action]]
+    contentId: strawberry.Private[int]
+
+    async def _statistic(self, info: Info) -> dict:
+        return await get_loader(info.context["request"], load_read_statistics).load(
+            self.contentId
+        )
 
     @strawberry.field()
-    async def last(self) -> Optional[datetime]:
-        try:
-            action = await (
-                self.query.filter(used__isnull=False).only("used").alatest("used")
-            )
-        except Action.DoesNotExist:
-            return None
-        assert action
-        return action.used
+    async def last(self, info: Info) -> Optional[datetime]:
+        return (await self._statistic(info))["last"]
 
     @strawberry.field()
-    async def first(self) -> Optional[datetime]:
-        try:
-            action = await (
-                self.query.filter(used__isnull=False).only("used").aearliest("used")
-            )
-        except Action.DoesNotExist:
-            return None
-        assert action
-        return action.used
+    async def first(self, info: Info) -> Optional[datetime]:
+        return (await self._statistic(info))["first"]
 
     @strawberry.field()
-    async def count(self) -> int:
-        return await self.query.filter(used__isnull=False).acount()
+    async def count(self, info: Info) -> int:
+        return (await self._statistic(info))["count"]
 
     @strawberry.field()
-    async def totalAmount(self) -> int:
-        return await self.query.acount()
+    async def totalAmount(self, info: Info) -> int:
+        return (await self._statistic(info))["totalAmount"]
 
 
 @strawberry_django.type(Content, name="Content")
@@ -73,13 +91,10 @@ class ContentNode(SBaseTypesMixin, strawberry.relay.Node):
 
     @strawberry_django.field()
     def readStatistic(self: Content) -> Optional[ReadStatistic]:
+        """Uses fetch/view group actions to provide statistics"""
         if self.limited or self.reduced:
             return None
-        query = Action.objects.filter(
-            contentAction__in=self.actions.filter(group__in=("fetch", "view"))
-        )
-        """Uses fetch/view group actions to provide statistics"""
-        return ReadStatistic(query=query)
+        return ReadStatistic(contentId=self.id)
 
     @strawberry_django.field()
     def contentHash(self) -> Optional[str]:
@@ -88,7 +103,7 @@ class ContentNode(SBaseTypesMixin, strawberry.relay.Node):
         return self.contentHash
 
     @strawberry_django.field()
-    def tags(
+    async def tags(
         self: Content,
         info: Info,
         includeTags: Optional[list[str]] = None,
@@ -96,39 +111,48 @@ class ContentNode(SBaseTypesMixin, strawberry.relay.Node):
     ) -> list[str]:
         if self.reduced:
             return []
-        incl_filters = Q()
-        excl_filters = Q()
-        for i in includeTags or []:
-            incl_filters |= Q(tag__startswith=i)
-
-        for i in excludeTags or []:
-            excl_filters |= Q(tag__startswith=i)
-        tags = self.tags.filter(~excl_filters & incl_filters)
+        tags = await get_loader(
+            info.context["request"],
+            load_tags,
+            tuple(includeTags or ()),
+            tuple(excludeTags or ()),
+        ).load(self.id)
         if self.limited:
-            tags.filter(Q(tag__startswith="key_hash=") | Q(tag__startswith="name="))
-        return list(tags.values_list("tag", flat=True))
+            tags = [
+                tag
+                for tag in tags
+                if tag.startswith("key_hash=") or tag.startswith("name=")
+            ]
+        return tags
 
     @strawberry_django.field()
-    def cluster(
+    async def cluster(
         self: Content, info: Info
     ) -> Optional[Annotated["ClusterNode", strawberry.lazy(".clusters")]]:
         # we are in the 2nd level, block
         if self.limited or self.reduced:
             return None
-        results = get_cached_result(info.context["request"], ensureInitialized=False)
-        if self.state not in public_states:
-            query = results["Cluster"]["objects_without_public"]
+        # e.g. blocked by action
+        cluster_is_visible = await get_loader(
+            info.context["request"],
+            load_cluster_visibility,
+            self.state in public_states,
+        ).load(self.cluster_id)
+        if Content.cluster.is_cached(self):
+            # the default manager selects the cluster
+            cluster = self.cluster
         else:
-            # e.g. blocked by action
-            query = results["Cluster"]["objects_with_public"]
-        cluster_is_visible = query.filter(id=self.cluster_id).exists()
+            cluster = await get_loader(info.context["request"], load_clusters).load(
+                self.cluster_id
+            )
         if not cluster_is_visible:
-            # set cluster to limited (first level)
-            self.cluster.limited = True
-        return self.cluster
+            # set cluster to limited (first level), don't change the shared instance
+            cluster = copy(cluster)
+            cluster.limited = True
+        return cluster
 
     @strawberry_django.connection(strawberry.relay.ListConnection[ContentReferenceNode])
-    def references(
+    async def references(
         self, info: Info, filters: ContentReferenceFilter
     ) -> Iterable[ContentReferenceNode]:
         if (
@@ -138,30 +162,13 @@ class ContentNode(SBaseTypesMixin, strawberry.relay.Node):
             # TODO: maybe relax later
             or self.cluster_id == 0
         ):
-            return ContentReference.objects.none()
-        result = get_cached_result(info.context["request"])["Content"]
-        query = result["objects_with_public"].exclude(hidden=True)
-        filterob = {}
-
-        if filters.groups is not None:
-            filterob["group__in"] = filters.groups
-
-        filterob["target__in"] = fetch_contents(
-            query,
-            clustersAreRestrictedOrAdmin=True,
-            states=filters.states,
-            includeTypes=filters.includeTypes,
-            excludeTypes=filters.excludeTypes,
-            includeTags=filters.includeTags,
-            excludeTags=filters.excludeTags,
-            contentHashes=filters.contentHashes,
-        ).filter(locked__isnull=True)
-        return self.references.filter(
-            **filterob,
-        )
+            return []
+        return await get_loader(
+            info.context["request"], load_references, "source", *_split_filters(filters)
+        ).load(self.id)
 
     @strawberry_django.connection(strawberry.relay.ListConnection[ContentReferenceNode])
-    def referencedBy(
+    async def referencedBy(
         self, info: Info, filters: ContentReferenceFilter
     ) -> Iterable[ContentReferenceNode]:
         if (
@@ -171,26 +178,10 @@ class ContentNode(SBaseTypesMixin, strawberry.relay.Node):
             # TODO: maybe relax later
             or self.cluster_id == 0
         ):
-            return ContentReference.objects.none()
-        result = get_cached_result(info.context["request"])["Content"]
-        query = result["objects_with_public"].exclude(hidden=True)
-        filterob = {}
-        if filters.groups is not None:
-            filterob["group__in"] = filters.groups
-
-        filterob["source__in"] = fetch_contents(
-            query,
-            clustersAreRestrictedOrAdmin=True,
-            states=filters.states,
-            includeTypes=filters.includeTypes,
-            excludeTypes=filters.excludeTypes,
-            includeTags=filters.includeTags,
-            excludeTags=filters.excludeTags,
-            contentHashes=filters.contentHashes,
-        ).filter(locked__isnull=True)
-        return self.referencedBy.filter(
-            **filterob,
-        )
+            return []
+        return await get_loader(
+            info.context["request"], load_references, "target", *_split_filters(filters)
+        ).load(self.id)
 
     @classmethod
     async def resolve_nodes(
@@ -306,11 +297,12 @@ class ContentNode(SBaseTypesMixin, strawberry.relay.Node):
                 info.context["request"], "manage_delete"
             )
         ):
-            del_result = get_cached_result(
+            # evaluate view and delete scope together if both are missing
+            del_result = get_cached_results(
                 info.context["request"],
-                scope="delete",
-                cacheName="secretgraphDeleteResult",
-            )["Content"]
+                "Content",
+                {"secretgraphResult": "view", "secretgraphDeleteResult": "delete"},
+            )["secretgraphDeleteResult"]
             queryset = queryset.filter(
                 id__in=Subquery(del_result["objects_without_public"].values("id"))
             )
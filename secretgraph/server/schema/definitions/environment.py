@@ -41,9 +41,10 @@ class ClusterGroupNode(relay.Node):
     hidden: bool
     injectedKeys: list[InjectedKeyNode]
 
-    @strawberry_django.field()
+    @strawberry_django.field(prefetch_related="properties")
     def properties(self) -> list[str]:
-        return list(self.properties.values_list("name", flat=True))
+        # uses the prefetched properties
+        return [prop.name for prop in self.properties.all()]
 
 
 @strawberry_django.type(NetGroup, name="NetGroup")
@@ -2,15 +2,13 @@ from typing import TYPE_CHECKING, Annotated, Iterable, Optional
 
 import strawberry_django
 from django.conf import settings
-from django.db import models
-from django.db.models.functions import Concat
 from strawberry import lazy, relay
 from strawberry.types import Info
 
-from ...actions.fetch import fetch_contents
 from ...models import ContentReference
 from ...utils.auth import get_cached_result
 from ..shared import DeleteRecursive
+from ._loaders import annotate_reference_relay_id, get_loader, load_contents
 
 if TYPE_CHECKING:
     from .contents import ContentNode
@@ -26,15 +24,7 @@ class ContentReferenceNode(relay.Node):
 
     @classmethod
     def get_queryset(cls, queryset, info: Info, **kwargs):
-        return queryset.annotate(
-            relay_id=Concat(
-                models.F("source__flexid"),
-                models.Value("|"),
-                models.F("target__flexid"),
-                models.Value("|"),
-                models.F("group"),
-            )
-        )
+        return annotate_reference_relay_id(queryset)
 
     @classmethod
     def resolve_nodes(
@@ -55,7 +45,9 @@ class ContentReferenceNode(relay.Node):
             target__in=result["objects_with_public"],
         )
 
-        queryset = queryset.filter(relay_id__in=node_ids)
+        queryset = annotate_reference_relay_id(queryset).filter(
+            relay_id__in=node_ids
+        )
 
         querydict = {el.relay_id: el for el in queryset}
         if required:
@@ -64,29 +56,17 @@ class ContentReferenceNode(relay.Node):
             return [querydict.get(nid) for nid in node_ids]
 
     @strawberry_django.field
-    def source(
+    async def source(
         self, info: Info
     ) -> Optional[Annotated["ContentNode", lazy(".contents")]]:
-        result = get_cached_result(info.context["request"])["Content"]
-        return (
-            fetch_contents(
-                result["objects_with_public"].filter(references=self),
-                clustersAreRestrictedOrAdmin=True,
-            )
-            .filter(locked__isnull=True)
-            .first()
+        return await get_loader(info.context["request"], load_contents).load(
+            self.source_id
         )
 
     @strawberry_django.field
-    def target(
+    async def target(
         self, info: Info
     ) -> Optional[Annotated["ContentNode", lazy(".contents")]]:
-        result = get_cached_result(info.context["request"])["Content"]
-        return (
-            fetch_contents(
-                result["objects_with_public"].filter(referencedBy=self),
-                clustersAreRestrictedOrAdmin=True,
-            )
-            .filter(locked__isnull=True)
-            .first()
+        return await get_loader(info.context["request"], load_contents).load(
+            self.target_id
         )
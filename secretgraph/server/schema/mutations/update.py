@@ -2,6 +2,7 @@ import logging
 from typing import Optional
 
 import strawberry
+from django.conf import settings
 from django.db import transaction
 from django.db.models import QuerySet
 from django.db.models.functions import Substr
@@ -12,6 +13,7 @@ from strawberry_django import django_resolver
 from ...actions.update import (
     create_cluster_fn,
     create_content_fn,
+    create_contents_fn,
     update_cluster_fn,
     update_content_fn,
 )
@@ -242,6 +244,85 @@ async def mutate_content(
     return returnval
 
 
+@strawberry.type()
+class ContentsMutation:
+    contents: list[ContentNode]
+    writeok: bool
+
+
+async def mutate_contents(
+    info: Info,
+    contents: list[ContentInput],
+    authorization: Optional[AuthList] = None,
+) -> ContentsMutation:
+    if len(contents) > settings.SECRETGRAPH_STRAWBERRY_MAX_RESULTS:
+        raise ValueError("too many contents")
+    allow_hidden = await ain_cached_net_properties_or_user_special(
+        info.context["request"], "allow_hidden", authset=authorization
+    )
+    # permissions and required keys are resolved once per cluster
+    results = {}
+    clusters = {}
+    required_keys = {}
+    for content in contents:
+        if content.cluster in results:
+            continue
+        result = (
+            await ids_to_results(
+                info.context["request"],
+                content.cluster,
+                Cluster,
+                scope="create",
+                authset=authorization,
+                cacheName=None,
+            )
+        )["Cluster"]
+        cluster_obj = (
+            await result["objects_without_public"].select_related("net").afirst()
+        )
+        if not cluster_obj:
+            raise ValueError("Cluster for Content not found")
+        results[content.cluster] = result
+        clusters[content.cluster] = cluster_obj
+        if cluster_obj.id not in required_keys:
+            required_keys[cluster_obj.id] = {
+                val
+                async for val in Content.objects.required_keys_full(
+                    cluster_obj
+                ).values_list("contentHash", flat=True)
+            }
+    hidden_allowed_clusters = set()
+    if not allow_hidden and any(content.hidden is not None for content in contents):
+        hidden_allowed_clusters = {
+            cluster_id
+            async for cluster_id in Cluster.objects.filter(
+                id__in=[cluster_obj.id for cluster_obj in clusters.values()],
+                groups__properties__name="allow_hidden",
+            ).values_list("id", flat=True)
+        }
+    for content in contents:
+        cluster_obj = clusters[content.cluster]
+        if (
+            content.hidden is not None
+            and not allow_hidden
+            and cluster_obj.id not in hidden_allowed_clusters
+        ):
+            content.hidden = None
+        pre_clean_content_spec(True, content, results[content.cluster])
+        content.cluster = cluster_obj
+    create_fn = await create_contents_fn(
+        info.context["request"],
+        contents,
+        required_keys=required_keys,
+        authset=authorization,
+    )
+
+    returnval = ContentsMutation(**(await create_fn(transaction.atomic)))
+    f = get_cached_result(info.context["request"], authset=authorization)
+    await f.preinit("Content", "Cluster")
+    return returnval
+
+
 @django_resolver
 def mutate_logout_user(info: Info) -> None:
     user = getattr(info.context["request"], "user", None)
@@ -14,6 +14,7 @@ from .definitions import (
     ClusterNode,
     ContentFilter,
     ContentNode,
+    KeysetConnection,
     Language,
     SecretgraphConfig,
     get_active_language,
@@ -24,6 +25,7 @@ from .definitions import (
 from .mutations import (
     ClusterMutation,
     ContentMutation,
+    ContentsMutation,
     DeleteContentOrClusterMutation,
     MarkMutation,
     MetadataUpdateMutation,
@@ -34,6 +36,7 @@ from .mutations import (
     TransferMutation,
     mutate_cluster,
     mutate_content,
+    mutate_contents,
     mutate_delete_content_or_cluster,
     mutate_logout_user,
     mutate_pull,
@@ -52,7 +55,7 @@ class SecretgraphObject:
     node: Optional[strawberry.relay.Node] = strawberry.relay.node(default=None)
     nodes: list[Optional[strawberry.relay.Node]] = strawberry.relay.node(default=None)
 
-    @strawberry_django.connection(strawberry.relay.ListConnection[ClusterNode])
+    @strawberry_django.connection(KeysetConnection[ClusterNode])
     def clusters(
         self, info: Info, filters: ClusterFilter = ClusterFilter()
     ) -> Iterable[ClusterNode]:
@@ -62,7 +65,7 @@ class SecretgraphObject:
             filters=filters,
         )
 
-    @strawberry_django.connection(strawberry.relay.ListConnection[ContentNode])
+    @strawberry_django.connection(KeysetConnection[ContentNode])
     def contents(
         self, info: Info, filters: ContentFilter = ContentFilter()
     ) -> Iterable[ContentNode]:
@@ -92,6 +95,14 @@ class SecretgraphMutations:
         ),
         handle_django_errors=False,
     )
+    createContents: ContentsMutation = strawberry_django.input_mutation(
+        resolver=mutate_contents,
+        description=(
+            "Create many contents in one transaction.\n"
+            "Keys are created one by one, updates are not supported"
+        ),
+        handle_django_errors=False,
+    )
     updateOrCreateCluster: ClusterMutation = strawberry_django.input_mutation(
         resolver=mutate_cluster,
         description=("Create a cluster, optionally initialize with a key-(pair)"),
@@ -1,5 +1,4 @@
 import logging
-import uuid
 from datetime import timedelta as td
 
 from asgiref.sync import sync_to_async
@@ -8,7 +7,7 @@ from django.db.utils import IntegrityError
 from django.utils import timezone
 from strawberry.relay import to_base64
 
-from ..core.constants import DeleteRecursive, UserSelectable
+from ..core.constants import UserSelectable
 
 logger = logging.getLogger(__name__)
 
@@ -90,7 +89,7 @@ def initializeDb(**kwargs):
                 injectedKeys = Content.objects.filter(
                     models.Exists(
                         ContentTag.objects.filter(
-                            content_id=models.OuterRef("id", tag__in=hashes)
+                            ContentTag.q_in(hashes), content_id=models.OuterRef("id")
                         )
                     ),
                     cluster__name="@system",
@@ -145,45 +144,27 @@ def deleteSizeCommitCb(sender, instance, **kwargs):
 
 
 def deleteContentCb(sender, instance, **kwargs):
-    from .models import ContentReference
-
-    references = ContentReference.objects.filter(target=instance)
-    other_references = ContentReference.objects.filter(~models.Q(target=instance))
-    nogroup_references = references.filter(
-        deleteRecursive=DeleteRecursive.NO_GROUP.value,
+    from .utils.deletion import (
+        collect_deletion_closure,
+        delete_contents,
+        remove_references_to,
     )
 
-    recursive_references = references.filter(deleteRecursive=DeleteRecursive.TRUE.value)
-    # delete recursive connected contents
-    sender.objects.filter(references__in=recursive_references).delete()
+    # resolve the whole dependency tree at once instead of recursing per level
+    closure = collect_deletion_closure([instance.id])
+    closure.discard(instance.id)
+    if closure:
+        delete_contents(closure)
+        # references of the instance to the closure are removed,
+        # deleteSizePreCb requires the current size
+        instance.refresh_from_db(fields=["size_references_cached"])
+    remove_references_to([instance.id])
 
-    nogroup_groups = set(nogroup_references.values_list("group", flat=True))
 
-    # delete contents if group vanishes and NO_GROUP is set
-    delete_ids = models.Subquery(
-        sender.objects.filter(models.Q(references__in=nogroup_references))
-        .annotate(
-            all_groups=models.Subquery(
-                ContentReference.objects.filter(
-                    group__in=nogroup_groups,
-                    source=models.OuterRef("pk"),
-                )
-                .annotate(amount=models.Count("group", distinct=True))
-                .values("amount")
-            ),
-            remaining_groups=models.Subquery(
-                other_references.filter(
-                    group__in=nogroup_groups,
-                    source=models.OuterRef("pk"),
-                )
-                .annotate(amount=models.Count("group", distinct=True))
-                .values("amount")
-            ),
-        )
-        .filter(remaining_groups__lt=models.F("all_groups"))
-        .values("pk")
-    )
-    sender.objects.filter(id__in=delete_ids).delete()
+def invalidateActionCacheCb(sender, instance, **kwargs):
+    from .utils.auth import invalidate_action_cache
+
+    invalidate_action_cache([instance])
 
 
 def deleteEncryptedFileCb(sender, instance, **kwargs):
@@ -192,55 +173,30 @@ def deleteEncryptedFileCb(sender, instance, **kwargs):
 
 
 def generateFlexidAndDownloadId(sender, instance, force=False, **kwargs):
+    """Regenerate (force) or fill missing ids of existing objects"""
     from .models import Cluster, Content
 
-    if force or not instance.flexid:
-        for i in range(0, 100):
-            if i >= 99:
-                raise ValueError("A possible infinite loop was detected")
-            instance.flexid = str(uuid.uuid4())
-            instance.flexid_cached = to_base64(sender.__name__, instance.flexid)
-            try:
-                with transaction.atomic():
-                    instance.save(update_fields=["flexid", "flexid_cached"])
-                break
-            except IntegrityError:
-                pass
-
-        # if issubclass(sender, Content):
-        #    fname = instance.file.name
-        #    instance.file.save("ignored", instance.file.open("rb"))
-        #    instance.file.storage.delete(fname)
-        #    instance.tags.filter(tag__startswith="id=").update(
-        #        tag=f"id={instance.flexid}"
-        #    )
-        # el
-        if issubclass(sender, Cluster) and force:
-            for c in instance.contents.all():
-                generateFlexidAndDownloadId(Content, c, True)
-    elif not instance.flexid_cached:
-        instance.flexid_cached = to_base64(sender.__name__, instance.flexid)
-        # remove potential broken and conflicting instances
-        sender.objects.filter(flexid_cached=instance.flexid_cached).delete()
-        instance.save(update_fields=["flexid_cached"])
-
+    update_fields = ["flexid", "flexid_cached"]
     if issubclass(sender, Content):
-        if force or not instance.downloadId:
-            for i in range(0, 100):
-                if i >= 99:
-                    raise ValueError("A possible infinite loop was detected")
-
-                instance.downloadId = str(uuid.uuid4())
-                try:
-                    with transaction.atomic():
-                        instance.save(
-                            update_fields=[
-                                "downloadId",
-                            ]
-                        )
-                    break
-                except IntegrityError:
-                    pass
+        update_fields.append("downloadId")
+    if force or not all(getattr(instance, field) for field in update_fields):
+        if not force and instance.flexid and not instance.flexid_cached:
+            # remove potential broken and conflicting instances
+            sender.objects.filter(
+                flexid_cached=to_base64(sender.__name__, instance.flexid)
+            ).delete()
+        instance.generate_ids(force=force)
+        try:
+            with transaction.atomic():
+                instance.save(update_fields=update_fields)
+        except IntegrityError:
+            # very unlikely, retry once with new ids
+            instance.generate_ids(force=True)
+            instance.save(update_fields=update_fields)
+
+    if issubclass(sender, Cluster) and force:
+        for c in instance.contents.all():
+            generateFlexidAndDownloadId(Content, c, True)
 
 
 agenerateFlexidAndDownloadId = sync_to_async(generateFlexidAndDownloadId)
@@ -283,6 +239,46 @@ def fillOldEmptyCb(**kwargs):
         generateFlexidAndDownloadId(Content, c, False)
 
 
+async def _add_key_hash_tags(content_ids_net_ids, chashes):
+    """
+    Add the missing key_hash tags of chashes to the contents.
+    The stored tag sizes and the byte usage of the nets are updated
+    """
+    from .models import Content, ContentTag, Net
+
+    net_ids = dict(content_ids_net_ids)
+    existing = set()
+    async for content_id, tag in ContentTag.objects.filter(
+        ContentTag.q_key_hashes(chashes), content_id__in=net_ids.keys()
+    ).values_list("content_id", "tag"):
+        existing.add((content_id, tag))
+    tags = []
+    # contents per added size
+    size_contents = {}
+    net_sizes = {}
+    for content_id, net_id in net_ids.items():
+        size = 0
+        for chash in chashes:
+            tag = f"key_hash={chash}"
+            if (content_id, tag) not in existing:
+                tags.append(ContentTag(tag=tag, content_id=content_id))
+                size += len(tag)
+        if size:
+            size_contents.setdefault(size, []).append(content_id)
+            net_sizes[net_id] = net_sizes.get(net_id, 0) + size
+    if not tags:
+        return
+    await ContentTag.objects.abulk_create(tags, ignore_conflicts=True)
+    for size, content_ids in size_contents.items():
+        await Content.objects.filter(id__in=content_ids).aupdate(
+            size_tags_cached=models.F("size_tags_cached") + size
+        )
+    for net_id, size in net_sizes.items():
+        await Net.objects.filter(id=net_id).aupdate(
+            bytes_in_use=models.F("bytes_in_use") + size
+        )
+
+
 async def regenerateKeyHash(force=False, **kwargs):
     from django.conf import settings
 
@@ -313,15 +309,22 @@ async def regenerateKeyHash(force=False, **kwargs):
         if until_index == 0:
             continue
 
-        tags = list(map(lambda x: "key_hash=%s" % x, chashes))
         # exclude Contents with current key_hash
-        contents_to_update = Content.objects.exclude(tags__tag=tags[0]).filter(
-            models.Q(tags__tag__in=tags[until_index:])
-        )
-        while True:
-            async for content_to_update in contents_to_update.aiterator(batch_size):
-                batch = [ContentTag(tag=tag, content=content_to_update) for tag in tags]
-                await ContentTag.objects.abulk_create(batch, ignore_conflicts=True)
+        contents_to_update = Content.objects.exclude(
+            ContentTag.q_key_hashes(chashes[:1], "tags__")
+        ).filter(ContentTag.q_key_hashes(chashes[until_index:], "tags__"))
+        batch = []
+        async for content_to_update in (
+            contents_to_update.select_related(None)
+            .only("id", "net_id")
+            .aiterator(batch_size)
+        ):
+            batch.append((content_to_update.id, content_to_update.net_id))
+            if len(batch) >= batch_size:
+                await _add_key_hash_tags(batch, chashes)
+                batch = []
+        if batch:
+            await _add_key_hash_tags(batch, chashes)
         await Content.objects.filter(
             contentHash__in=map(lambda x: f"Key:{x}", chashes[1:]),
             type="PublicKey",
@@ -349,24 +352,39 @@ def rollbackUsedActionsAndFreeze(request, **kwargs):
                     ).delete()
                     ContentTag.objects.filter(
                         tag="immutable", content__in=contents
-                    ).update(tag="freeze")
+                    ).update(tag="freeze", **ContentTag.lookup_fields("freeze"))
                 break
             except IntegrityError:
                 pass
 
 
-# not used yet, needs safeguards and needs info from settings
 def autoUnlock(**kwargs):
+    from django.conf import settings
+
     from .models import Content
 
+    unlock_after = getattr(settings, "SECRETGRAPH_AUTO_UNLOCK_AFTER", 172800)
+    if unlock_after is None:
+        return
     now = timezone.now()
-    Content.objects.filter(locked__lt=now - td(days=2), locked__isnull=False).update(
-        locked=None
+    Content.objects.filter(
+        locked__lt=now - td(seconds=unlock_after), locked__isnull=False
+    ).update(locked=None)
+
+
+def _outdated_contents(now, ignoreTime=False):
+    from .models import Content
+
+    return Content.objects.filter(
+        models.Q(markForDestruction__isnull=False)
+        if ignoreTime
+        else models.Q(markForDestruction__lte=now)
     )
 
 
 async def sweepOutdated(ignoreTime=False, **kwargs):
     from .models import Action, Cluster, Content, ContentAction
+    from .utils.deletion import abulk_delete_contents
 
     now = timezone.now()
     await Action.objects.filter(
@@ -403,13 +421,8 @@ async def sweepOutdated(ignoreTime=False, **kwargs):
         .aupdate(markForDestruction=models.F("ClusterMarkForDestruction"))
     )
 
-    # cleanup expired Contents
-    async for c in Content.objects.filter(
-        models.Q(markForDestruction__isnull=False)
-        if ignoreTime
-        else models.Q(markForDestruction__lte=now)
-    ):
-        await c.adelete()
+    # cleanup expired Contents, set based and in batches
+    await abulk_delete_contents(_outdated_contents(now, ignoreTime))
     # cleanup expired Clusters afterward
     async for c in Cluster.objects.alias(models.Count("contents")).filter(
         models.Q(markForDestruction__isnull=False)
@@ -1,11 +1,78 @@
+import hashlib
+import importlib
+import pkgutil
+from typing import Optional
+
 import django_fast_ratelimit as ratelimit
 from django.conf import settings
+from graphql import DocumentNode, parse
 from graphql import ExecutionResult as GraphQLExecutionResult
 from graphql.error.graphql_error import GraphQLError
 from strawberry.extensions import SchemaExtension
+from strawberry.schema.execute import validate_document
 from strawberry.types import ExecutionContext
 from strawberry.types.graphql import OperationType
 
+# sha256 hash: query
+_persisted_queries: dict[str, str] = {}
+# query: parsed document
+_persisted_documents: dict[str, DocumentNode] = {}
+# (schema, query, validation rules): validation errors
+_persisted_validations: dict[tuple, list[GraphQLError]] = {}
+
+
+def register_persisted_queries(package: str = "secretgraph.queries") -> None:
+    """Parse and register the queries of the package modules under their hashes"""
+    package_module = importlib.import_module(package)
+    for module_info in pkgutil.iter_modules(package_module.__path__):
+        module = importlib.import_module(f"{package}.{module_info.name}")
+        for name, query in vars(module).items():
+            if name.startswith("_") or not isinstance(query, str):
+                continue
+            if query not in _persisted_documents:
+                _persisted_documents[query] = parse(query)
+            _persisted_queries[hashlib.sha256(query.encode("utf8")).hexdigest()] = (
+                query
+            )
+
+
+def get_persisted_query(sha256Hash: str) -> Optional[str]:
+    return _persisted_queries.get(sha256Hash)
+
+
+class PersistedQueries(SchemaExtension):
+    """
+    Skips parsing of registered queries and validates them only once,
+    regardless if they are sent as hash or in full
+    """
+
+    def on_parse(self):
+        execution_context = self.execution_context
+        document = _persisted_documents.get(execution_context.query)
+        if document:
+            execution_context.graphql_document = document
+        yield
+
+    def on_validate(self):
+        execution_context = self.execution_context
+        if execution_context.query in _persisted_documents:
+            key = (
+                execution_context.schema,
+                execution_context.query,
+                execution_context.validation_rules,
+            )
+            errors = _persisted_validations.get(key)
+            if errors is None:
+                errors = validate_document(
+                    execution_context.schema._schema,
+                    execution_context.graphql_document,
+                    execution_context.validation_rules,
+                )
+                _persisted_validations[key] = errors
+            # skips the validation of strawberry
+            execution_context.errors = list(errors)
+        yield
+
 
 class RatelimitMutations(SchemaExtension):
     def __init__(self, *, execution_context: ExecutionContext):
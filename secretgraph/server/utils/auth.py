@@ -2,17 +2,23 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import hashlib
 import json
 import logging
+import os
+from collections import OrderedDict
 from functools import partial, reduce
 from itertools import chain, islice
 from operator import or_
+from threading import Lock
 from typing import TYPE_CHECKING, Iterable, Optional, cast
 
 from asgiref.sync import async_to_sync, sync_to_async
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from django.apps import apps
 from django.conf import settings
+from django.core.cache import caches
 from django.db import models
 from django.middleware.csrf import CsrfViewMiddleware
 from django.utils import timezone
@@ -42,10 +48,15 @@ class LazyViewResult(object):
         request: HttpRequest,
         *viewResults: list[AllowedObjectsResult],
         authset=None,
+        scope: Optional[Scope] = None,
     ):
         self._result_dict = {}
+        # running evaluations, shared by concurrent resolvers
+        self._pending = {}
         self.request = request
         self.authset = authset
+        # scope of a non-stub result, used for evaluating multiple scopes at once
+        self.scope = scope
         self.fn = fn
         self.sync_fn = async_to_sync(self.fn)
         for r in viewResults:
@@ -75,17 +86,29 @@ class LazyViewResult(object):
             return self.authset
 
         if item not in self._result_dict:
-            self._result_dict[item] = await self.fn(
-                self.request,
-                item,
-                authset=self.authset,
-            )
+            pending = self._pending.get(item)
+            if pending is None:
+                pending = asyncio.ensure_future(
+                    self.fn(
+                        self.request,
+                        item,
+                        authset=self.authset,
+                    )
+                )
+                self._pending[item] = pending
+            try:
+                result = await pending
+            finally:
+                if self._pending.get(item) is pending:
+                    del self._pending[item]
+            self._result_dict.setdefault(item, result)
         return self._result_dict[item]
 
     def refresh(self, *fields):
         for i in fields:
             if i in self._result_dict:
                 del self._result_dict[i]
+            self._pending.pop(i, None)
 
     async def _wait_when_exist(self, ops):
         if not ops:
@@ -145,6 +168,106 @@ async def _speedup_tokenparsing(
     return request._secretgraph_token_cache[token]
 
 
+# process wide cache of decrypted action values
+# key: digest of id, keyHash, nonce, start, stop; value: decrypted value
+_action_value_cache: OrderedDict[str, str] = OrderedDict()
+_action_value_cache_lock = Lock()
+
+
+def _action_cache_key(action: Action) -> str:
+    # the nonce changes with every re-encryption, so stale values cannot match
+    return "secretgraph_action:%s" % hashlib.sha256(
+        (
+            "%s:%s:%s:%s:%s"
+            % (
+                action.id,
+                action.keyHash,
+                action.nonce,
+                action.start.timestamp() if action.start else "",
+                action.stop.timestamp() if action.stop else "",
+            )
+        ).encode("utf8")
+    ).hexdigest()
+
+
+def _get_shared_action_cache():
+    alias = getattr(settings, "SECRETGRAPH_ACTION_CACHE", None)
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def _shared_action_entry_key(aesgcm: bytes) -> AESGCM:
+    # derived from the token, so the shared cache never sees plaintext values
+    return AESGCM(hashlib.sha256(b"secretgraph_action_cache" + aesgcm).digest())
+
+
+def _seal_shared_action_entry(aesgcm: bytes, value: str) -> bytes:
+    nonce = os.urandom(12)
+    return nonce + _shared_action_entry_key(aesgcm).encrypt(
+        nonce, value.encode("utf8"), None
+    )
+
+
+def _open_shared_action_entry(aesgcm: bytes, entry) -> Optional[str]:
+    if not isinstance(entry, bytes) or len(entry) <= 12:
+        return None
+    try:
+        return (
+            _shared_action_entry_key(aesgcm)
+            .decrypt(entry[:12], entry[12:], None)
+            .decode("utf8")
+        )
+    except (InvalidTag, UnicodeDecodeError):
+        return None
+
+
+async def _decrypt_action_value(aesgcm: bytes, action: Action) -> str:
+    """Decrypt action value, use cached result if available"""
+    max_size = getattr(settings, "SECRETGRAPH_ACTION_CACHE_SIZE", 2048)
+    shared_cache = _get_shared_action_cache()
+    key = None
+    value = None
+    if max_size or shared_cache:
+        key = _action_cache_key(action)
+    if max_size:
+        with _action_value_cache_lock:
+            value = _action_value_cache.get(key)
+            if value is not None:
+                _action_value_cache.move_to_end(key)
+                return value
+    if shared_cache:
+        value = _open_shared_action_entry(aesgcm, await shared_cache.aget(key))
+    if value is None:
+        value = (
+            await decrypt(
+                aesgcm,
+                action.value,
+                params={"nonce": action.nonce},
+                algorithm="AESGCM",
+            )
+        ).data.decode("utf8")
+        if shared_cache:
+            await shared_cache.aset(key, _seal_shared_action_entry(aesgcm, value))
+    if max_size:
+        with _action_value_cache_lock:
+            _action_value_cache[key] = value
+            while len(_action_value_cache) > max_size:
+                _action_value_cache.popitem(last=False)
+    return value
+
+
+def invalidate_action_cache(actions: Iterable[Action]):
+    """Remove cached action values of actions"""
+    keys = list(map(_action_cache_key, actions))
+    with _action_value_cache_lock:
+        for key in keys:
+            _action_value_cache.pop(key, None)
+    shared_cache = _get_shared_action_cache()
+    if shared_cache and keys:
+        shared_cache.delete_many(keys)
+
+
 async def stub_retrieve_allowed_objects(
     request: HttpRequest,
     query: models.QuerySet | str,
@@ -185,6 +308,19 @@ async def stub_retrieve_allowed_objects(
     }
 
 
+async def _get_action_dict(request: HttpRequest, aesgcm: bytes, action: Action) -> dict:
+    """Decrypt and parse action value only once per request"""
+    if not hasattr(request, "_secretgraph_action_dict_cache"):
+        setattr(request, "_secretgraph_action_dict_cache", {})
+    # the nonce changes with every re-encryption
+    key = (action.id, action.nonce)
+    action_dict = request._secretgraph_action_dict_cache.get(key)
+    if action_dict is None:
+        action_dict = json.loads(await _decrypt_action_value(aesgcm, action))
+        request._secretgraph_action_dict_cache[key] = action_dict
+    return action_dict
+
+
 async def retrieve_allowed_objects(
     request: HttpRequest,
     query: models.QuerySet | str,
@@ -192,26 +328,24 @@ async def retrieve_allowed_objects(
     authset: Optional[Iterable[str] | set[str]] = None,
     ignore_restrictions: bool = False,
 ) -> AllowedObjectsResult:
-    if authset is None:
-        authset = set(
-            getattr(request, "headers", {})
-            .get("Authorization", "")
-            .replace(" ", "")
-            .split(",")
+    return (
+        await retrieve_allowed_objects_multi(
+            request,
+            query,
+            (scope,),
+            authset=authset,
+            ignore_restrictions=ignore_restrictions,
         )
-        # authset can contain: ""
-        authset.discard("")
-    elif not isinstance(authset, set):
-        authset = set(authset)
+    )[scope]
 
-    if len(authset) > 100:
-        raise ValueError("Too many authorization tokens specified, limit is 100")
-    if isinstance(query, str):
-        query = apps.get_model("secretgraph", query).objects.all()
-        need_query_restriction = False
-    else:
-        need_query_restriction = bool(query.query.has_filters())
-    now = timezone.now()
+
+def _actions_query(
+    query: models.QuerySet,
+    tokens: list[tuple[str, bytes, list[str]]],
+    now,
+    ignore_restrictions: bool = False,
+) -> models.QuerySet[Action]:
+    """Query the actions of the parsed tokens which can apply to query"""
     # for sorting. First action is always the most important action
     # importance is higher by start date, newest (here id)
     pre_filtered_actions = Action.objects.select_related(
@@ -222,7 +356,7 @@ async def retrieve_allowed_objects(
             cluster__net__active=True, start__lte=now
         ).filter(models.Q(stop__isnull=True) | models.Q(stop__gte=now))
     # if the query is not the all query
-    if need_query_restriction:
+    if query.query.has_filters():
         if issubclass(query.model, Content):
             related_cluster_query = Cluster.objects.filter(
                 models.Exists(query.filter(cluster_id=models.OuterRef("id")))
@@ -240,6 +374,82 @@ async def retrieve_allowed_objects(
     if issubclass(query.model, Cluster):
         pre_filtered_actions = pre_filtered_actions.filter(contentAction__isnull=True)
 
+    flexids = {token[0] for token in tokens}
+    q = models.Q(contentAction__content__flexid_cached__in=flexids) | models.Q(
+        cluster__flexid_cached__in=flexids
+    )
+    if issubclass(query.model, Cluster):
+        # don't block auth with encoded @system
+        q |= models.Q(cluster__name_cached__in=flexids)
+    return pre_filtered_actions.filter(
+        q, keyHash__in={keyhash for token in tokens for keyhash in token[2]}
+    ).annotate(content_flexid_cached=models.F("contentAction__content__flexid_cached"))
+
+
+async def retrieve_allowed_objects_multi(
+    request: HttpRequest,
+    query: models.QuerySet | str,
+    scopes: Iterable[Scope],
+    authset: Optional[Iterable[str] | set[str]] = None,
+    ignore_restrictions: bool = False,
+) -> dict[Scope, AllowedObjectsResult]:
+    """
+    Retrieve the allowed objects of multiple scopes.
+    The actions are fetched and decrypted only once and evaluated per scope
+    in the given order
+    """
+    if authset is None:
+        authset = set(
+            getattr(request, "headers", {})
+            .get("Authorization", "")
+            .replace(" ", "")
+            .split(",")
+        )
+        # authset can contain: ""
+        authset.discard("")
+    elif not isinstance(authset, set):
+        authset = set(authset)
+
+    if len(authset) > 100:
+        raise ValueError("Too many authorization tokens specified, limit is 100")
+    if isinstance(query, str):
+        query = apps.get_model("secretgraph", query).objects.all()
+    now = timezone.now()
+
+    # parse all tokens first, so the actions can be retrieved in one query
+    tokens = [
+        token
+        for token in await asyncio.gather(
+            *(_speedup_tokenparsing(request, item) for item in authset)
+        )
+        if token[1]
+    ]
+    all_actions = []
+    if tokens:
+        all_actions = [
+            action
+            async for action in _actions_query(
+                query, tokens, now, ignore_restrictions=ignore_restrictions
+            )
+        ]
+    results = {}
+    for scope in scopes:
+        if scope not in results:
+            results[scope] = await _evaluate_actions(
+                request, query, scope, authset, tokens, all_actions, now
+            )
+    return results
+
+
+async def _evaluate_actions(
+    request: HttpRequest,
+    query: models.QuerySet,
+    scope: Scope,
+    authset: set[str],
+    tokens: list[tuple[str, bytes, list[str]]],
+    all_actions: list[Action],
+    now,
+) -> AllowedObjectsResult:
     returnval = {
         "authset": authset,
         "scope": scope,
@@ -254,24 +464,28 @@ async def retrieve_allowed_objects(
     }
     query_composing = {}
     passive_active_actions = set()
-    for item in authset:
-        flexid_cached, aesgcm, keyhashes = await _speedup_tokenparsing(request, item)
-        if not aesgcm:
-            continue
-
-        q = models.Q(contentAction__content__flexid_cached=flexid_cached) | models.Q(
-            cluster__flexid_cached=flexid_cached
-        )
-        if issubclass(query.model, Cluster):
-            # don't block auth with encoded @system
-            q |= models.Q(cluster__name_cached=flexid_cached)
+    # keyHash: newest keyHash
+    keyhash_upgrades = {}
+    # id: action, actions of all tokens with candidates
+    token_action_ids = {}
+    for flexid_cached, aesgcm, keyhashes in tokens:
         # execute every action only once
-        actions = (
-            pre_filtered_actions.filter(q, keyHash__in=keyhashes)
-            .exclude(id__in=returnval["action_results"].keys())
-            .select_related("contentAction")
-        )
-        if not await actions.aexists():
+        # note: actions are already sorted by the query
+        actions = [
+            action
+            for action in all_actions
+            if action.id not in returnval["action_results"]
+            and action.keyHash in keyhashes
+            and (
+                action.content_flexid_cached == flexid_cached
+                or action.cluster.flexid_cached == flexid_cached
+                or (
+                    issubclass(query.model, Cluster)
+                    and action.cluster.name_cached == flexid_cached
+                )
+            )
+        ]
+        if not actions:
             continue
 
         filters = models.Q()
@@ -281,17 +495,8 @@ async def retrieve_allowed_objects(
         # 2 owner
         # 3 special
         accesslevel = 0
-        async for action in actions:
-            action_dict = json.loads(
-                (
-                    await decrypt(
-                        aesgcm,
-                        action.value,
-                        params={"nonce": action.nonce},
-                        algorithm="AESGCM",
-                    )
-                ).data.decode("utf8")
-            )
+        for action in actions:
+            action_dict = await _get_action_dict(request, aesgcm, action)
             action_result = await ActionHandler.handle_action(
                 query.model,
                 action_dict,
@@ -356,11 +561,10 @@ async def retrieve_allowed_objects(
 
             # update hash to newest algorithm
             if action.keyHash != keyhashes[0]:
-                await Action.objects.filter(keyHash=action.keyHash).aupdate(
-                    keyHash=keyhashes[0]
-                )
+                keyhash_upgrades[action.keyHash] = keyhashes[0]
 
-        returnval["actions"] |= actions
+        for action in actions:
+            token_action_ids[action.id] = action
         # apply filters to a private query
         # filters are applied per keyHash
         if issubclass(query.model, Cluster):
@@ -380,28 +584,40 @@ async def retrieve_allowed_objects(
             "accesslevel": accesslevel,
             "query": _query,
         }
+    for old_keyhash, new_keyhash in keyhash_upgrades.items():
+        await Action.objects.filter(keyHash=old_keyhash).aupdate(keyHash=new_keyhash)
+    if keyhash_upgrades:
+        # keep the loaded actions in sync for the evaluation of other scopes
+        for action in all_actions:
+            action.keyHash = keyhash_upgrades.get(action.keyHash, action.keyHash)
     # actions
     returnval["active_actions"].update(passive_active_actions)
     # for sorting. First action is always the most important action
     # importance is higher by start date, newest (here id)
     returnval["actions"] = Action.objects.filter(
-        id__in=models.Subquery(returnval["actions"].values("id"))
+        id__in=token_action_ids.keys()
     ).order_by("-start", "-id")
 
     # active actions are only marked as used if scope is not peek
     if scope != "peek":
-        updatedActions = returnval["actions"].filter(
-            id__in=returnval["active_actions"], used__isnull=True
-        )
+        # the action objects are already loaded, so no query is required
+        updatedActionIds = [
+            action.id
+            for action in token_action_ids.values()
+            if action.used is None and action.id in returnval["active_actions"]
+        ]
         setattr(
             request,
             "secretgraphActionsToRollback",
             getattr(request, "secretgraphActionsToRollback", set()),
         )
-        request.secretgraphActionsToRollback.update(
-            [val async for val in updatedActions.values_list("id", flat=True)]
-        )
-        await updatedActions.aupdate(used=now)
+        request.secretgraphActionsToRollback.update(updatedActionIds)
+        if updatedActionIds:
+            await Action.objects.filter(
+                id__in=updatedActionIds, used__isnull=True
+            ).aupdate(used=now)
+            for action_id in updatedActionIds:
+                token_action_ids[action_id].used = now
 
     # extract subqueries union them
     all_query = reduce(
@@ -615,11 +831,56 @@ def get_cached_result(
                 request,
                 *viewResults,
                 authset=authset,
+                scope=None if stub else scope,
             ),
         )
     return getattr(request, cacheName)
 
 
+async def aget_cached_results(
+    request,
+    item: str,
+    scopes: dict[str, Scope],
+    authset=None,
+) -> dict[str, AllowedObjectsResult]:
+    """
+    Retrieve item from multiple caches (cacheName: scope).
+    Missing results are evaluated together, so the actions are fetched only once
+    """
+    lazy_results = {
+        cacheName: get_cached_result(
+            request, authset=authset, scope=scope, cacheName=cacheName
+        )
+        for cacheName, scope in scopes.items()
+    }
+    # authset: scope: [lazy results]
+    missing: dict[frozenset[str], dict[Scope, list[LazyViewResult]]] = {}
+    for lazy_result in lazy_results.values():
+        if item in lazy_result._result_dict:
+            continue
+        if lazy_result.scope is None:
+            # stub
+            await lazy_result.aat(item)
+            continue
+        missing.setdefault(frozenset(lazy_result.authset), {}).setdefault(
+            lazy_result.scope, []
+        ).append(lazy_result)
+    for missing_authset, missing_scopes in missing.items():
+        results = await retrieve_allowed_objects_multi(
+            request, item, missing_scopes.keys(), authset=set(missing_authset)
+        )
+        for scope, scope_lazy_results in missing_scopes.items():
+            for lazy_result in scope_lazy_results:
+                lazy_result._result_dict[item] = results[scope]
+    return {
+        cacheName: lazy_result._result_dict[item]
+        for cacheName, lazy_result in lazy_results.items()
+    }
+
+
+get_cached_results = async_to_sync(aget_cached_results)
+
+
 def match_host_origin(request):
     origin_header = request.headers.get("Origin")
     if not origin_header:
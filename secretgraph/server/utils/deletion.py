@@ -0,0 +1,246 @@
+__all__ = [
+    "collect_deletion_closure",
+    "remove_references_to",
+    "delete_contents",
+    "bulk_delete_contents",
+    "abulk_delete_contents",
+]
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.db.models.functions import Length
+
+from ...core.constants import DeleteRecursive
+
+logger = logging.getLogger(__name__)
+
+
+def _recursive_closure(content_ids: set[int], using: str) -> set[int]:
+    """
+    Follow deleteRecursive=TRUE references transitively in one recursive CTE query
+    """
+    from ..models import Content, ContentReference
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    ref_meta = ContentReference._meta
+    placeholders = ", ".join(["%s"] * len(content_ids))
+    # UNION removes duplicates, so reference cycles terminate
+    sql = (
+        "WITH RECURSIVE closure(id) AS ("
+        f"SELECT {qn('id')} FROM {qn(Content._meta.db_table)} "
+        f"WHERE {qn('id')} IN ({placeholders}) "
+        "UNION "
+        f"SELECT r.{qn(ref_meta.get_field('source').column)} "
+        f"FROM {qn(ref_meta.db_table)} r "
+        f"INNER JOIN closure c ON r.{qn(ref_meta.get_field('target').column)} = c.id "
+        f"WHERE r.{qn(ref_meta.get_field('deleteRecursive').column)} = %s"
+        ") SELECT id FROM closure"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*content_ids, DeleteRecursive.TRUE.value])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def collect_deletion_closure(content_ids: Iterable[int], using=None) -> set[int]:
+    """
+    Calculate the ids of the contents and of all contents which are deleted with them.
+    TRUE references are resolved in one recursive query, NO_GROUP references
+    (deleted if a group has no remaining target) are added until nothing changes.
+    FALSE references are just removed.
+    """
+    from ..models import Content, ContentReference
+
+    if using is None:
+        using = router.db_for_write(Content)
+    closure: set[int] = set()
+    new_ids = set(content_ids)
+    while new_ids:
+        closure.update(_recursive_closure(new_ids, using))
+        # NO_GROUP is not monotonic, so it cannot be part of the recursion
+        new_ids = set(
+            ContentReference.objects.using(using)
+            .filter(
+                ~models.Exists(
+                    ContentReference.objects.filter(
+                        source_id=models.OuterRef("source_id"),
+                        group=models.OuterRef("group"),
+                    ).exclude(target_id__in=closure)
+                ),
+                target_id__in=closure,
+                deleteRecursive=DeleteRecursive.NO_GROUP.value,
+            )
+            .exclude(source_id__in=closure)
+            .values_list("source_id", flat=True)
+        )
+    return closure
+
+
+def remove_references_to(content_ids: Iterable[int], using=None) -> None:
+    """
+    Remove the references of remaining contents to the contents of content_ids.
+    The stored reference sizes of the sources and the byte usage of their nets
+    are updated
+    """
+    from ..models import Content, ContentReference, Net
+
+    if using is None:
+        using = router.db_for_write(Content)
+    content_ids = set(content_ids)
+    references = (
+        ContentReference.objects.using(using)
+        .filter(target_id__in=content_ids)
+        .exclude(source_id__in=content_ids)
+    )
+    # see Content.calculate_size_references
+    size = models.Sum(Length("extra") + 28)
+    net_deltas = list(
+        references.order_by().values("source__net_id").annotate(size=size)
+    )
+    if not net_deltas:
+        return
+    Content.objects.using(using).filter(
+        id__in=references.values("source_id")
+    ).update(
+        size_references_cached=models.F("size_references_cached")
+        - models.Subquery(
+            references.filter(source_id=models.OuterRef("id"))
+            .order_by()
+            .values("source_id")
+            .annotate(size=size)
+            .values("size")
+        )
+    )
+    for delta in net_deltas:
+        Net.objects.using(using).filter(id=delta["source__net_id"]).update(
+            bytes_in_use=models.F("bytes_in_use") - delta["size"]
+        )
+    references.delete()
+
+
+def _delete_files(storage, names: list[str], workers: int):
+    def _delete(name):
+        try:
+            storage.delete(name)
+        except Exception as exc:
+            logger.warning("Could not delete file: %s", name, exc_info=exc)
+
+    if len(names) <= 1 or workers <= 1:
+        for name in names:
+            _delete(name)
+        return
+    with ThreadPoolExecutor(
+        max_workers=min(workers, len(names)), thread_name_prefix="secretgraph_sweep"
+    ) as executor:
+        # consume for waiting until all files are deleted
+        for _ in executor.map(_delete, names):
+            pass
+
+
+def delete_contents(content_ids: Iterable[int], file_workers=None, using=None) -> int:
+    """
+    Delete contents in one batched pass without per-object signals.
+    content_ids should be a closure (see collect_deletion_closure).
+    Byte usage is updated per net, files are deleted after commit.
+
+    Returns the amount of deleted contents
+    """
+    from ..models import (
+        ClusterGroup,
+        Content,
+        ContentAction,
+        ContentReference,
+        ContentTag,
+        Net,
+    )
+    from .misc import get_secretgraph_channel
+
+    if file_workers is None:
+        file_workers = getattr(settings, "SECRETGRAPH_SWEEP_FILE_WORKERS", 8)
+    if using is None:
+        using = router.db_for_write(Content)
+    content_ids = set(content_ids)
+    with transaction.atomic(using=using):
+        contents = Content.objects.using(using).filter(id__in=content_ids)
+        infos = list(contents.values_list("id", "flexid_cached", "file"))
+        net_deltas = contents.values("net_id").annotate(
+            size=models.Sum(
+                models.F("size_file_cached")
+                + models.F("size_tags_cached")
+                + models.F("size_references_cached")
+                + Content.flexid_byte_size
+            )
+        )
+        for delta in net_deltas:
+            Net.objects.using(using).filter(id=delta["net_id"]).update(
+                bytes_in_use=models.F("bytes_in_use") - delta["size"]
+            )
+        remove_references_to(content_ids, using=using)
+        # no signals are connected to the dependent models, so these are fast
+        ContentReference.objects.using(using).filter(
+            models.Q(source_id__in=content_ids) | models.Q(target_id__in=content_ids)
+        ).delete()
+        ContentAction.objects.using(using).filter(content_id__in=content_ids).delete()
+        ClusterGroup.injectedKeys.through.objects.using(using).filter(
+            content_id__in=content_ids
+        ).delete()
+        ContentTag.objects.using(using).filter(content_id__in=content_ids).delete()
+        contents._raw_delete(using)
+
+        def cleanup():
+            _delete_files(
+                Content._meta.get_field("file").storage,
+                [info[2] for info in infos if info[2]],
+                workers=file_workers,
+            )
+            channel = get_secretgraph_channel()
+            if channel:
+                async_to_sync(channel.send)(
+                    "content_or_cluster.deletion",
+                    {
+                        "relay_ids": [info[1] for info in infos],
+                        "db_ids": [info[0] for info in infos],
+                        "type": "Content",
+                    },
+                )
+
+        transaction.on_commit(cleanup, using=using)
+    return len(infos)
+
+
+def bulk_delete_contents(
+    query: models.QuerySet, batch_size=None, file_workers=None
+) -> int:
+    """
+    Delete the contents of query and their dependents in batches of
+    batch_size contents per transaction.
+
+    Returns the amount of deleted contents
+    """
+    from ..models import Content
+
+    if batch_size is None:
+        batch_size = getattr(settings, "SECRETGRAPH_SWEEP_BATCH_SIZE", 1000)
+    using = router.db_for_write(Content)
+    deleted = 0
+    # removed from query after deletion, so always take the first batch
+    query = query.order_by().values_list("id", flat=True)
+    while True:
+        batch = list(query[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic(using=using):
+            deleted += delete_contents(
+                collect_deletion_closure(batch, using=using),
+                file_workers=file_workers,
+                using=using,
+            )
+    return deleted
+
+
+abulk_delete_contents = sync_to_async(bulk_delete_contents)
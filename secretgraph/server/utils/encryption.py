@@ -1,5 +1,6 @@
 import base64
 import logging
+import os
 from collections.abc import AsyncIterable, Iterable
 
 from asgiref.sync import async_to_sync
@@ -7,6 +8,7 @@ from cryptography import exceptions
 from django.db.models import Exists, F, OuterRef, Q, Subquery
 
 from ...core.constants import TransferResult, public_states
+from ...core.utils.base_crypto import SegmentedAESGCM, SegmentedAESGCMContext
 from ...core.utils.crypto import (
     decrypt,
     decryptString,
@@ -47,13 +49,14 @@ async def create_key_maps(contents, keyset):
         Q(group="key") | Q(group="transfer"), source__in=contents
     )
 
+    keyhashes = [tag.removeprefix("key_hash=") for tag in key_map_key.keys()]
     key_query = Content.objects.filter(
-        Q(tags__tag__in=key_map_key.keys()),
+        ContentTag.q_key_hashes(keyhashes, "tags__"),
         type="PrivateKey",
     ).annotate(
         matching_tag=Subquery(
             ContentTag.objects.filter(
-                tag__in=key_map_key.keys(), content_id=OuterRef("pk")
+                ContentTag.q_key_hashes(keyhashes), content_id=OuterRef("pk")
             ).values("tag")[:1]
         )
     )
@@ -62,7 +65,7 @@ async def create_key_maps(contents, keyset):
     async for ref in reference_query.annotate(
         matching_tag=Subquery(
             ContentTag.objects.filter(
-                content_id=OuterRef("target"), tag__in=key_map_key.keys()
+                ContentTag.q_key_hashes(keyhashes), content_id=OuterRef("target")
             ).values("tag")[:1]
         ),
         flexid=F("target__flexid"),
@@ -211,15 +214,106 @@ class ProxyTags:
 sync_create_key_maps = async_to_sync(create_key_maps)
 
 
+class SegmentedDecryptFile:
+    """Seekable file-like object with the decrypted data of a chunked content"""
+
+    def __init__(self, fileob, decryptor: SegmentedAESGCM, encryptedSize: int):
+        self.fileob = fileob
+        self.decryptor = decryptor
+        self.encryptedSize = encryptedSize
+        self.size = decryptor.plainSize(encryptedSize)
+        self.lastIndex = max(-(-encryptedSize // decryptor.segmentSize) - 1, 0)
+        self.position = 0
+        # index, decrypted data
+        self._segment = (None, b"")
+
+    def _get_segment(self, index: int) -> bytes:
+        if self._segment[0] != index:
+            self.fileob.seek(index * self.decryptor.segmentSize)
+            self._segment = (
+                index,
+                self.decryptor.decryptSegment(
+                    index,
+                    self.fileob.read(self.decryptor.segmentSize),
+                    index == self.lastIndex,
+                ),
+            )
+        return self._segment[1]
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self.position
+        size = min(size, self.size - self.position)
+        chunks = []
+        while size > 0:
+            index, offset = divmod(self.position, self.decryptor.chunkSize)
+            chunk = self._get_segment(index)[offset : offset + size]
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self.position += len(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.position = max(offset, 0)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self):
+        self.fileob.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 class ReadDecryptIterator:
     def __init__(self, content, decryptor):
         self.decryptor = decryptor
         self.content = content
 
+    def open_segmented(self) -> SegmentedDecryptFile:
+        return SegmentedDecryptFile(
+            self.content.file.open("rb"),
+            self.decryptor.cryptor,
+            # the size of the file without a storage lookup
+            self.content.size_file_cached,
+        )
+
+    def _iter_segmented(self):
+        with self.open_segmented() as fileob:
+            try:
+                while chunk := fileob.read(self.decryptor.cryptor.chunkSize):
+                    yield chunk
+            except exceptions.InvalidTag:
+                logging.warning(
+                    "Error decoding crypted content: %s (%s)",
+                    self.content.flexid,
+                    self.content.type,
+                )
+
+    def read(self) -> bytes:
+        return b"".join(self)
+
     def __iter__(self):
         if self.content.start_transfer:
             if not async_to_sync(self.content.start_transfer)():
                 return
+        if isinstance(self.decryptor, SegmentedAESGCMContext):
+            yield from self._iter_segmented()
+            return
         with self.content.file.open() as fileob:
             chunk = fileob.read(4096)
             nextchunk = None
@@ -247,6 +341,10 @@ class ReadDecryptIterator:
         if self.content.start_transfer:
             if not await self.content.start_transfer():
                 return
+        if isinstance(self.decryptor, SegmentedAESGCMContext):
+            for chunk in self._iter_segmented():
+                yield chunk
+            return
         with self.content.file.open() as fileob:
             chunk = fileob.read(4096)
             nextchunk = None
@@ -343,6 +441,7 @@ async def iter_decrypt_contents(
                 return ReadDecryptIterator(content, decryptor)
 
             _read_decrypt.key = content_map[content.id]
+            _read_decrypt.segmented = isinstance(decryptor, SegmentedAESGCMContext)
             content.read_decrypt = _read_decrypt
 
         elif content.state in public_states:
@@ -1,4 +1,4 @@
-from typing import Iterable, Optional
+from typing import AsyncIterable, Iterable, Optional
 
 from django.conf import settings
 
@@ -42,7 +42,11 @@ async def hashTagsContentHash(
 
 
 async def calculateHashes(
-    inp: bytes | PrivateCryptoKey | PublicCryptoKey | Iterable[bytes],
+    inp: bytes
+    | PrivateCryptoKey
+    | PublicCryptoKey
+    | Iterable[bytes]
+    | AsyncIterable[bytes],
 ) -> list[str]:
     return await _calculateHashes(
         inp, settings.SECRETGRAPH_HASH_ALGORITHMS, failhard=True
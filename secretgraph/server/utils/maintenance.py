@@ -0,0 +1,110 @@
+__all__ = [
+    "acquire_maintenance_lock",
+    "release_maintenance_lock",
+    "run_maintenance",
+    "maintenance_loop",
+    "request_maintenance",
+]
+
+import asyncio
+import logging
+import time
+from datetime import timedelta as td
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# identifies this process as lock holder
+_holder = uuid4().hex
+# monotonic timestamp, before it requests skip the db lock check
+_next_request_check = 0.0
+
+
+def _get_interval() -> float:
+    return getattr(settings, "SECRETGRAPH_MAINTENANCE_INTERVAL", 300)
+
+
+async def acquire_maintenance_lock(name="maintenance", force=False) -> bool:
+    """
+    Try to become the leader for the maintenance run via a db lease.
+    Fails if another process holds the lease or the interval is not over yet.
+    """
+    from ..models import MaintenanceLock
+
+    now = timezone.now()
+    locked_until = now + td(
+        seconds=getattr(settings, "SECRETGRAPH_MAINTENANCE_LOCK_TIMEOUT", 3600)
+    )
+    q = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    if not force:
+        last_run_before = now - td(seconds=_get_interval())
+        q &= Q(last_run__isnull=True) | Q(last_run__lte=last_run_before)
+    if await MaintenanceLock.objects.filter(q, name=name).aupdate(
+        holder=_holder, locked_until=locked_until
+    ):
+        return True
+    # initial run
+    try:
+        await MaintenanceLock.objects.acreate(
+            name=name, holder=_holder, locked_until=locked_until
+        )
+    except IntegrityError:
+        return False
+    return True
+
+
+async def release_maintenance_lock(name="maintenance"):
+    from ..models import MaintenanceLock
+
+    await MaintenanceLock.objects.filter(name=name, holder=_holder).aupdate(
+        locked_until=None, last_run=timezone.now()
+    )
+
+
+async def run_maintenance(force=False) -> bool:
+    """
+    Run the maintenance tasks if this process is elected as leader.
+    Returns if the tasks were run.
+    """
+    from ..signals import autoUnlock, fillOldEmptyCb, regenerateKeyHash, sweepOutdated
+
+    if not await acquire_maintenance_lock(force=force):
+        return False
+    try:
+        for task in (sweepOutdated, fillOldEmptyCb, autoUnlock, regenerateKeyHash):
+            try:
+                if asyncio.iscoroutinefunction(task):
+                    await task()
+                else:
+                    await sync_to_async(task)()
+            except Exception as exc:
+                logger.error("maintenance task %s failed", task.__name__, exc_info=exc)
+    finally:
+        await release_maintenance_lock()
+    return True
+
+
+async def maintenance_loop():
+    """Background task, e.g. started by the asgi lifespan handler"""
+    while True:
+        try:
+            await run_maintenance()
+        except Exception as exc:
+            logger.error("maintenance run failed", exc_info=exc)
+        await asyncio.sleep(_get_interval())
+
+
+async def request_maintenance(**kwargs):
+    """Signal receiver for running the maintenance within requests"""
+    global _next_request_check
+    # skip the db for most requests
+    if time.monotonic() < _next_request_check:
+        return
+    _next_request_check = time.monotonic() + _get_interval()
+    await run_maintenance()
@@ -43,7 +43,7 @@ def freeze_contents(content_ids, request=None, update=False):
                             content__in=contents,
                         ).values("content_id")
                     ),
-                ).update(tag="immutable")
+                ).update(tag="immutable", **ContentTag.lookup_fields("immutable"))
                 updated_ids = set(contents.values_list("id", flat=True))
             if request:
                 if update:
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import json
 import logging
+import mimetypes
 import os
 import re
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from urllib.parse import quote
 
 import django_fast_ratelimit as ratelimit
@@ -25,8 +26,10 @@ from django.views.decorators.http import last_modified
 from django.views.decorators.vary import vary_on_headers
 from django.views.generic import View
 from strawberry.django.views import AsyncGraphQLView
+from strawberry.http.exceptions import HTTPException
 
 from ..core import constants
+from .strawberry_extensions import get_persisted_query
 from .utils.auth import sync_retrieve_allowed_objects
 from .utils.encryption import iter_decrypt_contents_sync
 from .utils.mark import freeze_contents, update_file_accessed
@@ -148,6 +151,51 @@ def get_file_response_with_range_support(request, fileob, size, name):
     return response
 
 
+def get_offloaded_file_response(fieldfile, name) -> Optional[HttpResponse]:
+    """
+    Let the webserver serve the file (including ranges), if configured
+    Requires SECRETGRAPH_FILE_OFFLOAD: "x-accel-redirect" (nginx) or "x-sendfile"
+    """
+    mode = getattr(settings, "SECRETGRAPH_FILE_OFFLOAD", None)
+    if not mode:
+        return None
+    mode = mode.lower()
+    # like FileResponse, guess the type from the name
+    content_type, encoding = mimetypes.guess_type(name)
+    content_type = {
+        "br": "application/x-brotli",
+        "bzip2": "application/x-bzip",
+        "compress": "application/x-compress",
+        "gzip": "application/gzip",
+        "xz": "application/x-xz",
+    }.get(encoding, content_type)
+    response = HttpResponse(content_type=content_type or "application/octet-stream")
+    if mode == "x-accel-redirect":
+        response["X-Accel-Redirect"] = "%s%s" % (
+            getattr(settings, "SECRETGRAPH_FILE_OFFLOAD_PREFIX", "/protected-media/"),
+            quote(fieldfile.name),
+        )
+    elif mode == "x-sendfile":
+        try:
+            response["X-Sendfile"] = fieldfile.path
+        except NotImplementedError:
+            # storage has no local path
+            return None
+    else:
+        raise ValueError("invalid SECRETGRAPH_FILE_OFFLOAD mode: %s" % mode)
+    try:
+        # check if ascii
+        name.encode("ascii")
+        response["Content-Disposition"] = 'inline; filename="{}"'.format(
+            name.replace("\\", "\\\\").replace('"', r"\"")
+        )
+    except UnicodeEncodeError:
+        response["Content-Disposition"] = "inline; filename*=utf-8''{}".format(
+            quote(name)
+        )
+    return response
+
+
 class ContentView(View):
     @method_decorator(no_opener)
     @method_decorator(add_cors_headers)
@@ -253,11 +301,23 @@ class ContentView(View):
         name = names and names[0]
         if not name:
             name = "unknown.store"
-        if hasattr(content, "read_decrypt"):
+        read_decrypt = getattr(content, "read_decrypt", None)
+        if (
+            read_decrypt
+            and getattr(read_decrypt, "segmented", False)
+            and not content.start_transfer
+        ):
+            # chunked AESGCM, every segment has its own tag, so ranges are possible
+            fileob = read_decrypt().open_segmented()
+            response = get_file_response_with_range_support(
+                request, fileob, fileob.size, name
+            )
+            response["X-Robots-Tag"] = "noindex,nofollow"
+        elif read_decrypt:
             # no range support because of AESGCM tag,
             # Would require an crypto method to calculate the effective size
             # always async
-            response = StreamingHttpResponse(content.read_decrypt())
+            response = StreamingHttpResponse(read_decrypt())
             if isinstance(names[0], str):
                 # do it according to django
                 try:
@@ -272,7 +332,9 @@ class ContentView(View):
             # encrypted contents may not be indexed or followed
             response["X-Robots-Tag"] = "noindex,nofollow"
         else:
-            response = get_file_response_with_range_support(
+            response = get_offloaded_file_response(
+                content.file, name
+            ) or get_file_response_with_range_support(
                 request, content.file.open("rb"), content.file.size, name
             )
             if content.cluster.featured:
@@ -345,7 +407,9 @@ class ContentView(View):
                 name = name.tag.split("=", 1)[-1]
             if not name:
                 name = "unknown.store"
-            response = get_file_response_with_range_support(
+            response = get_offloaded_file_response(
+                content.file, name
+            ) or get_file_response_with_range_support(
                 request, content.file.open("rb"), content.file.size, name
             )
             update_file_accessed([content.id])
@@ -377,6 +441,30 @@ class CORSFileUploadGraphQLView(AsyncGraphQLView):
     async def stub_response(self, request, *args, **kwargs):
         return HttpResponse("stub for cluster")
 
+    async def parse_http_body(self, request):
+        request_data = await super().parse_http_body(request)
+        if request_data.query is None:
+            # hash only request, e.g. {"extensions": {"persistedQuery":
+            # {"version": 1, "sha256Hash": "..."}}}
+            if request.method == "GET":
+                extensions = request.query_params.get("extensions")
+            elif (request.content_type or "").startswith("multipart/form-data"):
+                extensions = self.parse_json(
+                    (await request.get_form_data())["form"].get("operations", "{}")
+                ).get("extensions")
+            else:
+                extensions = self.parse_json(await request.get_body()).get("extensions")
+            if isinstance(extensions, str):
+                extensions = self.parse_json(extensions)
+            sha256Hash = ((extensions or {}).get("persistedQuery") or {}).get(
+                "sha256Hash"
+            )
+            if sha256Hash:
+                request_data.query = get_persisted_query(sha256Hash)
+                if request_data.query is None:
+                    raise HTTPException(400, "PersistedQueryNotFound")
+        return request_data
+
     @method_decorator(add_cors_headers)
     async def dispatch(self, request, *args, **kwargs):
         # if settings.DEBUG and "operations" in request.POST:
@@ -391,6 +479,7 @@ class CORSFileUploadGraphQLView(AsyncGraphQLView):
             request.method.lower() == "get"
             and request.GET
             and "query" not in request.GET
+            and "extensions" not in request.GET
         ):
             return await self.stub_response(request, *args, **kwargs)
         return await super().dispatch(request, *args, **kwargs)
@@ -132,6 +132,11 @@ SECRETGRAPH_HTTPX_KWARGS_MAP = {
 }
 
 SECRETGRAPH_USE_RAW_FILE_WHEN_POSSIBLE = True
+# let the webserver serve raw downloads:
+# None, "x-accel-redirect" (nginx) or "x-sendfile" (requires local file storage)
+SECRETGRAPH_FILE_OFFLOAD = None
+# nginx: internal location which maps to MEDIA_ROOT
+SECRETGRAPH_FILE_OFFLOAD_PREFIX = "/protected-media/"
 
 #  for defining default global groups
 SECRETGRAPH_DEFAULT_NET_GROUPS = {}
@@ -145,6 +150,8 @@ SECRETGRAPH_FILETOKEN_LENGTH = 50
 SECRETGRAPH_OPERATION_SIZE_LIMIT = 500000
 # size limit for tag
 SECRETGRAPH_TAG_LIMIT = 8000
+# uploads bigger than this (in bytes) are spooled to disk while checking limits
+SECRETGRAPH_UPLOAD_SPOOL_SIZE = 1048576
 SECRETGRAPH_RATELIMITS = {
     "GRAPHQL_MUTATIONS": "100/2s",
     "GRAPHQL_ERRORS": "20/4m",
@@ -158,6 +165,41 @@ SECRETGRAPH_CHANNEL_NAME = "DEFAULT"
 
 SECRETGRAPH_STRAWBERRY_MAX_RESULTS = 500
 
+# amount of decrypted action values cached per process, 0 disables the cache
+SECRETGRAPH_ACTION_CACHE_SIZE = 2048
+# optional: name of a shared cache (CACHES) for decrypted action values
+# entries are encrypted with a key derived from the token, still the cache
+# should not be shared with untrusted parties (it reveals which actions are used)
+SECRETGRAPH_ACTION_CACHE = None
+
+# threads for cpu heavy crypto operations (rsa, pbkdf2, argon2), None: python default
+SECRETGRAPH_CRYPTO_THREADS = None
+# use a process pool with this amount of processes for key generation, 0: use threads
+SECRETGRAPH_KEYGEN_PROCESSES = 0
+# hash inputs smaller than this (in bytes) are hashed inline
+SECRETGRAPH_CRYPTO_INLINE_SIZE = 16384
+# amount of parsed DER keys cached per process, 0 disables the cache
+SECRETGRAPH_PARSED_KEY_CACHE_SIZE = 256
+# set to False to keep parsed private keys out of the cache
+SECRETGRAPH_CACHE_PRIVATE_KEYS = True
+# where maintenance (sweeping, unlocking, ...) runs:
+# "lifespan": background task of the asgi server, "request": within requests
+# (for tiny installs), None: externally via the sg_maintenance command
+SECRETGRAPH_MAINTENANCE = "lifespan"
+# seconds between maintenance runs, shared by all processes via a db lock
+SECRETGRAPH_MAINTENANCE_INTERVAL = 300
+# seconds until the lock of a crashed maintenance run expires
+SECRETGRAPH_MAINTENANCE_LOCK_TIMEOUT = 3600
+# seconds until stale content locks are removed, None disables auto unlocking
+SECRETGRAPH_AUTO_UNLOCK_AFTER = 172800
+# contents deleted per transaction when sweeping expired contents
+SECRETGRAPH_SWEEP_BATCH_SIZE = 1000
+# threads deleting the files of swept contents
+SECRETGRAPH_SWEEP_FILE_WORKERS = 8
+
+# register the bundled queries (secretgraph.queries) for hash only requests
+SECRETGRAPH_PERSISTED_QUERIES = True
+
 # at least 15 or so, we have very deep queries
 GRAPHENE_PROTECTOR_DEPTH_LIMIT = 20
 # complexity is here no problem, so set it extremely high
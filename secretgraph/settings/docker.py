@@ -80,6 +80,12 @@ if SECRETGRAPH_ADMINAREA:
 SECRETGRAPH_CACHE_DECRYPTED = (
     os.environ.get("CACHE_DECRYPTED", "false").lower() == "true"
 )
+# e.g. x-accel-redirect, requires the media volume mounted in nginx
+SECRETGRAPH_FILE_OFFLOAD = os.environ.get("FILE_OFFLOAD", "") or None
+# lifespan, request or none (external sg_maintenance command)
+SECRETGRAPH_MAINTENANCE = os.environ.get("MAINTENANCE", "lifespan").lower()
+if SECRETGRAPH_MAINTENANCE == "none":
+    SECRETGRAPH_MAINTENANCE = None
 
 ADMINS = []
 for addr in os.environ.get("ADMIN_MAILS", "").split(","):
@@ -3,11 +3,13 @@ import json
 import logging
 import os
 from contextlib import redirect_stderr
+from unittest import mock
 
 from asgiref.sync import async_to_sync
 from django.conf import settings
+from django.core.cache import caches
 from django.core.files.base import ContentFile
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from strawberry.django.context import StrawberryDjangoContext
 
 from secretgraph.core.utils.crypto import (
@@ -28,6 +30,14 @@ from secretgraph.queries.cluster import (
 from secretgraph.queries.node import authQuery
 from secretgraph.schema import schema
 from secretgraph.server.models import Action
+from secretgraph.server.utils.auth import (
+    _action_cache_key,
+    _action_value_cache,
+    aget_cached_results,
+    get_cached_result,
+    retrieve_allowed_objects,
+    retrieve_allowed_objects_multi,
+)
 
 
 class AuthTests(TestCase):
@@ -400,3 +410,137 @@ class AuthTests(TestCase):
                 StrawberryDjangoContext(request=request, response=None),
             )
         self.assertFalse(result.errors)
+
+    async def test_cached_action_values(self):
+        request = self.factory.get("/graphql")
+        result = await schema.execute(
+            createClusterMutation,
+            {
+                "name": "test",
+                "description": "test description",
+                "featured": True,
+                "primary": True,
+                "actions": [
+                    {
+                        "value": '{"action": "manage"}',
+                        "key": base64.b64encode(self.manage_token).decode(),
+                    },
+                    {
+                        "value": '{"action": "view"}',
+                        "key": base64.b64encode(self.view_token).decode(),
+                    },
+                ],
+            },
+            StrawberryDjangoContext(request=request, response=None),
+        )
+        self.assertFalse(result.errors)
+        clusterid = result.data["secretgraph"]["updateOrCreateCluster"]["cluster"]["id"]
+        authset = [f"{clusterid}:{base64.b64encode(self.view_token).decode()}"]
+        result = await retrieve_allowed_objects(
+            self.factory.get("/graphql"), "Cluster", scope="view", authset=authset
+        )
+        self.assertEqual(len(result["active_actions"]), 1)
+        with mock.patch("secretgraph.server.utils.auth.decrypt") as decrypt_mock:
+            result2 = await retrieve_allowed_objects(
+                self.factory.get("/graphql"), "Cluster", scope="view", authset=authset
+            )
+            decrypt_mock.assert_not_called()
+        self.assertEqual(result["active_actions"], result2["active_actions"])
+        action = await Action.objects.select_related("cluster__net").aget(
+            id=next(iter(result["active_actions"]))
+        )
+        key = _action_cache_key(action)
+        # net updates (e.g. bytes_in_use) don't change the action values
+        await action.cluster.net.asave()
+        await action.cluster.asave()
+        self.assertIn(key, _action_value_cache)
+        await action.adelete()
+        self.assertNotIn(key, _action_value_cache)
+
+    @override_settings(
+        SECRETGRAPH_ACTION_CACHE="default", SECRETGRAPH_ACTION_CACHE_SIZE=0
+    )
+    async def test_shared_action_cache_encrypted(self):
+        request = self.factory.get("/graphql")
+        result = await schema.execute(
+            createClusterMutation,
+            {
+                "name": "test",
+                "description": "test description",
+                "featured": True,
+                "primary": True,
+                "actions": [
+                    {
+                        "value": '{"action": "manage"}',
+                        "key": base64.b64encode(self.manage_token).decode(),
+                    },
+                    {
+                        "value": '{"action": "view"}',
+                        "key": base64.b64encode(self.view_token).decode(),
+                    },
+                ],
+            },
+            StrawberryDjangoContext(request=request, response=None),
+        )
+        self.assertFalse(result.errors)
+        clusterid = result.data["secretgraph"]["updateOrCreateCluster"]["cluster"]["id"]
+        authset = [f"{clusterid}:{base64.b64encode(self.view_token).decode()}"]
+        result = await retrieve_allowed_objects(
+            self.factory.get("/graphql"), "Cluster", scope="view", authset=authset
+        )
+        self.assertEqual(len(result["active_actions"]), 1)
+        action = await Action.objects.aget(id=next(iter(result["active_actions"])))
+        entry = await caches["default"].aget(_action_cache_key(action))
+        self.assertIsInstance(entry, bytes)
+        self.assertNotIn(b"view", entry)
+        with mock.patch("secretgraph.server.utils.auth.decrypt") as decrypt_mock:
+            result2 = await retrieve_allowed_objects(
+                self.factory.get("/graphql"), "Cluster", scope="view", authset=authset
+            )
+            decrypt_mock.assert_not_called()
+        self.assertEqual(result["active_actions"], result2["active_actions"])
+
+    async def test_multiple_scopes(self):
+        request = self.factory.get("/graphql")
+        result = await schema.execute(
+            createClusterMutation,
+            {
+                "name": "test",
+                "description": "test description",
+                "featured": True,
+                "primary": True,
+                "actions": [
+                    {
+                        "value": '{"action": "manage"}',
+                        "key": base64.b64encode(self.manage_token).decode(),
+                    },
+                ],
+            },
+            StrawberryDjangoContext(request=request, response=None),
+        )
+        self.assertFalse(result.errors)
+        clusterid = result.data["secretgraph"]["updateOrCreateCluster"]["cluster"]["id"]
+        authset = [f"{clusterid}:{base64.b64encode(self.manage_token).decode()}"]
+        request = self.factory.get("/graphql")
+        results = await retrieve_allowed_objects_multi(
+            request, "Cluster", ("view", "delete", "peek"), authset=authset
+        )
+        self.assertEqual(set(results.keys()), {"view", "delete", "peek"})
+        for scope, result in results.items():
+            self.assertEqual(result["scope"], scope)
+            self.assertEqual(len(result["active_actions"]), 1)
+            self.assertEqual(await result["objects_without_public"].acount(), 1)
+        cached = await aget_cached_results(
+            request,
+            "Cluster",
+            {"secretgraphResult": "view", "secretgraphDeleteResult": "delete"},
+            authset=authset,
+        )
+        self.assertEqual(
+            cached["secretgraphDeleteResult"]["active_actions"],
+            results["delete"]["active_actions"],
+        )
+        self.assertEqual(
+            get_cached_result(request, authset=authset)["Cluster"],
+            cached["secretgraphResult"],
+        )
@@ -1,36 +1,91 @@
+import asyncio
 import base64
+import hashlib
+import io
 import json
 import os
 from contextlib import redirect_stderr
+from unittest import mock
 from urllib.parse import quote_plus
 
 import httpx
+from asgiref.sync import async_to_sync, sync_to_async
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
 from django.conf import settings
 from django.core.files.base import ContentFile
-from django.test import RequestFactory, TransactionTestCase
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from strawberry.django.context import StrawberryDjangoContext
+from strawberry.relay import to_base64
 
 from secretgraph.asgi import application
+from secretgraph.core.constants import DeleteRecursive
+from secretgraph.core.utils import base_crypto
+from secretgraph.core.utils.base_crypto import (
+    SegmentedAESGCM,
+    clearParsedKeyCache,
+    getParsedKeyCacheStats,
+    loadDERKey,
+    setParsedKeyCache,
+)
 from secretgraph.core.utils.crypto import (
+    decryptString,
     encrypt,
     encryptString,
     findWorkingAlgorithms,
     generateEncryptionKey,
     generateSignKey,
+    getDecryptor,
+    getEncryptor,
     getSignatureHasher,
     serializeEncryptionParams,
     sign,
     toPublicKey,
+    verify,
 )
 from secretgraph.core.utils.hashing import (
+    calculateHashesForHashAlgorithms,
     hashObject,
 )
 from secretgraph.core.utils.verification import verify_content
 from secretgraph.queries.cluster import createClusterMutation
 from secretgraph.queries.content import createContentMutation
 from secretgraph.queries.key import createKeysMutation
+from secretgraph.queries.node import getPermissions
 from secretgraph.schema import schema
-from secretgraph.server.models import Cluster, Content
+from secretgraph.server.actions.update import ReferenceInput, transform_references
+from secretgraph.server.actions.update._contents import _spool_value
+from secretgraph.server.models import (
+    Cluster,
+    ClusterGroup,
+    Content,
+    ContentReference,
+    ContentTag,
+    Net,
+)
+from secretgraph.server.signals import regenerateKeyHash
+from secretgraph.server.utils.auth import LazyViewResult
+from secretgraph.server.utils.deletion import (
+    bulk_delete_contents,
+    collect_deletion_closure,
+)
+from secretgraph.server.utils.encryption import (
+    ReadDecryptIterator,
+    SegmentedDecryptFile,
+)
+from secretgraph.server.utils.maintenance import (
+    acquire_maintenance_lock,
+    release_maintenance_lock,
+    run_maintenance,
+)
+from secretgraph.server.views import (
+    get_file_response_with_range_support,
+    get_offloaded_file_response,
+)
 
 
 # verify_content requires TransactionTestCase
@@ -39,6 +94,886 @@ class BasicTests(TransactionTestCase):
         # Every test needs access to the request factory.
         self.factory = RequestFactory()
 
+    async def test_curve25519_algorithms(self):
+        sign_key = await generateSignKey("ed25519-sha512")
+        public_sign_key = await toPublicKey(
+            sign_key.key, algorithm="ed25519-sha512", sign=True
+        )
+        signature = await sign(sign_key.key, b"secretgraph", "ed25519-sha512")
+        self.assertTrue(await verify(public_sign_key.key, signature, b"secretgraph"))
+        self.assertFalse(await verify(public_sign_key.key, signature, b"other"))
+        hasher = await getSignatureHasher("ed25519-sha512")
+        hasher.update(b"secretgraph")
+        self.assertTrue(
+            await verify(
+                public_sign_key.key, signature, hasher.finalize(), prehashed=True
+            )
+        )
+
+        encryption_key = await generateEncryptionKey("x25519-hkdf-aesgcm")
+        public_encryption_key = await toPublicKey(
+            encryption_key.key, algorithm="x25519-hkdf-aesgcm", sign=False
+        )
+        encrypted = await encryptString(
+            public_encryption_key.key, b"secretgraph", algorithm="x25519-hkdf-aesgcm"
+        )
+        self.assertEqual(
+            (await decryptString(encryption_key.key, encrypted)).data, b"secretgraph"
+        )
+
+    async def test_multi_hashing(self):
+        expected = [
+            await hashObject(b"secretgraph", "sha512"),
+            await hashObject(b"secretgraph", "sha256"),
+        ]
+
+        async def chunks():
+            yield b"secret"
+            yield b"graph"
+
+        for inp in [
+            b"secretgraph",
+            iter([b"secret", b"graph"]),
+            chunks(),
+        ]:
+            self.assertEqual(
+                await calculateHashesForHashAlgorithms(inp, ["sha512", "sha256"]),
+                expected,
+            )
+
+    def test_parsed_key_cache(self):
+        def der_keypair():
+            key = ed25519.Ed25519PrivateKey.generate()
+            return (
+                key.private_bytes(
+                    encoding=serialization.Encoding.DER,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption(),
+                ),
+                key.public_key().public_bytes(
+                    encoding=serialization.Encoding.DER,
+                    format=serialization.PublicFormat.SubjectPublicKeyInfo,
+                ),
+            )
+
+        self.addCleanup(
+            setParsedKeyCache,
+            size=base_crypto.parsedKeyCacheSize,
+            privateKeys=base_crypto.cachePrivateKeys,
+        )
+        setParsedKeyCache(size=2, privateKeys=True)
+        clearParsedKeyCache()
+        private1, public1 = der_keypair()
+        _, public2 = der_keypair()
+        _, public3 = der_keypair()
+        with self.subTest("hits and misses"):
+            key = loadDERKey(public1)
+            self.assertIs(loadDERKey(public1), key)
+            self.assertEqual(
+                getParsedKeyCacheStats(), {"hits": 1, "misses": 1, "size": 1}
+            )
+        with self.subTest("least recently used key is evicted"):
+            loadDERKey(public2)
+            # public1 is now the most recently used key
+            self.assertIs(loadDERKey(public1), key)
+            loadDERKey(public3)
+            self.assertEqual(getParsedKeyCacheStats()["size"], 2)
+            self.assertIs(loadDERKey(public1), key)
+            misses = getParsedKeyCacheStats()["misses"]
+            loadDERKey(public2)
+            self.assertEqual(getParsedKeyCacheStats()["misses"], misses + 1)
+        with self.subTest("clear"):
+            clearParsedKeyCache()
+            self.assertEqual(
+                getParsedKeyCacheStats(), {"hits": 0, "misses": 0, "size": 0}
+            )
+            self.assertIsNot(loadDERKey(public1), key)
+        with self.subTest("private keys"):
+            private_key = loadDERKey(private1, private=True)
+            self.assertIs(loadDERKey(private1, private=True), private_key)
+            with self.assertRaises(ValueError):
+                loadDERKey(public1, private=True)
+        with self.subTest("private keys opt-out"):
+            setParsedKeyCache(privateKeys=False)
+            clearParsedKeyCache()
+            private_key = loadDERKey(private1, private=True)
+            self.assertIsNot(loadDERKey(private1, private=True), private_key)
+            self.assertEqual(getParsedKeyCacheStats()["size"], 0)
+            # public keys are still cached
+            key = loadDERKey(public1)
+            self.assertIs(loadDERKey(public1), key)
+        with self.subTest("disabled"):
+            setParsedKeyCache(size=0)
+            self.assertIsNot(loadDERKey(public1), loadDERKey(public1))
+            self.assertEqual(getParsedKeyCacheStats()["size"], 0)
+
+    async def test_chunked_aesgcm_range(self):
+        key = os.urandom(32)
+        data = os.urandom(5000)
+        encrypted = await encrypt(
+            key, data, params={"chunkSize": 1024}, algorithm="AESGCM-chunked"
+        )
+        self.assertEqual(
+            (
+                await decryptString(
+                    key,
+                    await encryptString(
+                        key,
+                        data,
+                        params={"chunkSize": 1024},
+                        algorithm="AESGCM-chunked",
+                    ),
+                )
+            ).data,
+            data,
+        )
+        fileob = SegmentedDecryptFile(
+            io.BytesIO(encrypted.data),
+            SegmentedAESGCM(key, encrypted.params["nonce"], 1024),
+            len(encrypted.data),
+        )
+        self.assertEqual(fileob.size, len(data))
+        request = self.factory.get("/", HTTP_RANGE="bytes=1000-3099")
+        response = get_file_response_with_range_support(
+            request, fileob, fileob.size, "foo"
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(
+            b"".join([chunk async for chunk in response.streaming_content]),
+            data[1000:3100],
+        )
+        with self.subTest("streaming"):
+            encryptor = await getEncryptor(
+                key, "AESGCM-chunked", params=encrypted.params
+            )
+            streamed = b"".join(
+                encryptor.update(data[position : position + 700])
+                for position in range(0, len(data), 700)
+            )
+            self.assertEqual(streamed + encryptor.finalize(), encrypted.data)
+            decryptor = await getDecryptor(
+                key, "AESGCM-chunked", params=encrypted.params
+            )
+            self.assertEqual(
+                decryptor.update(encrypted.data) + decryptor.finalize(), data
+            )
+            # like the AESGCM decryptor, the tag can be provided separately
+            decryptor = await getDecryptor(
+                key, "AESGCM-chunked", params=encrypted.params
+            )
+            self.assertEqual(
+                decryptor.update(encrypted.data[:-16])
+                + decryptor.finalize_with_tag(encrypted.data[-16:]),
+                data,
+            )
+        with self.subTest("read decrypt"):
+            content = Content(cluster_id=0)
+            content.file.save("ignored", ContentFile(encrypted.data), save=False)
+            self.addCleanup(content.file.delete, save=False)
+            content.size_file_cached = len(encrypted.data)
+            content.start_transfer = None
+            iterator = ReadDecryptIterator(
+                content,
+                await getDecryptor(key, "AESGCM-chunked", params=encrypted.params),
+            )
+            # the cached size is used instead of a storage lookup
+            with mock.patch.object(content.file.storage, "size", side_effect=OSError):
+                with iterator.open_segmented() as fileob:
+                    self.assertEqual(fileob.size, len(data))
+                self.assertEqual(iterator.read(), data)
+
+    def test_file_offload(self):
+        class FakeFieldFile:
+            name = "foo/bar baz"
+            path = "/media/foo/bar baz"
+
+        self.assertIsNone(get_offloaded_file_response(FakeFieldFile, "test"))
+        with override_settings(SECRETGRAPH_FILE_OFFLOAD="x-accel-redirect"):
+            response = get_offloaded_file_response(FakeFieldFile, "test")
+            self.assertEqual(
+                response["X-Accel-Redirect"], "/protected-media/foo/bar%20baz"
+            )
+        with override_settings(SECRETGRAPH_FILE_OFFLOAD="x-sendfile"):
+            response = get_offloaded_file_response(FakeFieldFile, "test")
+            self.assertEqual(response["X-Sendfile"], "/media/foo/bar baz")
+            self.assertEqual(response["Content-Type"], "application/octet-stream")
+            for name, content_type in [
+                ("image.png", "image/png"),
+                ("video.mp4", "video/mp4"),
+                ("archive.tar.gz", "application/gzip"),
+            ]:
+                with self.subTest(name):
+                    response = get_offloaded_file_response(FakeFieldFile, name)
+                    self.assertEqual(response["Content-Type"], content_type)
+
+    async def _create_signed_cluster(self):
+        """cluster with a public sign key and a manage token"""
+        manage_token = base64.b64encode(os.urandom(50)).decode()
+        signkey = await generateSignKey("rsa-sha512", {"bits": 2048})
+        pub_signkey = await toPublicKey(
+            signkey.key, algorithm=signkey.serializedName, sign=True
+        )
+        result = await schema.execute(
+            createClusterMutation,
+            {
+                "name": "test",
+                "description": "test description",
+                "featured": False,
+                "primary": True,
+                "keys": [
+                    {
+                        "publicKey": ContentFile(pub_signkey.key),
+                        "publicState": "public",
+                        "publicTags": ["name=initial sign key"],
+                    },
+                ],
+                "actions": [{"value": '{"action": "manage"}', "key": manage_token}],
+            },
+            StrawberryDjangoContext(
+                request=self.factory.get("/graphql"), response=None
+            ),
+        )
+        self.assertFalse(result.errors)
+        clusterid = result.data["secretgraph"]["updateOrCreateCluster"]["cluster"]["id"]
+        return clusterid, f"{clusterid}:{manage_token}", signkey, pub_signkey
+
+    async def test_base64_value(self):
+        clusterid, m_token, signkey, pub_signkey = await self._create_signed_cluster()
+        hash_algos = findWorkingAlgorithms(settings.SECRETGRAPH_HASH_ALGORITHMS, "hash")
+        # spans multiple decoding chunks
+        data = os.urandom(100000)
+        result = await schema.execute(
+            createContentMutation,
+            {
+                "cluster": clusterid,
+                "type": "File",
+                "state": "public",
+                "tags": ["name=foo", "mime=application/octet-stream"],
+                "references": [
+                    {
+                        "group": "signature",
+                        "target": await hashObject(pub_signkey.key, hash_algos[0]),
+                        "extra": await sign(signkey.key, data, algorithm="rsa-sha512"),
+                    },
+                ],
+                "value": base64.b64encode(data).decode(),
+                "authorization": [m_token],
+            },
+            StrawberryDjangoContext(
+                request=self.factory.get("/graphql"), response=None
+            ),
+        )
+        self.assertFalse(result.errors)
+        content = await Content.objects.aget(type="File")
+        self.assertEqual(content.size_file, len(data))
+        with content.file.open("rb") as f:
+            self.assertEqual(f.read(), data)
+        with self.subTest("lenient fallback for line breaks"):
+            spooled = _spool_value(base64.encodebytes(data).decode(), lambda size: None)
+            self.assertEqual(spooled.size, len(data))
+            self.assertEqual(spooled.read(), data)
+        with self.subTest("size is checked while decoding"):
+
+            def check_size(size):
+                if size > 1000:
+                    raise ValueError("file too big")
+
+            with self.assertRaises(ValueError):
+                _spool_value(base64.b64encode(data).decode(), check_size)
+
+    async def test_create_contents_batch(self):
+        clusterid, m_token, signkey, pub_signkey = await self._create_signed_cluster()
+        other_clusterid, other_m_token, _, _ = await self._create_signed_cluster()
+        hash_algos = findWorkingAlgorithms(settings.SECRETGRAPH_HASH_ALGORITHMS, "hash")
+        data = b"batch content"
+        content_spec = {
+            "type": "File",
+            "state": "public",
+            "tags": ["name=foo", "mime=application/octet-stream"],
+            "references": [
+                {
+                    "group": "signature",
+                    "target": await hashObject(pub_signkey.key, hash_algos[0]),
+                    "extra": await sign(signkey.key, data, algorithm="rsa-sha512"),
+                },
+            ],
+        }
+        cluster = await Cluster.objects.select_related("net").aget(
+            flexid_cached=clusterid
+        )
+        bytes_in_use = cluster.net.bytes_in_use
+        result = await schema.execute(
+            createContentMutation,
+            {
+                **content_spec,
+                "cluster": clusterid,
+                "value": ContentFile(data),
+                "authorization": [m_token],
+            },
+            StrawberryDjangoContext(
+                request=self.factory.get("/graphql"), response=None
+            ),
+        )
+        self.assertFalse(result.errors)
+        await cluster.net.arefresh_from_db()
+        single_size = cluster.net.bytes_in_use - bytes_in_use
+        bytes_in_use = cluster.net.bytes_in_use
+        contents_mutation = """
+        mutation contentsCreate(
+            $contents: [ContentInput!]!
+            $authorization: [String!]
+        ) {
+            secretgraph {
+                createContents(
+                    input: { contents: $contents, authorization: $authorization }
+                ) {
+                    contents {
+                        id
+                        tags
+                    }
+                    writeok
+                }
+            }
+        }
+        """
+        variables = {
+            "contents": [
+                {
+                    "cluster": clusterid,
+                    # ignored like for updateOrCreateContent
+                    "net": other_clusterid,
+                    "value": {
+                        **content_spec,
+                        "value": base64.b64encode(data).decode(),
+                    },
+                }
+                for _ in range(3)
+            ],
+            "authorization": [m_token, other_m_token],
+        }
+        content_count = await Content.objects.acount()
+        content_dir = os.path.dirname(
+            (await Content.objects.filter(type="File").afirst()).file.name
+        )
+        files = default_storage.listdir(content_dir)[1]
+        with self.subTest("rollback"):
+            with mock.patch.object(
+                ContentReference.objects, "bulk_create", side_effect=IntegrityError
+            ):
+                result = await schema.execute(
+                    contents_mutation,
+                    variables,
+                    StrawberryDjangoContext(
+                        request=self.factory.get("/graphql"), response=None
+                    ),
+                )
+            self.assertTrue(result.errors)
+            # neither contents nor orphaned files are left
+            self.assertEqual(await Content.objects.acount(), content_count)
+            self.assertEqual(default_storage.listdir(content_dir)[1], files)
+        result = await schema.execute(
+            contents_mutation,
+            variables,
+            StrawberryDjangoContext(
+                request=self.factory.get("/graphql"), response=None
+            ),
+        )
+        self.assertFalse(result.errors)
+        mutation_result = result.data["secretgraph"]["createContents"]
+        self.assertTrue(mutation_result["writeok"])
+        self.assertEqual(len(mutation_result["contents"]), 3)
+        for node in mutation_result["contents"]:
+            self.assertEqual(
+                set(node["tags"]), {"name=foo", "mime=application/octet-stream"}
+            )
+        contents = Content.objects.filter(
+            flexid_cached__in=[node["id"] for node in mutation_result["contents"]]
+        )
+        self.assertEqual(await contents.filter(net_id=cluster.net_id).acount(), 3)
+        self.assertEqual(
+            await ContentTag.objects.filter(content__in=contents).acount(), 6
+        )
+        self.assertEqual(
+            await ContentReference.objects.filter(
+                source__in=contents, group="signature"
+            ).acount(),
+            3,
+        )
+        # accounted like the same single create
+        await cluster.net.arefresh_from_db()
+        self.assertEqual(cluster.net.bytes_in_use - bytes_in_use, 3 * single_size)
+
+    async def test_maintenance_lock(self):
+        self.assertTrue(await acquire_maintenance_lock())
+        # held by the first run
+        self.assertFalse(await acquire_maintenance_lock())
+        await release_maintenance_lock()
+        # interval not over yet
+        self.assertFalse(await acquire_maintenance_lock())
+        self.assertFalse(await run_maintenance())
+        self.assertTrue(await run_maintenance(force=True))
+
+    async def test_lazy_view_result_shared(self):
+        calls = []
+
+        async def fn(request, item, authset):
+            calls.append(item)
+            await asyncio.sleep(0)
+            return {"item": item}
+
+        result = LazyViewResult(fn, self.factory.get("/graphql"), authset=[])
+        results = await asyncio.gather(*(result.aat("Content") for _ in range(10)))
+        # concurrent resolvers share one evaluation
+        self.assertEqual(calls, ["Content"])
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_ids_generated_before_insert(self):
+        net = Net.objects.create()
+        with CaptureQueriesContext(connection) as ctx:
+            cluster = Cluster.objects.create(net=net)
+        # one write, no resaves
+        statements = [q["sql"].split(" ", 1)[0] for q in ctx.captured_queries]
+        self.assertEqual(statements.count("INSERT"), 1)
+        self.assertNotIn("UPDATE", statements)
+        self.assertTrue(cluster.flexid)
+        self.assertEqual(cluster.flexid_cached, to_base64("Cluster", cluster.flexid))
+        clusters = Cluster.objects.bulk_create([Cluster(net=net), Cluster(net=net)])
+        self.assertEqual(
+            Cluster.objects.filter(
+                flexid__in=[c.flexid for c in clusters], flexid_cached__isnull=False
+            ).count(),
+            2,
+        )
+
+    def test_transform_references_batched(self):
+        net = Net.objects.create()
+        cluster = Cluster.objects.create(net=net)
+        key = Content.objects.create(
+            net=net, cluster=cluster, type="PublicKey", contentHash="Key:abc"
+        )
+        ContentTag.objects.create(content=key, tag="key_hash=abc")
+        target = Content.objects.create(net=net, cluster=cluster, type="File")
+        references = [
+            ReferenceInput(group="signature", target="abc", extra="first"),
+            ReferenceInput(group="signature", target="abc", extra="second"),
+            ReferenceInput(group="", target=target.flexid),
+            ReferenceInput(group="", target=target.id),
+            ReferenceInput(group="", target="missing"),
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            final_references, _, sig_target_hashes, _, _ = transform_references(
+                Content(net=net, cluster=cluster),
+                references,
+                set(),
+                Content.objects.all(),
+            )
+        # independent of the amount of references
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+        self.assertEqual(sig_target_hashes, {"abc"})
+        self.assertEqual(
+            [(ref.group, ref.target.id, ref.extra) for ref in final_references],
+            [("signature", key.id, "first"), ("", target.id, "")],
+        )
+        with self.subTest("injected key"):
+            injected = Content.objects.create(
+                net_id=0,
+                cluster_id=0,
+                type="PublicKey",
+                state="public",
+                contentHash="Key:injected",
+            )
+            ContentTag.objects.create(content=injected, tag="key_hash=injected")
+            ClusterGroup.objects.create(name="injecttest").injectedKeys.add(injected)
+            final_references, encrypt_target_hashes, _, _, _ = transform_references(
+                Content(net=net, cluster=cluster),
+                [ReferenceInput(group="key", target="injected", extra="shared")],
+                set(),
+                # injected keys are not visible
+                Content.objects.exclude(cluster_id=0),
+            )
+            self.assertEqual(encrypt_target_hashes, {"injected"})
+            self.assertEqual(
+                [(ref.group, ref.target.id, ref.extra) for ref in final_references],
+                [("key", injected.id, "shared")],
+            )
+
+    def test_node_fields_batched(self):
+        query = """
+            query {
+                secretgraph {
+                    contents(filters: { states: ["public"] }) {
+                        edges {
+                            node {
+                                tags(includeTags: ["name="])
+                                properties
+                                readStatistic {
+                                    count
+                                    last
+                                }
+                                cluster {
+                                    properties
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        """
+        net = Net.objects.create()
+        # public contents are only listed for global clusters
+        cluster = Cluster.objects.create(
+            net=net, name="batched", globalNameRegisteredAt=timezone.now()
+        )
+        query_counts = []
+        for amount in [2, 6]:
+            for i in range(amount - Content.objects.count()):
+                content = Content.objects.create(
+                    net=net, cluster=cluster, type="File", state="public"
+                )
+                ContentTag.objects.create(content=content, tag=f"name={i}")
+            request = self.factory.get("/graphql")
+            # queries run in this thread, so they can be captured
+            with CaptureQueriesContext(connection) as ctx:
+                result = async_to_sync(schema.execute)(
+                    query, {}, StrawberryDjangoContext(request=request, response=None)
+                )
+            self.assertFalse(result.errors)
+            edges = result.data["secretgraph"]["contents"]["edges"]
+            self.assertEqual(len(edges), amount)
+            self.assertEqual(edges[0]["node"]["readStatistic"]["count"], 0)
+            self.assertEqual(len(edges[0]["node"]["tags"]), 1)
+            query_counts.append(len(ctx.captured_queries))
+            # the clusters are already selected with the contents
+            self.assertFalse(
+                [
+                    query
+                    for query in ctx.captured_queries
+                    if query["sql"].startswith('SELECT "secretgraph_cluster"."id", ')
+                ]
+            )
+        # grows with the fields, not with the page size
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_nested_references_batched(self):
+        query = """
+            query {
+                secretgraph {
+                    contents(
+                        filters: { states: ["public"], includeTags: ["name=src"] }
+                    ) {
+                        edges {
+                            node {
+                                references(filters: { groups: ["link"] }) {
+                                    edges {
+                                        node {
+                                            id
+                                            target {
+                                                tags(includeTags: ["name="])
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        """
+        net = Net.objects.create()
+        # public contents are only listed for global clusters
+        cluster = Cluster.objects.create(
+            net=net, name="nested", globalNameRegisteredAt=timezone.now()
+        )
+        sources = Content.objects.filter(tags__tag="name=src")
+        query_counts = []
+        for amount in [2, 6]:
+            for i in range(amount - sources.count()):
+                source, target = [
+                    Content.objects.create(
+                        net=net, cluster=cluster, type="File", state="public"
+                    )
+                    for _ in range(2)
+                ]
+                ContentTag.objects.create(content=source, tag="name=src")
+                ContentTag.objects.create(content=target, tag=f"name=target{i}")
+                ContentReference.objects.create(
+                    source=source, target=target, group="link"
+                )
+            request = self.factory.get("/graphql")
+            with CaptureQueriesContext(connection) as ctx:
+                result = async_to_sync(schema.execute)(
+                    query, {}, StrawberryDjangoContext(request=request, response=None)
+                )
+            self.assertFalse(result.errors)
+            edges = result.data["secretgraph"]["contents"]["edges"]
+            self.assertEqual(len(edges), amount)
+            for edge in edges:
+                references = edge["node"]["references"]["edges"]
+                self.assertEqual(len(references), 1)
+                self.assertTrue(references[0]["node"]["id"])
+                self.assertEqual(len(references[0]["node"]["target"]["tags"]), 1)
+            query_counts.append(len(ctx.captured_queries))
+        # references, targets and their tags are loaded per page
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    async def test_persisted_queries(self):
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=application),
+            base_url="http://testserver",
+        )
+        sha256Hash = hashlib.sha256(getPermissions.encode("utf8")).hexdigest()
+        variables = {"authorization": []}
+        full = await client.post(
+            "/graphql/",
+            json={"query": getPermissions, "variables": variables},
+        )
+        self.assertEqual(full.status_code, 200)
+        self.assertNotIn("errors", full.json())
+        persisted = await client.post(
+            "/graphql/",
+            json={
+                "variables": variables,
+                "extensions": {"persistedQuery": {"sha256Hash": sha256Hash}},
+            },
+        )
+        self.assertEqual(persisted.status_code, 200)
+        self.assertEqual(persisted.json(), full.json())
+        unknown = await client.post(
+            "/graphql/",
+            json={"extensions": {"persistedQuery": {"sha256Hash": "0" * 64}}},
+        )
+        self.assertEqual(unknown.status_code, 400)
+        self.assertIn("PersistedQueryNotFound", unknown.text)
+
+    def test_keyset_pagination(self):
+        query = """
+            query ($first: Int, $after: String, $last: Int, $before: String) {
+                secretgraph {
+                    contents(
+                        filters: { states: ["public"] }
+                        first: $first
+                        after: $after
+                        last: $last
+                        before: $before
+                    ) {
+                        edges {
+                            node {
+                                id
+                            }
+                        }
+                        pageInfo {
+                            startCursor
+                            endCursor
+                            hasNextPage
+                            hasPreviousPage
+                        }
+                    }
+                }
+            }
+        """
+        net = Net.objects.create()
+        cluster = Cluster.objects.create(
+            net=net, name="paginated", globalNameRegisteredAt=timezone.now()
+        )
+        contents = [
+            Content.objects.create(
+                net=net, cluster=cluster, type="File", state="public"
+            ).flexid_cached
+            for _ in range(5)
+        ]
+
+        def execute(**variables):
+            result = async_to_sync(schema.execute)(
+                query,
+                variables,
+                StrawberryDjangoContext(
+                    request=self.factory.get("/graphql"), response=None
+                ),
+            )
+            self.assertFalse(result.errors)
+            return result.data["secretgraph"]["contents"]
+
+        seen = []
+        after = None
+        while True:
+            page = execute(first=2, after=after)
+            seen.extend(edge["node"]["id"] for edge in page["edges"])
+            if not page["pageInfo"]["hasNextPage"]:
+                break
+            after = page["pageInfo"]["endCursor"]
+        self.assertEqual(seen, contents)
+        page = execute(last=2, before=after)
+        self.assertEqual([edge["node"]["id"] for edge in page["edges"]], contents[1:3])
+        self.assertTrue(page["pageInfo"]["hasPreviousPage"])
+        self.assertTrue(page["pageInfo"]["hasNextPage"])
+
+    def test_tag_lookup_fields(self):
+        net = Net.objects.create()
+        cluster = Cluster.objects.create(net=net)
+        content = Content.objects.create(net=net, cluster=cluster, type="File")
+        long_tag = "description=" + "a" * ContentTag.prefix_length
+        ContentTag.objects.create(content=content, tag="name=foo")
+        ContentTag.objects.bulk_create(
+            [
+                ContentTag(content=content, tag=long_tag),
+                ContentTag(content=content, tag="freeze"),
+                ContentTag(content=content, tag="key_hash=abc"),
+                ContentTag(content=content, tag="name=abc"),
+            ]
+        )
+        self.assertFalse(ContentTag.objects.filter(tag_digest="").exists())
+        for q, expected in [
+            (ContentTag.q_equal("name=foo"), {"name=foo"}),
+            (ContentTag.q_equal("name=fo"), set()),
+            (ContentTag.q_startswith("name="), {"name=foo", "name=abc"}),
+            (ContentTag.q_startswith(long_tag), {long_tag}),
+            (ContentTag.q_startswith(f"{long_tag}b"), set()),
+            (ContentTag.q_in(["name=foo", long_tag]), {"name=foo", long_tag}),
+            (ContentTag.q_key_hashes(["abc", "foo"]), {"key_hash=abc"}),
+        ]:
+            self.assertEqual(
+                set(ContentTag.objects.filter(q).values_list("tag", flat=True)),
+                expected,
+            )
+        self.assertTrue(
+            Content.objects.filter(
+                ContentTag.q_startswith("name=f", "tags__"), id=content.id
+            ).exists()
+        )
+
+    def test_regenerate_key_hash_sizes(self):
+        pub_key = (
+            ed25519.Ed25519PrivateKey.generate()
+            .public_key()
+            .public_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+        )
+        new_hash, old_hash = async_to_sync(calculateHashesForHashAlgorithms)(
+            pub_key, ["sha256", "sha512"]
+        )
+        net = Net.objects.create()
+        cluster = Cluster.objects.create(net=net)
+        key = Content(
+            net=net,
+            cluster=cluster,
+            type="PublicKey",
+            state="public",
+            contentHash=f"Key:{old_hash}",
+        )
+        key.file.save("ignored", ContentFile(pub_key))
+        content = Content(net=net, cluster=cluster, type="File", state="public")
+        content.file.save("ignored", ContentFile(b"abc"))
+        for obj in [key, content]:
+            ContentTag.objects.create(content=obj, tag=f"key_hash={old_hash}")
+            obj.update_size_cache()
+        net.bytes_in_use = net.calculate_bytes_in_use()
+        net.save(update_fields=["bytes_in_use"])
+        with override_settings(SECRETGRAPH_HASH_ALGORITHMS=["sha256", "sha512"]):
+            async_to_sync(regenerateKeyHash)()
+        key.refresh_from_db()
+        self.assertEqual(key.contentHash, f"Key:{new_hash}")
+        for obj in [key, content]:
+            obj.refresh_from_db()
+            self.assertEqual(
+                set(obj.tags.values_list("tag", flat=True)),
+                {f"key_hash={new_hash}", f"key_hash={old_hash}"},
+            )
+            self.assertEqual(obj.size_tags_cached, obj.calculate_size_tags())
+        net.refresh_from_db()
+        self.assertEqual(net.bytes_in_use, net.calculate_bytes_in_use())
+
+    def test_bulk_delete_contents(self):
+        net = Net.objects.create(bytes_in_use=10000)
+        cluster = Cluster.objects.create(net=net)
+        contents = {}
+        for name in "abcdef":
+            content = Content(
+                net=net,
+                cluster=cluster,
+                type="File",
+                state="public",
+                size_file_cached=3,
+            )
+            content.file.save("ignored", ContentFile(b"abc"))
+            contents[name] = content
+        for source, target, group, recursive in [
+            ("b", "a", "", DeleteRecursive.TRUE),
+            ("c", "a", "x", DeleteRecursive.NO_GROUP),
+            ("c", "d", "x", DeleteRecursive.NO_GROUP),
+            ("e", "a", "y", DeleteRecursive.NO_GROUP),
+            ("f", "b", "", DeleteRecursive.TRUE),
+        ]:
+            ContentReference.objects.create(
+                source=contents[source],
+                target=contents[target],
+                group=group,
+                deleteRecursive=recursive.value,
+            )
+        for content in contents.values():
+            content.update_size_cache()
+        calculated_bytes_in_use = net.calculate_bytes_in_use()
+        self.assertEqual(
+            collect_deletion_closure([contents["a"].id]),
+            {contents[name].id for name in "abef"},
+        )
+        self.assertEqual(
+            bulk_delete_contents(
+                Content.objects.filter(id=contents["a"].id), file_workers=2
+            ),
+            4,
+        )
+        self.assertEqual(
+            set(Content.objects.values_list("id", flat=True)),
+            {contents["c"].id, contents["d"].id},
+        )
+        self.assertFalse(contents["a"].file.storage.exists(contents["a"].file.name))
+        net.refresh_from_db()
+        # the removed reference of c to a is accounted too
+        self.assertEqual(
+            10000 - net.bytes_in_use,
+            calculated_bytes_in_use - net.calculate_bytes_in_use(),
+        )
+        contents["c"].refresh_from_db()
+        self.assertEqual(
+            contents["c"].size_references_cached,
+            contents["c"].calculate_size_references(),
+        )
+        # cycles terminate and single deletes resolve the closure too
+        for source, target in [("c", "d"), ("d", "c")]:
+            ContentReference.objects.update_or_create(
+                source=contents[source],
+                target=contents[target],
+                group="x",
+                defaults={"deleteRecursive": DeleteRecursive.TRUE.value},
+            )
+        contents["e"] = Content(net=net, cluster=cluster, type="File", state="public")
+        contents["e"].file.save("ignored", ContentFile(b"abc"))
+        ContentReference.objects.create(
+            source=contents["e"],
+            target=contents["d"],
+            group="y",
+            extra="abc",
+            deleteRecursive=DeleteRecursive.FALSE.value,
+        )
+        for name in "cde":
+            contents[name].update_size_cache()
+        net.refresh_from_db()
+        bytes_in_use = net.bytes_in_use
+        calculated_bytes_in_use = net.calculate_bytes_in_use()
+        contents["d"].delete()
+        self.assertEqual(
+            list(Content.objects.values_list("id", flat=True)), [contents["e"].id]
+        )
+        contents["e"].refresh_from_db()
+        self.assertEqual(contents["e"].size_references_cached, 0)
+        net.refresh_from_db()
+        self.assertEqual(
+            bytes_in_use - net.bytes_in_use,
+            calculated_bytes_in_use - net.calculate_bytes_in_use(),
+        )
+
     async def test_create_cluster_and_content(self):
         manage_token = os.urandom(50)
         view_token = os.urandom(50)
@@ -120,6 +1055,18 @@ class BasicTests(TransactionTestCase):
         self.assertEqual(await Cluster.objects.exclude(name="@system").acount(), 1)
         # one public key is created
         self.assertEqual(await Content.objects.acount(), 1)
+        with self.subTest("Stored sizes are used for net accounting"):
+            content = await Content.objects.select_related("net").aget()
+            self.assertEqual(content.size_file, len(pub_encryptkey.key))
+            self.assertEqual(
+                await sync_to_async(content.update_size_cache)(save=False),
+                content.size,
+            )
+            cluster = await Cluster.objects.aget(net_id=content.net_id)
+            self.assertEqual(
+                await content.net.acalculate_bytes_in_use(),
+                content.size + cluster.size,
+            )
 
     async def test_create_cluster_and_content_with_keys(self):
         manage_token = os.urandom(50)
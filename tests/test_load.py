@@ -5,10 +5,13 @@ import re
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from django.conf import settings
+from django.db import connection
 from django.test import RequestFactory, TransactionTestCase
+from django.utils import timezone
 from faker import Faker
 from strawberry.django.context import StrawberryDjangoContext
 
+from secretgraph.core.constants import public_states
 from secretgraph.core.utils.crypto import findWorkingAlgorithms, sign
 from secretgraph.core.utils.hashing import (
     hashObject,
@@ -16,6 +19,7 @@ from secretgraph.core.utils.hashing import (
 from secretgraph.queries.cluster import clusterFeedQuery, createClusterMutation
 from secretgraph.queries.content import contentFeedQuery, createContentMutation
 from secretgraph.schema import schema
+from secretgraph.server.actions.fetch import fetch_contents
 from secretgraph.server.actions.update import (
     ActionInput,
     ClusterInput,
@@ -25,9 +29,24 @@ from secretgraph.server.actions.update import (
     ReferenceInput,
     create_cluster_fn,
     create_content_fn,
+    create_contents_fn,
+)
+from secretgraph.server.models import (
+    Content,
+    ContentReference,
+    ContentTag,
+    Net,
+)
+from secretgraph.server.signals import _outdated_contents
+from secretgraph.server.utils.auth import (
+    _actions_query,
+    _parse_token,
+    retrieve_allowed_objects,
 )
 
 _remove_connection = re.compile(r"@connection\(.+?\)", re.MULTILINE | re.DOTALL)
+# sqlite query plan line of a full table scan, index scans contain USING
+_sequential_scan = re.compile(r"\bSCAN (\w+)(?! USING)(?!.*\bUSING\b)")
 
 
 class LoadTests(TransactionTestCase):
@@ -35,6 +54,12 @@ class LoadTests(TransactionTestCase):
         # Every test needs access to the request factory.
         self.factory = RequestFactory()
 
+    async def _assert_no_sequential_scan(self, query):
+        if connection.vendor != "sqlite":
+            self.skipTest("query plans are only checked with sqlite")
+        plan = await query.aexplain()
+        self.assertIsNone(_sequential_scan.search(plan), plan)
+
     def _check_for_public_key(self, edges):
         for edge in edges:
             self.assertNotEqual(edge["node"]["type"], "PublicKey")
@@ -203,3 +228,133 @@ class LoadTests(TransactionTestCase):
                 )()
         with self.subTest("queries"):
             await self._queries(500)
+
+    async def _create_batch_dataset(self, manage_token, amount=400):
+        """
+        Create a cluster with amount signed contents in one batch.
+        Returns the cluster and the bytes in use before the contents were created
+        """
+        hash_algos = findWorkingAlgorithms(settings.SECRETGRAPH_HASH_ALGORITHMS, "hash")
+        signkey = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pub_signkey = signkey.public_key()
+        pub_signkey_bytes = pub_signkey.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        pub_signKey_hash = await hashObject(pub_signkey_bytes, hash_algos[0])
+        faker = Faker()
+        request = self.factory.get("/graphql")
+        cluster = (
+            await (
+                await create_cluster_fn(
+                    request,
+                    ClusterInput(
+                        actions=[
+                            ActionInput(
+                                value={"action": "manage"},
+                                key=manage_token,
+                            )
+                        ],
+                        keys=[ContentKeyInput(publicKey=pub_signkey_bytes)],
+                        name="@test",
+                    ),
+                    authset=[],
+                )
+            )()
+        )["cluster"]
+
+        bytes_in_use = (await Net.objects.aget(id=cluster.net.id)).bytes_in_use
+        inputs = []
+        for i in range(amount):
+            if i % 20 == 0:
+                content = faker.paragraph(nb_sentences=20).encode()
+                signature = await sign(signkey, content, hash_algos[0])
+            inputs.append(
+                ContentInput(
+                    net=cluster.net,
+                    cluster=cluster,
+                    hidden=False,
+                    value=ContentValueInput(
+                        value=content,
+                        state="public",
+                        type="Text",
+                        tags=["name=foo", "mime=text/plain"],
+                        references=[
+                            ReferenceInput(
+                                group="signature",
+                                target=pub_signKey_hash,
+                                extra=signature,
+                            )
+                        ],
+                    ),
+                )
+            )
+        request = self.factory.get("/graphql")
+        result = await (await create_contents_fn(request, inputs, authset=[]))()
+        self.assertEqual(len(result["contents"]), amount)
+        return cluster, bytes_in_use
+
+    async def test_load_single_cluster_batch_raw(self):
+        with self.subTest("setup"):
+            cluster, bytes_in_use = await self._create_batch_dataset(
+                base64.b64encode(os.urandom(50)).decode()
+            )
+        with self.subTest("stored"):
+            contents = Content.objects.filter(type="Text")
+            self.assertEqual(await contents.acount(), 400)
+            self.assertEqual(
+                await ContentTag.objects.filter(content__in=contents).acount(), 800
+            )
+            self.assertEqual(
+                await ContentReference.objects.filter(source__in=contents).acount(),
+                400,
+            )
+            net = await Net.objects.aget(id=cluster.net.id)
+            # like single creation, the flexid bytes are not accounted
+            self.assertEqual(
+                net.bytes_in_use - bytes_in_use,
+                sum(
+                    [
+                        content.size - content.flexid_byte_size
+                        async for content in contents
+                    ]
+                ),
+            )
+
+    async def test_query_plans(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("only the query plans of sqlite are parsed")
+        manage_token = base64.b64encode(os.urandom(50)).decode()
+        cluster, _ = await self._create_batch_dataset(manage_token)
+        authset = [f"{cluster.flexid_cached}:{manage_token}"]
+        now = timezone.now()
+        # the action lookup of retrieve_allowed_objects
+        await self._assert_no_sequential_scan(
+            _actions_query(
+                Content.objects.all(), [await _parse_token(authset[0])], now
+            )
+        )
+        result = await retrieve_allowed_objects(
+            self.factory.get("/graphql"), "Content", scope="view", authset=authset
+        )
+        self.assertTrue(result["active_actions"])
+        await self._assert_no_sequential_scan(result["objects_without_public"])
+        # the token listing of ContentNode.do_query
+        await self._assert_no_sequential_scan(
+            fetch_contents(
+                result["objects_without_public"],
+                states=public_states,
+                clustersAreRestrictedOrAdmin=True,
+                includeTypes=["Text"],
+            ).order_by("-updated")
+        )
+        # sweepOutdated
+        await self._assert_no_sequential_scan(_outdated_contents(now))
+        # signatures, keys, transfers and deletion
+        content = await result["objects_without_public"].afirst()
+        await self._assert_no_sequential_scan(
+            ContentReference.objects.filter(source=content, group="signature")
+        )
+        await self._assert_no_sequential_scan(
+            ContentReference.objects.filter(target=content, group="signature")
+        )
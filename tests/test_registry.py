@@ -1,3 +1,4 @@
+import asyncio
 import unittest
 
 import argon2
@@ -10,6 +11,7 @@ from hypothesis import strategies as st
 from secretgraph.core.utils.hashing import (
     DuplicateSaltError,
     MissingSaltError,
+    asortedRegistryHash,
     generateArgon2RegistrySalt,
     sortedRegistryHash,
 )
@@ -112,6 +114,16 @@ class RegistryTests(unittest.TestCase):
         with self.assertRaises(MissingSaltError):
             sortedRegistryHash(keys, "https://secretgraph.net/", "Foo")
 
+    def test_registry_async(self):
+        keys = [
+            "foo=sl",
+            f"salt={generateArgon2RegistrySalt(argon2.profiles.CHEAPEST)}",
+        ]
+        self.assertEqual(
+            asyncio.run(asortedRegistryHash(keys, "https://secretgraph.net/", "Foo")),
+            sortedRegistryHash(keys, "https://secretgraph.net/", "Foo"),
+        )
+
     @given(st.builds(gen_key_val), pv.urls(), st.builds(gen_hash_domain))
     @settings(deadline=400)
     def test_registry_fuzz(self, keys, url, domain):